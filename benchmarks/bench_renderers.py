@@ -0,0 +1,56 @@
+"""
+Compare DRF's JSONRenderer with core.renderers.FastJSONRenderer on
+real-size playlist responses.
+
+    python -m benchmarks.bench_renderers
+"""
+import timeit
+from benchmarks import django_setup
+
+django_setup.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from core.projections import project_playlist_detail, project_playlist_summaries  # noqa: E402
+from core.renderers import FastJSONRenderer, orjson  # noqa: E402
+from benchmarks.payloads import make_playlist_detail, make_playlist_summary  # noqa: E402
+
+
+def best_of(fn, repeat=5, number=50):
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+
+def main():
+    if orjson is None:
+        print('orjson is not installed; FastJSONRenderer falls back to the stdlib renderer')
+
+    responses = [
+        ('playlist detail, 100-track page', {
+            'count': 5000,
+            'next': 'http://localhost/api/v1/spotify_user_playlists/playlist000001?page=2&page_size=100',
+            'previous': None,
+            'results': project_playlist_detail(make_playlist_detail(track_count=100, total_tracks=5000)),
+        }),
+        ('playlist summaries, 2000 playlists', project_playlist_summaries(
+            [make_playlist_summary(index) for index in range(2000)]
+        )),
+    ]
+
+    stdlib_renderer = JSONRenderer()
+    fast_renderer = FastJSONRenderer()
+
+    print(f"{'case':<38}{'bytes':>9}{'JSONRenderer':>15}{'FastJSON':>13}{'speedup':>10}")
+    for name, data in responses:
+        assert fast_renderer.render(data) == stdlib_renderer.render(data)
+        stdlib_seconds = best_of(lambda: stdlib_renderer.render(data))
+        fast_seconds = best_of(lambda: fast_renderer.render(data))
+        print(
+            f'{name:<38}'
+            f'{len(stdlib_renderer.render(data)):>9}'
+            f'{stdlib_seconds * 1e6:>13.1f}us'
+            f'{fast_seconds * 1e6:>11.1f}us'
+            f'{stdlib_seconds / fast_seconds:>9.1f}x'
+        )
+
+
+if __name__ == '__main__':
+    main()
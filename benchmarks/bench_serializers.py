@@ -0,0 +1,53 @@
+"""
+Compare the DRF Spotify serializers with their core.projections fast paths.
+
+    python -m benchmarks.bench_serializers
+"""
+import timeit
+from benchmarks import django_setup
+
+django_setup.setup()
+
+from core.projections import project_playlist_detail, project_playlist_summaries  # noqa: E402
+from core.serializers import (  # noqa: E402
+    SpotifyPlaylistDetailSerializer,
+    SpotifyPlaylistSummarySerializer,
+)
+from benchmarks.payloads import make_playlist_detail, make_playlist_summary  # noqa: E402
+
+
+def best_of(fn, repeat=5, number=50):
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+
+def main():
+    playlist_page = make_playlist_detail(track_count=100, total_tracks=5000)
+    playlists = [make_playlist_summary(index) for index in range(200)]
+
+    cases = [
+        (
+            'playlist detail, 100-track page',
+            lambda: SpotifyPlaylistDetailSerializer(playlist_page).data,
+            lambda: project_playlist_detail(playlist_page),
+        ),
+        (
+            'playlist summaries, 200 playlists',
+            lambda: SpotifyPlaylistSummarySerializer(playlists, many=True).data,
+            lambda: project_playlist_summaries(playlists),
+        ),
+    ]
+
+    print(f"{'case':<36}{'serializer':>14}{'projection':>14}{'speedup':>10}")
+    for name, serializer_fn, projection_fn in cases:
+        serializer_seconds = best_of(serializer_fn)
+        projection_seconds = best_of(projection_fn)
+        print(
+            f'{name:<36}'
+            f'{serializer_seconds * 1e6:>12.1f}us'
+            f'{projection_seconds * 1e6:>12.1f}us'
+            f'{serializer_seconds / projection_seconds:>9.1f}x'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import django
+
+# Benchmarks never touch a real database, whatever .env says
+BENCHMARK_DATABASE_ENV = {
+    'DATABASE_ENGINE': 'django.db.backends.sqlite3',
+    'DATABASE_NAME': ':memory:',
+    'DATABASE_USER': '',
+    'DATABASE_PASSWORD': '',
+    'DATABASE_HOST': '',
+    'DATABASE_PORT': '',
+    'DATABASE_TEST_NAME': ':memory:',
+}
+
+BENCHMARK_DEFAULT_ENV = {
+    'SECRET_KEY': 'benchmark-secret-key-that-is-long-enough-for-hs256',
+    'SESSION_COOKIE_DOMAIN': 'localhost',
+    'SPOTIFY_CLIENT_ID': 'benchmark',
+    'SPOTIFY_SECRET_KEY': 'benchmark',
+    'SPOTIFY_SCOPE': 'playlist-read-private',
+    'SPOTIFY_REDIRECT_URI': 'http://localhost/api/v1/post_auth',
+    'POST_AUTH_REDIRECT_URI': 'http://localhost/',
+    'ENABLE_API_DOCS': 'False',
+    # Measure our side of each Spotify call, not Spotify's rate limit
+    'SPOTIFY_RATE_LIMIT_PER_SECOND': '1000000000',
+    'SPOTIFY_RATE_LIMIT_BURST': '1000000000',
+    'SPOTIFY_RATE_LIMIT_STATE_FILE': os.path.join(tempfile.gettempdir(), 'noshuff-benchmark-rate-limit'),
+}
+
+
+def setup(migrate=False):
+    """
+    Configure Django for a benchmark run. With migrate, the in-memory database
+    gets the schema, for benchmarks that read users or the local catalog.
+    """
+    os.environ.update(BENCHMARK_DATABASE_ENV)
+    for key, value in BENCHMARK_DEFAULT_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'noshuff_api.settings')
+
+    django.setup()
+
+    if migrate:
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
@@ -0,0 +1,507 @@
+"""
+A local stand-in for the Spotify Web API, for load testing without touching
+real Spotify.
+
+    python -m benchmarks.fake_spotify --port 8765 --latency-ms 40 --jitter-ms 20 \
+        --rate-limit-probability 0.01 --error-rate 0.005
+
+Then run the API with SPOTIFY_API_PREFIX=http://127.0.0.1:8765/v1/.
+
+Users, playlists and tracks are generated deterministically from the bearer
+token, in Spotify's response shapes, and the ``fields`` parameter is
+honoured. The access token for user n is ``fake-token-<n>``.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from benchmarks.payloads import make_track
+
+API_PATH_PREFIX = '/v1/'
+TOKEN_PREFIX = 'fake-token-'
+# Every tenth playlist belongs to someone else and every thirteenth is
+# collaborative, so the owned/collaborative filters have work to do
+OTHER_OWNER_EVERY = 10
+COLLABORATIVE_EVERY = 13
+TRACK_CATALOG_SIZE = 100_000
+
+PLAYLIST_ID_PATTERN = re.compile(r'^fake(?P<user>\d{5})p(?P<playlist>\d{4})$')
+
+
+def fake_user_id(user_index):
+    return f'fake_user_{user_index:05d}'
+
+
+def fake_access_token(user_index):
+    return f'{TOKEN_PREFIX}{user_index}'
+
+
+def fake_playlist_id(user_index, playlist_index):
+    return f'fake{user_index:05d}p{playlist_index:04d}'
+
+
+class FakeSpotifyCatalog:
+    """Deterministic users, playlists and tracks"""
+
+    def __init__(self, base_url, playlists_per_user=120, max_tracks=300):
+        self.base_url = base_url.rstrip('/')
+        self.playlists_per_user = playlists_per_user
+        self.max_tracks = max_tracks
+
+    def api_url(self, path):
+        return f'{self.base_url}{API_PATH_PREFIX}{path}'
+
+    def user(self, user_index):
+        user_id = fake_user_id(user_index)
+        return {
+            'country': 'US',
+            'display_name': f'Fake User {user_index}',
+            'email': f'{user_id}@example.com',
+            'explicit_content': {'filter_enabled': False, 'filter_locked': False},
+            'external_urls': {'spotify': f'https://open.spotify.com/user/{user_id}'},
+            'followers': {'href': None, 'total': user_index % 1000},
+            'href': self.api_url(f'users/{user_id}'),
+            'id': user_id,
+            'images': [],
+            'product': 'premium',
+            'type': 'user',
+            'uri': f'spotify:user:{user_id}',
+        }
+
+    def owner(self, user_id):
+        return {
+            'display_name': user_id.replace('_', ' ').title(),
+            'external_urls': {'spotify': f'https://open.spotify.com/user/{user_id}'},
+            'href': self.api_url(f'users/{user_id}'),
+            'id': user_id,
+            'type': 'user',
+            'uri': f'spotify:user:{user_id}',
+        }
+
+    def track_count(self, user_index, playlist_index):
+        return (user_index * 31 + playlist_index * 17) % (self.max_tracks + 1)
+
+    def playlist_base(self, user_index, playlist_index):
+        playlist_id = fake_playlist_id(user_index, playlist_index)
+        owner_id = fake_user_id(user_index) if (playlist_index + 1) % OTHER_OWNER_EVERY else 'someone_else'
+        return {
+            'collaborative': (playlist_index + 1) % COLLABORATIVE_EVERY == 0,
+            'description': f'Fake playlist {playlist_index} of user {user_index}',
+            'external_urls': {'spotify': f'https://open.spotify.com/playlist/{playlist_id}'},
+            'href': self.api_url(f'playlists/{playlist_id}'),
+            'id': playlist_id,
+            'images': [
+                {'height': 640, 'url': f'https://mosaic.scdn.co/640/{playlist_id}', 'width': 640},
+                {'height': 300, 'url': f'https://mosaic.scdn.co/300/{playlist_id}', 'width': 300},
+                {'height': 60, 'url': f'https://mosaic.scdn.co/60/{playlist_id}', 'width': 60},
+            ],
+            'name': f'Playlist {playlist_index:04d} of {fake_user_id(user_index)}',
+            'owner': self.owner(owner_id),
+            'primary_color': None,
+            'public': True,
+            'snapshot_id': f'{playlist_id}-snapshot-1',
+            'type': 'playlist',
+            'uri': f'spotify:playlist:{playlist_id}',
+        }
+
+    def simplified_playlist(self, user_index, playlist_index):
+        playlist_id = fake_playlist_id(user_index, playlist_index)
+        return {
+            **self.playlist_base(user_index, playlist_index),
+            'tracks': {
+                'href': self.api_url(f'playlists/{playlist_id}/tracks'),
+                'total': self.track_count(user_index, playlist_index),
+            },
+        }
+
+    def track(self, user_index, playlist_index, position):
+        # Playlists share tracks, as real libraries do
+        track = make_track((user_index * 7919 + playlist_index * 104729 + position) % TRACK_CATALOG_SIZE)
+        album_id = track['album']['id']
+        return {
+            'album': {
+                'album_type': 'album',
+                'artists': [self.artist(artist) for artist in track['artists'][:1]],
+                'available_markets': ['US', 'GB', 'DE', 'FR', 'ES', 'SE', 'JP', 'BR'],
+                'external_urls': {'spotify': f'https://open.spotify.com/album/{album_id}'},
+                'href': self.api_url(f'albums/{album_id}'),
+                'id': album_id,
+                'images': track['album']['images'],
+                'name': track['album']['name'],
+                'release_date': '2020-01-01',
+                'release_date_precision': 'day',
+                'total_tracks': 12,
+                'type': 'album',
+                'uri': f"spotify:album:{album_id}",
+            },
+            'artists': [self.artist(artist) for artist in track['artists']],
+            'available_markets': ['US', 'GB', 'DE', 'FR', 'ES', 'SE', 'JP', 'BR'],
+            'disc_number': 1,
+            'duration_ms': track['duration_ms'],
+            'episode': False,
+            'explicit': False,
+            'external_ids': {'isrc': f"FAKE{track['id'][-8:]}"},
+            'external_urls': {'spotify': f"https://open.spotify.com/track/{track['id']}"},
+            'href': self.api_url(f"tracks/{track['id']}"),
+            'id': track['id'],
+            'is_local': False,
+            'name': track['name'],
+            'popularity': position % 100,
+            'preview_url': None,
+            'track': True,
+            'track_number': position % 12 + 1,
+            'type': 'track',
+            'uri': f"spotify:track:{track['id']}",
+        }
+
+    def artist(self, artist):
+        return {
+            'external_urls': {'spotify': f"https://open.spotify.com/artist/{artist['id']}"},
+            'href': self.api_url(f"artists/{artist['id']}"),
+            'id': artist['id'],
+            'name': artist['name'],
+            'type': 'artist',
+            'uri': f"spotify:artist:{artist['id']}",
+        }
+
+    def playlist_item(self, user_index, playlist_index, position):
+        return {
+            'added_at': '2024-01-01T00:00:00Z',
+            'added_by': self.owner(fake_user_id(user_index)),
+            'is_local': False,
+            'primary_color': None,
+            'track': self.track(user_index, playlist_index, position),
+            'video_thumbnail': {'url': None},
+        }
+
+    def paging(self, path, items, offset, limit, total):
+        def page_url(page_offset):
+            return self.api_url(f'{path}?offset={page_offset}&limit={limit}')
+
+        return {
+            'href': page_url(offset),
+            'items': items,
+            'limit': limit,
+            'next': page_url(offset + limit) if offset + limit < total else None,
+            'offset': offset,
+            'previous': page_url(max(offset - limit, 0)) if offset > 0 else None,
+            'total': total,
+        }
+
+    def current_user_playlists(self, user_index, offset, limit):
+        total = self.playlists_per_user
+        items = [
+            self.simplified_playlist(user_index, playlist_index)
+            for playlist_index in range(offset, min(offset + limit, total))
+        ]
+        return self.paging('me/playlists', items, offset, limit, total)
+
+    def playlist_tracks(self, user_index, playlist_index, offset, limit):
+        total = self.track_count(user_index, playlist_index)
+        items = [
+            self.playlist_item(user_index, playlist_index, position)
+            for position in range(offset, min(offset + limit, total))
+        ]
+        playlist_id = fake_playlist_id(user_index, playlist_index)
+        return self.paging(f'playlists/{playlist_id}/tracks', items, offset, limit, total)
+
+    def playlist(self, user_index, playlist_index):
+        return {
+            **self.playlist_base(user_index, playlist_index),
+            'followers': {'href': None, 'total': playlist_index * 3},
+            'tracks': self.playlist_tracks(user_index, playlist_index, 0, 100),
+        }
+
+
+def parse_fields(expression):
+    """
+    Parse a Spotify ``fields`` expression into a tree of selected keys:
+    'items(track(id,album(name))),total' becomes
+    {'items': {'track': {'id': None, 'album': {'name': None}}}, 'total': None}.
+    A None leaf selects the whole value.
+
+    Raises:
+        ValueError: if the expression is malformed
+    """
+    expression = expression.replace(' ', '')
+    tree, position = _parse_field_list(expression, 0)
+    if position != len(expression):
+        raise ValueError(f'Invalid fields expression: {expression}')
+    return tree
+
+
+def _parse_field_list(expression, position):
+    tree = {}
+    while True:
+        name, subtree, position = _parse_field(expression, position)
+        tree[name] = _merge_fields(tree[name], subtree) if name in tree else subtree
+        if expression[position:position + 1] != ',':
+            return tree, position
+        position += 1
+
+
+def _parse_field(expression, position):
+    match = re.compile(r'[A-Za-z_]+').match(expression, position)
+    if match is None:
+        raise ValueError(f'Invalid fields expression: {expression}')
+    name, position = match.group(), match.end()
+
+    if expression[position:position + 1] == '.':
+        child, child_subtree, position = _parse_field(expression, position + 1)
+        return name, {child: child_subtree}, position
+    if expression[position:position + 1] == '(':
+        subtree, position = _parse_field_list(expression, position + 1)
+        if expression[position:position + 1] != ')':
+            raise ValueError(f'Invalid fields expression: {expression}')
+        return name, subtree, position + 1
+    return name, None, position
+
+
+def _merge_fields(first, second):
+    if first is None or second is None:
+        return None
+    merged = dict(first)
+    for name, subtree in second.items():
+        merged[name] = _merge_fields(merged[name], subtree) if name in merged else subtree
+    return merged
+
+
+def apply_fields(value, tree):
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [apply_fields(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: apply_fields(value[key], subtree) for key, subtree in tree.items() if key in value}
+    return value
+
+
+class FakeSpotifyBehaviour:
+    """Latency and failure injection, drawn from one seeded generator"""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, rate_limit_probability=0.0, retry_after=1, error_rate=0.0, seed=1):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """
+        Returns:
+            tuple: (seconds to delay, injected failure or None), where the
+            failure is 'rate_limited' or 'error'
+        """
+        with self._lock:
+            delay_ms = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms))
+            roll = self._random.random()
+
+        if roll < self.rate_limit_probability:
+            return delay_ms / 1000, 'rate_limited'
+        if roll < self.rate_limit_probability + self.error_rate:
+            return delay_ms / 1000, 'error'
+        return delay_ms / 1000, None
+
+
+class FakeSpotifyStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()
+        self.responses = Counter()
+
+    def record(self, route, status_code):
+        with self._lock:
+            self.requests[route] += 1
+            self.responses[str(status_code)] += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {'requests': dict(self.requests), 'responses': dict(self.responses)}
+
+
+class FakeSpotifyRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like api.spotify.com, so the connection pool is exercised
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FakeSpotify/1.0'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status_code, data, headers=None, route='other'):
+        body = json.dumps(data, separators=(',', ':')).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.stats.record(route, status_code)
+
+    def send_error_json(self, status_code, message, headers=None, route='other'):
+        self.send_json(status_code, {'error': {'status': status_code, 'message': message}}, headers, route)
+
+    def get_user_index(self):
+        authorization = self.headers.get('Authorization', '')
+        token = authorization.removeprefix('Bearer ')
+        if not token.startswith(TOKEN_PREFIX):
+            return None
+        try:
+            return int(token.removeprefix(TOKEN_PREFIX))
+        except ValueError:
+            return None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if url.path == '/_fake/stats':
+            self.send_json(200, self.server.stats.as_dict(), route='stats')
+            return
+
+        if not url.path.startswith(API_PATH_PREFIX):
+            self.send_error_json(404, 'Service not found')
+            return
+
+        route, handler = self.server.resolve(url.path.removeprefix(API_PATH_PREFIX))
+        delay, failure = self.server.behaviour.draw()
+        if delay:
+            time.sleep(delay)
+
+        user_index = self.get_user_index()
+        if user_index is None:
+            self.send_error_json(401, 'Invalid access token', route=route)
+            return
+        if failure == 'rate_limited':
+            self.send_error_json(
+                429,
+                'API rate limit exceeded',
+                headers={'Retry-After': str(self.server.behaviour.retry_after)},
+                route=route
+            )
+            return
+        if failure == 'error':
+            self.send_error_json(503, 'Service unavailable', route=route)
+            return
+        if handler is None:
+            self.send_error_json(404, 'Non existing id', route=route)
+            return
+
+        try:
+            offset = int(query.get('offset', 0))
+            limit = int(query.get('limit', 20))
+            fields = parse_fields(query['fields']) if query.get('fields') else None
+        except ValueError as e:
+            self.send_error_json(400, str(e), route=route)
+            return
+
+        data = handler(user_index, offset, limit)
+        if data is None:
+            self.send_error_json(404, 'Non existing id', route=route)
+            return
+
+        self.send_json(200, apply_fields(data, fields), route=route)
+
+
+class FakeSpotifyServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, catalog, behaviour, verbose=False):
+        super().__init__(address, FakeSpotifyRequestHandler)
+        self.catalog = catalog
+        self.behaviour = behaviour
+        self.verbose = verbose
+        self.stats = FakeSpotifyStats()
+
+    def resolve(self, path):
+        """
+        Returns:
+            tuple: (route name, handler(user_index, offset, limit) or None)
+        """
+        catalog = self.catalog
+
+        if path == 'me':
+            return 'me', lambda user_index, offset, limit: catalog.user(user_index)
+        if path == 'me/playlists':
+            return 'me/playlists', lambda user_index, offset, limit: catalog.current_user_playlists(
+                user_index, offset, min(limit, 50)
+            )
+
+        parts = path.split('/')
+        if parts[0] != 'playlists' or len(parts) not in (2, 3):
+            return 'other', None
+
+        match = PLAYLIST_ID_PATTERN.match(parts[1])
+        if match is None or int(match['playlist']) >= catalog.playlists_per_user:
+            return 'playlists', None
+        owner_index, playlist_index = int(match['user']), int(match['playlist'])
+
+        if len(parts) == 2:
+            return 'playlists/{id}', lambda user_index, offset, limit: catalog.playlist(owner_index, playlist_index)
+        if parts[2] == 'tracks':
+            return 'playlists/{id}/tracks', lambda user_index, offset, limit: catalog.playlist_tracks(
+                owner_index, playlist_index, offset, min(limit, 100)
+            )
+        return 'other', None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0, help='Mean added latency per request')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Latency varies uniformly by up to this much')
+    parser.add_argument(
+        '--rate-limit-probability',
+        type=float,
+        default=0.0,
+        help='Chance that a request is answered with a 429'
+    )
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds sent with a 429')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Chance that a request is answered with a 503')
+    parser.add_argument('--playlists-per-user', type=int, default=120)
+    parser.add_argument('--max-tracks', type=int, default=300, help='Largest playlist size')
+    parser.add_argument('--seed', type=int, default=1, help='Seed for latency and failure injection')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    return parser.parse_args(argv)
+
+
+def build_server(args):
+    base_url = f'http://{args.host}:{args.port}'
+    return FakeSpotifyServer(
+        (args.host, args.port),
+        FakeSpotifyCatalog(base_url, args.playlists_per_user, args.max_tracks),
+        FakeSpotifyBehaviour(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            rate_limit_probability=args.rate_limit_probability,
+            retry_after=args.retry_after,
+            error_rate=args.error_rate,
+            seed=args.seed
+        ),
+        verbose=args.verbose
+    )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = build_server(args)
+    print(f'Fake Spotify listening on http://{args.host}:{args.port}{API_PATH_PREFIX}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
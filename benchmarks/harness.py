@@ -0,0 +1,146 @@
+"""
+Timing, result files and baseline comparison for benchmarks.run.
+
+Results are written as JSON so runs on different commits can be compared:
+
+    {
+        "meta": {"commit": ..., "python": ..., "django": ..., ...},
+        "results": [
+            {"name": ..., "size": ..., "min_us": ..., "median_us": ..., ...},
+        ]
+    }
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import timeit
+from datetime import datetime, timezone
+
+# Aim for roughly this many seconds per timing repeat
+TARGET_REPEAT_SECONDS = 0.2
+
+
+class Benchmark:
+    def __init__(self, name, size, fn):
+        """
+        Args:
+            name (str): Benchmark name, stable across commits
+            size (str): Input size label, e.g. 'small', '1k', '10k'
+            fn: Callable timed with no arguments; setup happens before
+        """
+        self.name = name
+        self.size = size
+        self.fn = fn
+
+    @property
+    def key(self):
+        return f'{self.name}[{self.size}]'
+
+
+def calibrate(fn, target_seconds=TARGET_REPEAT_SECONDS):
+    """Calls per repeat so a repeat takes about target_seconds"""
+    number = 1
+    while True:
+        elapsed = timeit.timeit(fn, number=number)
+        if elapsed >= target_seconds / 10 or number >= 1_000_000:
+            return max(1, int(number * target_seconds / max(elapsed, 1e-9)))
+        number *= 10
+
+
+def measure(benchmark, repeat=5, number=None):
+    """
+    Returns:
+        dict: Per-call timings in microseconds over `repeat` repeats
+    """
+    benchmark.fn()  # Warm caches and lazy imports outside the timed runs
+    if number is None:
+        number = calibrate(benchmark.fn)
+
+    per_call_us = [
+        seconds / number * 1e6
+        for seconds in timeit.repeat(benchmark.fn, repeat=repeat, number=number)
+    ]
+
+    return {
+        'name': benchmark.name,
+        'size': benchmark.size,
+        'min_us': min(per_call_us),
+        'median_us': statistics.median(per_call_us),
+        'mean_us': statistics.fmean(per_call_us),
+        'stdev_us': statistics.stdev(per_call_us) if len(per_call_us) > 1 else 0.0,
+        'repeat': repeat,
+        'number': number,
+    }
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_run_metadata():
+    import django
+    import rest_framework
+
+    return {
+        'commit': get_git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'django': django.get_version(),
+        'djangorestframework': rest_framework.VERSION,
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def write_results(path, results):
+    with open(path, 'w') as results_file:
+        json.dump({'meta': get_run_metadata(), 'results': results}, results_file, indent=2)
+        results_file.write('\n')
+
+
+def load_results(path):
+    with open(path) as results_file:
+        return json.load(results_file)
+
+
+def compare_results(baseline, results, threshold):
+    """
+    Compare results against a baseline run by min_us, the timing least
+    affected by noise from the rest of the machine.
+
+    Returns:
+        list: (key, baseline_us, current_us, ratio, regressed) per benchmark
+        present in both runs
+    """
+    baseline_by_key = {
+        f"{result['name']}[{result['size']}]": result for result in baseline['results']
+    }
+
+    comparison = []
+    for result in results:
+        key = f"{result['name']}[{result['size']}]"
+        if key not in baseline_by_key:
+            continue
+        baseline_us = baseline_by_key[key]['min_us']
+        ratio = result['min_us'] / baseline_us if baseline_us else float('inf')
+        comparison.append((key, baseline_us, result['min_us'], ratio, ratio > 1 + threshold))
+
+    return comparison
+
+
+def format_us(value):
+    if value >= 1e6:
+        return f'{value / 1e6:.2f}s'
+    if value >= 1e3:
+        return f'{value / 1e3:.2f}ms'
+    return f'{value:.1f}us'
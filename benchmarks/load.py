@@ -0,0 +1,263 @@
+"""
+End-to-end load driver for the Spotify playlist endpoints.
+
+Start the fake Spotify server and the API pointed at it, sharing one
+database with this driver:
+
+    python -m benchmarks.fake_spotify --port 8765 --latency-ms 40 --jitter-ms 20
+    SPOTIFY_API_PREFIX=http://127.0.0.1:8765/v1/ gunicorn noshuff_api.wsgi -w 4 --threads 8
+    python -m benchmarks.load --base-url http://127.0.0.1:8000 --users 50 \
+        --concurrency 32 --duration 60 --output load.json
+
+The driver creates one user per fake Spotify account, signs them in with
+JWTs and hammers the endpoints, reporting p50/p95/p99 latency and
+throughput for each.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'noshuff_api.settings')
+django.setup()
+
+import requests  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+from benchmarks.fake_spotify import fake_access_token, fake_user_id  # noqa: E402
+from benchmarks.harness import get_run_metadata  # noqa: E402
+from core.models import User  # noqa: E402
+
+ENDPOINTS = {
+    'summary': lambda playlist_id: '/api/v1/spotify_user_playlists',
+    'search': lambda playlist_id: '/api/v1/spotify_user_playlists?q=00&sort=-track_count',
+    'detail': lambda playlist_id: f'/api/v1/spotify_user_playlists/{playlist_id}',
+    'detail_sparse': lambda playlist_id: f'/api/v1/spotify_user_playlists/{playlist_id}?fields=name,tracks.name',
+    'export': lambda playlist_id: f'/api/v1/spotify_user_playlists/{playlist_id}/export',
+    'async_summary': lambda playlist_id: '/api/v1/async/spotify_user_playlists',
+    'async_detail': lambda playlist_id: f'/api/v1/async/spotify_user_playlists/{playlist_id}',
+}
+DEFAULT_ENDPOINTS = ('summary', 'search', 'detail', 'detail_sparse')
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class LoadUser:
+    def __init__(self, index, access_token):
+        self.index = index
+        self.access_token = access_token
+        self.playlist_ids = []
+
+
+def seed_users(count):
+    """
+    Create or update one NoShuff user per fake Spotify account, with a
+    Spotify token that won't need refreshing during the run.
+    """
+    expires_at = timezone.now() + timedelta(days=1)
+    load_users = []
+    for index in range(count):
+        user, _ = User.objects.update_or_create(
+            spotify_id=fake_user_id(index),
+            defaults={
+                'email': f'{fake_user_id(index)}@loadtest.example.com',
+                'spotify_display_name': f'Fake User {index}',
+                'spotify_access_token': fake_access_token(index),
+                'spotify_refresh_token': f'fake-refresh-{index}',
+                'spotify_access_token_expires_at': expires_at,
+            }
+        )
+        load_users.append(LoadUser(index, str(AccessToken.for_user(user))))
+
+    return load_users
+
+
+class LoadRecorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, status_code, seconds):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status_code] += 1
+
+    def summary(self, elapsed_seconds):
+        results = []
+        for endpoint, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            statuses = self.statuses[endpoint]
+            errors = sum(count for status_code, count in statuses.items() if not 200 <= status_code < 400)
+            results.append({
+                'endpoint': endpoint,
+                'requests': len(latencies),
+                'errors': errors,
+                'statuses': {str(status_code): count for status_code, count in sorted(statuses.items())},
+                'throughput_rps': len(latencies) / elapsed_seconds if elapsed_seconds else 0.0,
+                'p50_ms': percentile(latencies, 0.50) * 1000,
+                'p95_ms': percentile(latencies, 0.95) * 1000,
+                'p99_ms': percentile(latencies, 0.99) * 1000,
+                'max_ms': latencies[-1] * 1000,
+            })
+        return results
+
+
+def make_session(concurrency):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def discover_playlists(session, base_url, load_users, timeout):
+    """Warm up each user's library and learn playlist ids, outside the measured run"""
+    for load_user in load_users:
+        response = session.get(
+            f'{base_url}/api/v1/spotify_user_playlists',
+            headers={'Authorization': f'Bearer {load_user.access_token}'},
+            timeout=timeout
+        )
+        response.raise_for_status()
+        load_user.playlist_ids = [playlist['id'] for playlist in response.json()]
+
+
+def run_load(session, base_url, load_users, endpoints, concurrency, duration, timeout, seed):
+    recorder = LoadRecorder()
+    deadline = time.monotonic() + duration
+    users_with_playlists = [load_user for load_user in load_users if load_user.playlist_ids]
+
+    def worker(worker_index):
+        rng = random.Random(seed + worker_index)
+        while time.monotonic() < deadline:
+            endpoint = rng.choice(endpoints)
+            load_user = rng.choice(users_with_playlists)
+            path = ENDPOINTS[endpoint](rng.choice(load_user.playlist_ids))
+
+            started_at = time.perf_counter()
+            try:
+                response = session.get(
+                    f'{base_url}{path}',
+                    headers={'Authorization': f'Bearer {load_user.access_token}'},
+                    timeout=timeout
+                )
+                # Streamed bodies count as done once fully read
+                response.content
+                status_code = response.status_code
+            except requests.RequestException:
+                status_code = 0
+            recorder.record(endpoint, status_code, time.perf_counter() - started_at)
+
+    started_at = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+
+    return recorder.summary(time.monotonic() - started_at)
+
+
+def print_report(results):
+    print(
+        f"{'endpoint':<16}{'requests':>10}{'errors':>8}{'req/s':>9}"
+        f"{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}"
+    )
+    for result in results:
+        print(
+            f"{result['endpoint']:<16}{result['requests']:>10}{result['errors']:>8}"
+            f"{result['throughput_rps']:>9.1f}"
+            f"{result['p50_ms']:>8.1f}ms{result['p95_ms']:>8.1f}ms"
+            f"{result['p99_ms']:>8.1f}ms{result['max_ms']:>8.1f}ms"
+        )
+
+
+def fetch_fake_spotify_stats(session, fake_spotify_url, timeout):
+    try:
+        return session.get(f"{fake_spotify_url.rstrip('/')}/_fake/stats", timeout=timeout).json()
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='NoShuff API to load')
+    parser.add_argument('--users', type=int, default=20, help='Fake Spotify accounts to spread load over')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run for')
+    parser.add_argument(
+        '--endpoints',
+        default=','.join(DEFAULT_ENDPOINTS),
+        help=f"Comma separated endpoints to load, from: {', '.join(ENDPOINTS)}"
+    )
+    parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+    parser.add_argument('--seed', type=int, default=1, help='Seed for request selection')
+    parser.add_argument(
+        '--fake-spotify-url',
+        help='Fake Spotify server to read upstream request counts from, e.g. http://127.0.0.1:8765'
+    )
+    parser.add_argument('--output', help='Write results as JSON to this path')
+
+    args = parser.parse_args(argv)
+    args.endpoints = [endpoint.strip() for endpoint in args.endpoints.split(',') if endpoint.strip()]
+    unknown_endpoints = [endpoint for endpoint in args.endpoints if endpoint not in ENDPOINTS]
+    if unknown_endpoints:
+        parser.error(f"unknown endpoint(s): {', '.join(unknown_endpoints)}")
+
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    base_url = args.base_url.rstrip('/')
+    session = make_session(args.concurrency)
+
+    load_users = seed_users(args.users)
+    discover_playlists(session, base_url, load_users, args.timeout)
+    if not any(load_user.playlist_ids for load_user in load_users):
+        print('No playlists were returned; is the API pointed at the fake Spotify server?')
+        return 1
+
+    upstream_before = fetch_fake_spotify_stats(session, args.fake_spotify_url, args.timeout) \
+        if args.fake_spotify_url else None
+    results = run_load(
+        session, base_url, load_users, args.endpoints, args.concurrency, args.duration, args.timeout, args.seed
+    )
+    upstream_after = fetch_fake_spotify_stats(session, args.fake_spotify_url, args.timeout) \
+        if args.fake_spotify_url else None
+
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump({
+                'meta': {
+                    **get_run_metadata(),
+                    'base_url': base_url,
+                    'users': args.users,
+                    'concurrency': args.concurrency,
+                    'duration': args.duration,
+                },
+                'results': results,
+                'upstream': {'before': upstream_before, 'after': upstream_after},
+            }, output_file, indent=2)
+            output_file.write('\n')
+        print(f'Wrote results to {args.output}')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
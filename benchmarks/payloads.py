@@ -0,0 +1,66 @@
+"""
+Synthetic Spotify payloads in the shapes core.spotipy_utils receives and
+returns. Generators are deterministic so results compare across runs.
+"""
+
+
+def make_track(index):
+    return {
+        'id': f'track{index:06d}',
+        'name': f'Track {index}',
+        'duration_ms': 120000 + (index * 7919) % 180000,
+        'album': {
+            'id': f'album{index // 12:06d}',
+            'name': f'Album {index // 12}',
+            'images': [
+                {'url': f'https://i.scdn.co/image/album{index // 12:06d}-640', 'height': 640, 'width': 640},
+                {'url': f'https://i.scdn.co/image/album{index // 12:06d}-300', 'height': 300, 'width': 300},
+            ] if index % 17 else [],
+        },
+        'artists': [
+            {'id': f'artist{index % 97:06d}', 'name': f'Artist {index % 97}'},
+            {'id': f'artist{index % 13:06d}', 'name': f'Artist {index % 13}'},
+        ][:1 + index % 2],
+    }
+
+
+def make_playlist_detail(track_count, total_tracks=None):
+    """A playlist as returned by get_spotify_playlist for one page"""
+    return {
+        'id': 'playlist000001',
+        'name': 'Benchmark Playlist',
+        'description': 'A playlist used for benchmarking',
+        'images': [{'url': 'https://mosaic.scdn.co/640/benchmark', 'height': 640, 'width': 640}],
+        'owner': {'display_name': 'Benchmark User'},
+        'followers': {'total': 1234},
+        'snapshot_id': 'snapshot000001',
+        'total_tracks': total_tracks if total_tracks is not None else track_count,
+        'tracks': [make_track(index) for index in range(track_count)],
+    }
+
+
+def make_playlist_summary(index, owner_id='benchmark_user'):
+    """A simplified playlist object as listed by current_user_playlists"""
+    return {
+        'collaborative': index % 11 == 0,
+        'description': f'Playlist number {index}',
+        'external_urls': {'spotify': f'https://open.spotify.com/playlist/playlist{index:06d}'},
+        'href': f'https://api.spotify.com/v1/playlists/playlist{index:06d}',
+        'id': f'playlist{index:06d}',
+        'images': [{'url': f'https://mosaic.scdn.co/640/playlist{index:06d}', 'height': 640, 'width': 640}]
+        if index % 9 else [],
+        'name': f'Playlist {index}',
+        'owner': {
+            'display_name': 'Benchmark User',
+            'external_urls': {'spotify': f'https://open.spotify.com/user/{owner_id}'},
+            'href': f'https://api.spotify.com/v1/users/{owner_id}',
+            'id': owner_id if index % 7 else 'someone_else',
+            'type': 'user',
+            'uri': f'spotify:user:{owner_id}',
+        },
+        'public': True,
+        'snapshot_id': f'snapshot{index:06d}',
+        'tracks': {'href': f'https://api.spotify.com/v1/playlists/playlist{index:06d}/tracks', 'total': index % 500},
+        'type': 'playlist',
+        'uri': f'spotify:playlist:playlist{index:06d}',
+    }
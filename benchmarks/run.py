@@ -0,0 +1,85 @@
+"""
+Run the core microbenchmark suite and write machine-readable results.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --sizes small,1k --filter serializers
+    python -m benchmarks.run --compare baseline.json --threshold 0.1
+
+With --compare, each benchmark's best time is compared against the baseline
+run and the exit status is 1 if any slowed down by more than the threshold.
+"""
+import argparse
+import sys
+from benchmarks import django_setup
+
+django_setup.setup(migrate=True)
+
+from benchmarks.harness import (  # noqa: E402
+    compare_results,
+    format_us,
+    load_results,
+    measure,
+    write_results,
+)
+from benchmarks.suite import SIZES, iter_benchmarks  # noqa: E402
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    parser.add_argument(
+        '--sizes',
+        default=','.join(SIZES),
+        help=f"Comma separated input sizes to run (default: {','.join(SIZES)})"
+    )
+    parser.add_argument('--filter', default='', help='Only run benchmarks whose name contains this')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing repeats per benchmark')
+    parser.add_argument('--compare', help='Baseline results JSON to compare against')
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=0.1,
+        help='Slowdown ratio over the baseline counted as a regression (default: 0.1)'
+    )
+
+    args = parser.parse_args(argv)
+    args.sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    unknown_sizes = [size for size in args.sizes if size not in SIZES]
+    if unknown_sizes:
+        parser.error(f"unknown size(s): {', '.join(unknown_sizes)}")
+
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    results = []
+    for benchmark in iter_benchmarks(args.sizes):
+        if args.filter not in benchmark.name:
+            continue
+        result = measure(benchmark, repeat=args.repeat)
+        results.append(result)
+        print(f"{benchmark.key:<58}{format_us(result['min_us']):>12}{format_us(result['median_us']):>12}")
+
+    if args.output:
+        write_results(args.output, results)
+        print(f'Wrote {len(results)} results to {args.output}')
+
+    if not args.compare:
+        return 0
+
+    regressions = 0
+    print(f"\n{'benchmark':<58}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for key, baseline_us, current_us, ratio, regressed in compare_results(
+        load_results(args.compare), results, args.threshold
+    ):
+        regressions += regressed
+        flag = '  REGRESSED' if regressed else ''
+        print(f'{key:<58}{format_us(baseline_us):>12}{format_us(current_us):>12}{ratio:>7.2f}x{flag}')
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
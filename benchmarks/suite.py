@@ -0,0 +1,152 @@
+"""
+Benchmarks for the hot paths behind the API endpoints. Each builds its
+synthetic input up front so only the code under test is timed.
+
+Spotify is replaced by plain in-memory fakes rather than mocks, whose call
+recording would dominate the timings.
+"""
+from benchmarks.harness import Benchmark
+from benchmarks.payloads import make_playlist_detail, make_playlist_summary, make_track
+
+SIZES = {
+    'small': 10,
+    '1k': 1_000,
+    '10k': 10_000,
+}
+
+BENCHMARK_SPOTIFY_ID = 'benchmark_user'
+
+
+class FakeSpotify:
+    """Serves precomputed payloads through the spotipy methods we call"""
+
+    _auth = 'benchmark-access-token'
+
+    def __init__(self, playlists=(), playlist_detail=None):
+        self.playlists = list(playlists)
+        self.playlist_detail = playlist_detail
+
+    def current_user_playlists(self, limit=50, offset=0):
+        items = self.playlists[offset:offset + limit]
+        has_next = offset + limit < len(self.playlists)
+        return {
+            'items': items,
+            'limit': limit,
+            'offset': offset,
+            'total': len(self.playlists),
+            'next': f'https://api.spotify.com/v1/me/playlists?offset={offset + limit}' if has_next else None,
+        }
+
+    def playlist(self, playlist_id, fields=None):
+        metadata = {key: value for key, value in self.playlist_detail.items() if key not in ('tracks', 'total_tracks')}
+        # Without a snapshot_id the local catalog is bypassed, keeping the database out of the timing
+        metadata.pop('snapshot_id', None)
+        return metadata
+
+    def playlist_tracks(self, playlist_id, offset=0, limit=100, additional_types=None, fields=None):
+        tracks = self.playlist_detail['tracks']
+        return {
+            'items': [{'track': track} for track in tracks[offset:offset + limit]],
+            'total': len(tracks),
+        }
+
+
+def make_benchmark_user():
+    from core.models import User
+
+    return User(
+        email='benchmark@example.com',
+        spotify_id=BENCHMARK_SPOTIFY_ID,
+        spotify_display_name='Benchmark User',
+        spotify_avatar_url='https://i.scdn.co/image/benchmark',
+        personal_blurb='Benchmarking',
+    )
+
+
+def spotify_user_playlists_benchmarks(size, count):
+    from core.spotipy_utils import get_spotify_user_playlists
+
+    user = make_benchmark_user()
+    spotify = FakeSpotify(playlists=[make_playlist_summary(index, BENCHMARK_SPOTIFY_ID) for index in range(count)])
+    user.get_spotify_client = lambda: spotify
+
+    yield Benchmark('spotipy_utils.get_spotify_user_playlists', size, lambda: get_spotify_user_playlists(user))
+
+
+def spotify_playlist_benchmarks(size, count):
+    from core.spotipy_utils import get_spotify_playlist
+
+    spotify = FakeSpotify(playlist_detail=make_playlist_detail(track_count=count))
+
+    yield Benchmark(
+        'spotipy_utils.get_spotify_playlist',
+        size,
+        lambda: get_spotify_playlist(spotify, 'playlist000001', page=1, page_size=count)
+    )
+
+
+def serializer_benchmarks(size, count):
+    from core.projections import project_playlist_detail, project_playlist_summaries, project_track
+    from core.serializers import (
+        SpotifyPlaylistDetailSerializer,
+        SpotifyPlaylistSummarySerializer,
+        SpotifyTrackSerializer,
+        UserSerializer,
+    )
+
+    playlists = [make_playlist_summary(index) for index in range(count)]
+    tracks = [make_track(index) for index in range(count)]
+    playlist_detail = make_playlist_detail(track_count=count)
+    users = [make_benchmark_user() for _ in range(count)]
+
+    yield Benchmark(
+        'serializers.SpotifyPlaylistSummarySerializer',
+        size,
+        lambda: SpotifyPlaylistSummarySerializer(playlists, many=True).data
+    )
+    yield Benchmark('serializers.SpotifyTrackSerializer', size, lambda: SpotifyTrackSerializer(tracks, many=True).data)
+    yield Benchmark(
+        'serializers.SpotifyPlaylistDetailSerializer',
+        size,
+        lambda: SpotifyPlaylistDetailSerializer(playlist_detail).data
+    )
+    yield Benchmark('serializers.UserSerializer', size, lambda: UserSerializer(users, many=True).data)
+
+    # The fast paths the views actually use, to keep their lead over the serializers visible
+    yield Benchmark('projections.project_playlist_summaries', size, lambda: project_playlist_summaries(playlists))
+    yield Benchmark('projections.project_track', size, lambda: [project_track(track) for track in tracks])
+    yield Benchmark('projections.project_playlist_detail', size, lambda: project_playlist_detail(playlist_detail))
+
+
+def jwt_authentication_benchmarks():
+    from rest_framework.request import Request
+    from rest_framework.settings import api_settings
+    from rest_framework.test import APIRequestFactory
+    from rest_framework_simplejwt.tokens import AccessToken
+    from core.models import User
+
+    user = User.objects.create(email='benchmark-jwt@example.com', spotify_id=BENCHMARK_SPOTIFY_ID)
+    access_token = str(AccessToken.for_user(user))
+    authenticators = [authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    http_request = APIRequestFactory().get('/api/v1/users/me', HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+    def authenticate():
+        # A fresh Request per call, as DRF builds one per incoming request
+        return Request(http_request, authenticators=authenticators).user
+
+    yield Benchmark('authentication.jwt_request', '1', authenticate)
+
+
+def iter_benchmarks(sizes):
+    """
+    Args:
+        sizes (list): Labels from SIZES to build benchmarks for
+    """
+    for size in sizes:
+        count = SIZES[size]
+        yield from spotify_user_playlists_benchmarks(size, count)
+        yield from spotify_playlist_benchmarks(size, count)
+        yield from serializer_benchmarks(size, count)
+
+    # Authentication cost doesn't depend on payload size
+    yield from jwt_authentication_benchmarks()
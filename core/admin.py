@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User
+from .models import User, SpotifyPlaylist
 
 
 class UserAdmin(admin.ModelAdmin):
@@ -7,3 +7,11 @@ class UserAdmin(admin.ModelAdmin):
 
 
 admin.site.register(User, UserAdmin)
+
+
+class SpotifyPlaylistAdmin(admin.ModelAdmin):
+    list_display = ['name', 'spotify_id', 'snapshot_id', 'total_tracks']
+    search_fields = ['name', 'spotify_id']
+
+
+admin.site.register(SpotifyPlaylist, SpotifyPlaylistAdmin)
@@ -0,0 +1,124 @@
+import asyncio
+import weakref
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from spotipy.exceptions import SpotifyException
+from core.spotify_client import get_spotify_client
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# httpx clients are bound to the event loop they were created on
+_http_clients = weakref.WeakKeyDictionary()
+# Tasks that close the clients, referenced here until done so they aren't
+# garbage collected while they wait
+_http_client_closers = set()
+
+
+def build_http_client():
+    return httpx.AsyncClient(
+        base_url=settings.SPOTIFY_API_PREFIX,
+        timeout=5,
+        limits=httpx.Limits(
+            max_connections=settings.SPOTIFY_HTTP_POOL_MAXSIZE,
+            max_keepalive_connections=settings.SPOTIFY_HTTP_POOL_MAXSIZE
+        )
+    )
+
+
+async def close_on_loop_shutdown(http_client):
+    """
+    Wait until the loop shuts down, then close the client. asyncio.run() and
+    asgiref cancel the tasks left on a loop before closing it, which is what
+    ends the wait.
+    """
+    try:
+        await asyncio.get_running_loop().create_future()
+    finally:
+        await http_client.aclose()
+
+
+def get_http_client():
+    loop = asyncio.get_running_loop()
+    http_client = _http_clients.get(loop)
+    if http_client is None:
+        http_client = _http_clients[loop] = build_http_client()
+        closer = loop.create_task(close_on_loop_shutdown(http_client))
+        _http_client_closers.add(closer)
+        closer.add_done_callback(_http_client_closers.discard)
+
+    return http_client
+
+
+class AsyncSpotify:
+    """
+    Async counterpart of the handful of spotipy.Spotify calls the async views
+    make. Raises SpotifyException on HTTP errors, like spotipy does.
+    """
+
+    def __init__(self, access_token, http_client):
+        self.access_token = access_token
+        self.http_client = http_client
+
+    async def _get(self, path, **params):
+        params = {key: value for key, value in params.items() if value is not None}
+        response = await self.http_client.get(
+            path,
+            params=params,
+            headers={'Authorization': f'Bearer {self.access_token}'}
+        )
+
+        if response.is_error:
+            try:
+                error = response.json().get('error', {})
+                msg = error.get('message')
+                reason = error.get('reason')
+            except ValueError:
+                msg = response.text or None
+                reason = None
+            raise SpotifyException(
+                response.status_code,
+                -1,
+                f'{response.url}:\n {msg}',
+                reason=reason,
+                headers=response.headers
+            )
+
+        return response.json()
+
+    async def current_user_playlists(self, limit=50, offset=0):
+        return await self._get('me/playlists', limit=limit, offset=offset)
+
+    async def playlist(self, playlist_id, fields=None):
+        return await self._get(f'playlists/{playlist_id}', fields=fields)
+
+    async def playlist_tracks(self, playlist_id, fields=None, limit=100, offset=0, additional_types=('track',)):
+        return await self._get(
+            f'playlists/{playlist_id}/tracks',
+            fields=fields,
+            limit=limit,
+            offset=offset,
+            additional_types=','.join(additional_types)
+        )
+
+
+class ThreadedAsyncSpotify:
+    """
+    Fallback when httpx isn't installed: runs the blocking spotipy client in a
+    worker thread so the event loop stays free.
+    """
+
+    def __init__(self, access_token):
+        self.spotify_client = get_spotify_client(access_token)
+
+    def __getattr__(self, name):
+        return sync_to_async(getattr(self.spotify_client, name), thread_sensitive=False)
+
+
+def get_async_spotify_client(access_token):
+    if httpx is None:
+        return ThreadedAsyncSpotify(access_token)
+
+    return AsyncSpotify(access_token, get_http_client())
@@ -0,0 +1,203 @@
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotModified, JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from core.authentication import aauthenticate
+from core.etags import (
+    add_cache_headers,
+    etag_matches,
+    get_library_playlists_etag,
+    get_playlist_detail_etag,
+    get_playlists_summary_etag,
+)
+from core.playlist_library import (
+    ensure_spotify_user_library,
+    is_library_query,
+    parse_library_query,
+    search_spotify_user_library,
+)
+from core.projections import (
+    project_library_playlist_summaries,
+    project_playlist_detail,
+    project_playlist_summaries,
+)
+from core.spotipy_utils import aget_spotify_user_playlists, aget_spotify_playlist
+from core.sparse_fields import (
+    PLAYLIST_SUMMARY_FIELDS,
+    get_playlist_detail_fields,
+    get_request_fields,
+)
+from core.views import SpotifyCursorPagination, SpotifyPageNumberPagination
+from core.request_timing import timed
+
+
+def async_jwt_required(view):
+    @wraps(view)
+    async def wrapped_view(request, *args, **kwargs):
+        try:
+            user = await aauthenticate(request)
+        except (InvalidToken, AuthenticationFailed) as e:
+            detail = e.detail if isinstance(e.detail, dict) else {'detail': e.detail}
+            return unauthorized_response(detail)
+
+        if user is None:
+            return unauthorized_response(
+                {'detail': 'Authentication credentials were not provided.'}
+            )
+
+        request.user = user
+        return await view(request, *args, **kwargs)
+
+    return wrapped_view
+
+
+def unauthorized_response(detail):
+    response = JsonResponse(detail, status=status.HTTP_401_UNAUTHORIZED)
+    response['WWW-Authenticate'] = 'Bearer realm="api"'
+    return response
+
+
+def not_modified_response(etag):
+    return add_cache_headers(HttpResponseNotModified(), etag)
+
+
+@require_GET
+@async_jwt_required
+async def spotify_user_playlists_summary(request):
+    try:
+        fields = get_request_fields(request, PLAYLIST_SUMMARY_FIELDS)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if is_library_query(request.GET):
+        return await search_spotify_user_playlists(request, fields)
+
+    playlists = await aget_spotify_user_playlists(request.user)
+    if playlists is None:
+        return JsonResponse([], safe=False)
+
+    etag = get_playlists_summary_etag(playlists, fields)
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+
+    with timed('serialize'):
+        results = project_playlist_summaries(playlists, fields)
+
+    return add_cache_headers(JsonResponse(results, safe=False), etag)
+
+
+async def search_spotify_user_playlists(request, fields):
+    """
+    Async version of core.views.search_spotify_user_playlists. The library
+    lives in the database, so it is queried in a worker thread.
+    """
+    try:
+        query = parse_library_query(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not await sync_to_async(ensure_spotify_user_library)(request.user):
+        return JsonResponse([], safe=False)
+
+    rows = await sync_to_async(
+        lambda: list(search_spotify_user_library(request.user, **query))
+    )()
+
+    etag = get_library_playlists_etag(rows, fields)
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+
+    with timed('serialize'):
+        results = project_library_playlist_summaries(rows, fields)
+
+    return add_cache_headers(JsonResponse(results, safe=False), etag)
+
+
+@require_GET
+@async_jwt_required
+async def spotify_user_playlist_detail(request, spotify_playlist_id: str):
+    try:
+        fields = get_playlist_detail_fields(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        spotify_client = await request.user.aget_spotify_client()
+
+        paginator = SpotifyPageNumberPagination()
+        cursor_paginator = SpotifyCursorPagination()
+        use_cursor = cursor_paginator.is_requested(request)
+
+        if use_cursor:
+            try:
+                offset, page_size, cursor_snapshot_id = cursor_paginator.decode_cursor(request)
+            except ValueError:
+                return JsonResponse(
+                    {'error': 'Invalid cursor'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            page = offset // page_size + 1
+        else:
+            try:
+                page = int(request.GET.get('page', 1))
+                if page < 1:
+                    return JsonResponse(
+                        {'error': 'Page number must be greater than 0'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+            except ValueError:
+                return JsonResponse(
+                    {'error': 'Invalid page number'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            page_size = paginator.get_page_size(request)
+
+        playlist_data = await aget_spotify_playlist(
+            spotify_client,
+            spotify_playlist_id,
+            page=page,
+            page_size=page_size,
+            fields=fields
+        )
+
+        snapshot_id = playlist_data.get('snapshot_id')
+        if use_cursor and cursor_snapshot_id and snapshot_id != cursor_snapshot_id:
+            return JsonResponse(
+                {
+                    'error': 'Playlist changed since the cursor was issued',
+                    'snapshot_id': snapshot_id,
+                },
+                status=status.HTTP_409_CONFLICT
+            )
+
+        etag = get_playlist_detail_etag(playlist_data, page, page_size, fields)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+
+        with timed('serialize'):
+            results = project_playlist_detail(playlist_data, fields)
+
+        if use_cursor:
+            next_url, previous_url = cursor_paginator.get_cursor_links(
+                request, offset, page_size, snapshot_id, playlist_data['total_tracks']
+            )
+        else:
+            next_url, previous_url = paginator.get_page_links(
+                request, page, page_size, playlist_data['total_tracks']
+            )
+
+        return add_cache_headers(JsonResponse({
+            'count': playlist_data['total_tracks'],
+            'next': next_url,
+            'previous': previous_url,
+            'results': results
+        }), etag)
+
+    except Exception as e:
+        return JsonResponse(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
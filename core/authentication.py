@@ -0,0 +1,100 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from core.models import User
+from core.request_timing import timed
+from core.user_cache import user_cache
+
+
+class TimedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication, accounted to the auth phase of the request timings"""
+
+    def authenticate(self, request):
+        with timed('auth'):
+            return super().authenticate(request)
+
+
+class CachedJWTAuthentication(TimedJWTAuthentication):
+    """
+    TimedJWTAuthentication that resolves users through the user cache, so
+    most requests don't query core_user at all
+    """
+
+    def get_user(self, validated_token):
+        user_id = get_token_user_id(validated_token)
+
+        user = user_cache.get(user_id)
+        if user is None:
+            generation = user_cache.generation
+            # Raises for unknown and inactive users, so those aren't cached
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user, generation)
+            return user
+
+        check_user(validated_token, user)
+
+        return user
+
+
+def get_token_user_id(validated_token):
+    try:
+        return validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken('Token contained no recognizable user identification')
+
+
+def check_user(validated_token, user):
+    """The checks JWTAuthentication.get_user makes once it has loaded the user"""
+    if not user.is_active:
+        raise AuthenticationFailed('User is inactive', code='user_inactive')
+
+    if api_settings.CHECK_REVOKE_TOKEN and \
+            validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+        raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+
+
+async def aauthenticate(request):
+    """
+    Async counterpart of JWTAuthentication.authenticate for plain Django async
+    views. Token validation is pure CPU; the user is loaded with the async ORM.
+
+    Returns:
+        User or None if the request carries no bearer token
+
+    Raises:
+        InvalidToken, AuthenticationFailed
+    """
+    with timed('auth'):
+        return await _aauthenticate(request)
+
+
+async def _aauthenticate(request):
+    jwt_authentication = JWTAuthentication()
+
+    header = jwt_authentication.get_header(request)
+    if header is None:
+        return None
+
+    raw_token = jwt_authentication.get_raw_token(header)
+    if raw_token is None:
+        return None
+
+    validated_token = jwt_authentication.get_validated_token(raw_token)
+    user_id = get_token_user_id(validated_token)
+
+    user = user_cache.get(user_id)
+    if user is None:
+        generation = user_cache.generation
+        try:
+            user = await User.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except User.DoesNotExist:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+
+        check_user(validated_token, user)
+        user_cache.set(user_id, user, generation)
+        return user
+
+    check_user(validated_token, user)
+
+    return user
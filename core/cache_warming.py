@@ -0,0 +1,151 @@
+"""
+Warm the local caches for users who are likely to come back soon, so their
+first playlist screens don't wait on cold Spotify calls.
+
+A user counts as active from their last login or token refresh, both of
+which stamp User.last_login. For each active user the crawler refreshes the
+local copy of their playlist library, then stores the first page of tracks
+of their first playlists in the catalog. Playlist details and exports are
+then served with one Spotify call instead of two.
+
+The crawler shares the Spotify rate limit with interactive traffic. It
+keeps to its own calls-per-second budget. It also only calls Spotify while
+the fleet-wide bucket has headroom and no 429 block is in force.
+"""
+import logging
+import time
+from datetime import timedelta
+import requests
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from spotipy.exceptions import SpotifyException
+from spotipy.oauth2 import SpotifyOauthError
+from core.models import SpotifyUserPlaylist, User
+from core.playlist_cache import get_cached_playlist_page
+from core.playlist_library import is_spotify_user_library_fresh, refresh_spotify_user_library
+from core.spotify_gateway import get_spotify_rate_limiter, spotify_gateway_stats
+from core.spotipy_utils import get_spotify_playlist
+
+logger = logging.getLogger(__name__)
+
+# Longest nap while waiting for headroom, so a long wait still notices
+# when traffic drops off
+MAX_HEADROOM_WAIT_SECONDS = 1
+
+
+def record_user_activity(user_id):
+    """
+    Stamp last_login without touching updated_at, which feeds the user's
+    ETag. A stamp newer than settings.USER_ACTIVITY_STAMP_INTERVAL_SECONDS is
+    left alone, so most token refreshes write nothing.
+    """
+    now = timezone.now()
+    stamped_after = now - timedelta(seconds=settings.USER_ACTIVITY_STAMP_INTERVAL_SECONDS)
+    User.objects.filter(
+        Q(last_login__isnull=True) | Q(last_login__lt=stamped_after),
+        **{api_settings.USER_ID_FIELD: user_id}
+    ).update(last_login=now)
+
+
+def get_recently_active_users(within):
+    """Returns: QuerySet of users active within the timedelta, most recent first"""
+    return User.objects.filter(
+        is_active=True,
+        spotify_refresh_token__isnull=False,
+        last_login__gte=timezone.now() - within,
+    ).order_by('-last_login')
+
+
+class UpstreamBudget:
+    """
+    Paces the crawler's Spotify calls.
+
+    Args:
+        calls_per_second (float): Average rate the crawler may call Spotify at
+        min_headroom (float): Fraction of the fleet-wide burst that must be
+            left in the bucket before the crawler makes a call
+    """
+
+    def __init__(self, calls_per_second, min_headroom, sleep=time.sleep):
+        self.calls_per_second = calls_per_second
+        self.min_headroom = min_headroom
+        self.sleep = sleep
+        self.rate_limiter = get_spotify_rate_limiter()
+        self._started_at = time.monotonic()
+        self._start_calls = spotify_gateway_stats.calls
+
+    @property
+    def calls(self):
+        return spotify_gateway_stats.calls - self._start_calls
+
+    def wait(self):
+        """Block until the crawler may make its next Spotify call"""
+        # Calls made so far must average out to calls_per_second
+        earliest = self._started_at + self.calls / self.calls_per_second
+        if earliest > time.monotonic():
+            self.sleep(earliest - time.monotonic())
+
+        min_tokens = self.min_headroom * self.rate_limiter.burst
+        while True:
+            blocked_for = self.rate_limiter.blocked_for()
+            if blocked_for > 0:
+                self.sleep(blocked_for)
+                continue
+
+            missing_tokens = min_tokens - self.rate_limiter.available_tokens()
+            if missing_tokens <= 0:
+                return
+            self.sleep(min(missing_tokens / self.rate_limiter.rate, MAX_HEADROOM_WAIT_SECONDS))
+
+
+def warm_user(user, budget, playlists_per_user, page_size, library_max_age=None):
+    """
+    Returns:
+        int: Playlist pages stored in the catalog
+    """
+    if not is_spotify_user_library_fresh(user, library_max_age):
+        if not refresh_spotify_user_library(user, library_max_age, budget):
+            return 0
+
+    library_playlists = SpotifyUserPlaylist.objects.filter(user=user) \
+        .order_by('position') \
+        .values('spotify_id', 'snapshot_id')[:playlists_per_user]
+
+    spotify_client = None
+    warmed_count = 0
+    for library_playlist in library_playlists:
+        playlist_data = {'id': library_playlist['spotify_id'], 'snapshot_id': library_playlist['snapshot_id']}
+        if get_cached_playlist_page(playlist_data, 0, page_size) is not None:
+            continue
+
+        if spotify_client is None:
+            spotify_client = user.get_spotify_client()
+        budget.wait()
+        get_spotify_playlist(spotify_client, library_playlist['spotify_id'], page=1, page_size=page_size)
+        warmed_count += 1
+
+    return warmed_count
+
+
+def warm_active_users(budget, active_within, playlists_per_user, page_size, max_users=None):
+    """
+    Returns:
+        tuple: (users warmed, playlist pages stored)
+    """
+    users = get_recently_active_users(active_within)
+    if max_users:
+        users = users[:max_users]
+
+    user_count = 0
+    page_count = 0
+    for user in users:
+        try:
+            page_count += warm_user(user, budget, playlists_per_user, page_size)
+        except (SpotifyException, SpotifyOauthError, requests.RequestException) as e:
+            logger.warning('Error warming caches for user %s: %s', user.pk, e)
+            continue
+        user_count += 1
+
+    return user_count, page_count
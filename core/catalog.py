@@ -0,0 +1,167 @@
+from django.conf import settings
+from core.models import SpotifyAlbum, SpotifyArtist, SpotifyTrack, SpotifyTrackArtist
+
+
+def is_catalogable_track(track):
+    """
+    Local files and other unlisted items come back without Spotify IDs and
+    can't be keyed in the catalog.
+    """
+    return bool(
+        track.get('id')
+        and track['album'].get('id')
+        and all(artist.get('id') for artist in track['artists'])
+    )
+
+
+def get_album_image_url(album):
+    images = album.get('images') or []
+    return images[0]['url'] if images else None
+
+
+def upsert_spotify_tracks(tracks):
+    """
+    Upsert tracks and their albums and artists into the deduplicated catalog.
+
+    Each table is written with batched INSERT ... ON CONFLICT statements keyed
+    on spotify_id, so an album shared by many playlists is stored once.
+
+    Args:
+        tracks (list): Spotify track objects with id, name, duration_ms,
+            album(id,name,images) and artists(id,name)
+
+    Returns:
+        dict: Map of Spotify track ID to SpotifyTrack primary key
+    """
+    batch_size = settings.SPOTIFY_CATALOG_UPSERT_BATCH_SIZE
+
+    artists = {}
+    albums = {}
+    tracks_by_id = {}
+    for track in tracks:
+        tracks_by_id[track['id']] = track
+        albums[track['album']['id']] = track['album']
+        for artist in track['artists']:
+            artists[artist['id']] = artist
+
+    if not tracks_by_id:
+        return {}
+
+    SpotifyArtist.objects.bulk_create(
+        [
+            SpotifyArtist(spotify_id=spotify_id, name=artist['name'])
+            for spotify_id, artist in artists.items()
+        ],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['spotify_id'],
+        update_fields=['name', 'updated_at']
+    )
+    SpotifyAlbum.objects.bulk_create(
+        [
+            SpotifyAlbum(
+                spotify_id=spotify_id,
+                name=album['name'],
+                image_url=get_album_image_url(album)
+            )
+            for spotify_id, album in albums.items()
+        ],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['spotify_id'],
+        update_fields=['name', 'image_url', 'updated_at']
+    )
+
+    artist_pks = dict(
+        SpotifyArtist.objects.filter(spotify_id__in=artists).values_list('spotify_id', 'pk')
+    )
+    album_pks = dict(
+        SpotifyAlbum.objects.filter(spotify_id__in=albums).values_list('spotify_id', 'pk')
+    )
+
+    SpotifyTrack.objects.bulk_create(
+        [
+            SpotifyTrack(
+                spotify_id=spotify_id,
+                name=track['name'],
+                duration_ms=track['duration_ms'],
+                album_id=album_pks[track['album']['id']]
+            )
+            for spotify_id, track in tracks_by_id.items()
+        ],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['spotify_id'],
+        update_fields=['name', 'duration_ms', 'album', 'updated_at']
+    )
+    track_pks = dict(
+        SpotifyTrack.objects.filter(spotify_id__in=tracks_by_id).values_list('spotify_id', 'pk')
+    )
+
+    # Keyed by (track, artist): an artist listed twice on a track would make
+    # the upsert conflict with itself, so only its first credit is kept
+    track_artists = {}
+    for spotify_id, track in tracks_by_id.items():
+        for position, artist in enumerate(track['artists']):
+            track_artists.setdefault(
+                (track_pks[spotify_id], artist_pks[artist['id']]),
+                position
+            )
+
+    # Artists dropped from a track since it was last stored
+    stale_track_artist_pks = [
+        pk
+        for pk, track_pk, artist_pk in SpotifyTrackArtist.objects
+        .filter(track_id__in=track_pks.values())
+        .values_list('pk', 'track_id', 'artist_id')
+        if (track_pk, artist_pk) not in track_artists
+    ]
+    if stale_track_artist_pks:
+        SpotifyTrackArtist.objects.filter(pk__in=stale_track_artist_pks).delete()
+
+    SpotifyTrackArtist.objects.bulk_create(
+        [
+            SpotifyTrackArtist(track_id=track_pk, artist_id=artist_pk, position=position)
+            for (track_pk, artist_pk), position in track_artists.items()
+        ],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['track', 'artist'],
+        update_fields=['position']
+    )
+
+    return track_pks
+
+
+def get_spotify_track_dicts(track_pks):
+    """
+    Rebuild Spotify-shaped track objects from the catalog, in the order given.
+    Each distinct track, album and artist is loaded once no matter how often
+    it appears.
+    """
+    tracks = (
+        SpotifyTrack.objects
+        .filter(pk__in=set(track_pks))
+        .select_related('album')
+        .prefetch_related('track_artists__artist')
+    )
+
+    track_dicts = {}
+    for track in tracks:
+        album_images = [{'url': track.album.image_url}] if track.album.image_url else []
+        track_dicts[track.pk] = {
+            'id': track.spotify_id,
+            'name': track.name,
+            'duration_ms': track.duration_ms,
+            'album': {
+                'id': track.album.spotify_id,
+                'name': track.album.name,
+                'images': album_images,
+            },
+            'artists': [
+                {'id': track_artist.artist.spotify_id, 'name': track_artist.artist.name}
+                for track_artist in track.track_artists.all()
+            ],
+        }
+
+    return [track_dicts[pk] for pk in track_pks]
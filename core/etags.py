@@ -0,0 +1,85 @@
+import hashlib
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+from core.metrics import cache_requests_total
+from core.playlist_cache import get_playlist_image_url
+from core.sparse_fields import get_fields_key
+
+# Bump when the shape of a cached response changes so clients drop old copies
+ETAG_VERSION = 1
+
+
+def make_etag(*parts):
+    digest = hashlib.sha256(
+        '|'.join(str(part) for part in (ETAG_VERSION, *parts)).encode()
+    ).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def get_playlist_detail_etag(playlist_data, page, page_size, fields=None):
+    """
+    Playlist contents are versioned by Spotify's snapshot_id. Follower counts
+    and cover images change without a new snapshot, so they are folded in
+    too, as is the sparse fieldset the response was trimmed to.
+    """
+    if not playlist_data.get('snapshot_id'):
+        return None
+
+    return make_etag(
+        'playlist',
+        playlist_data['id'],
+        playlist_data['snapshot_id'],
+        (playlist_data.get('followers') or {}).get('total'),
+        get_playlist_image_url(playlist_data),
+        page,
+        page_size,
+        get_fields_key(fields),
+    )
+
+
+def get_playlists_summary_etag(playlists, fields=None):
+    return make_etag('playlists', get_fields_key(fields), *(
+        (playlist['id'], playlist.get('snapshot_id'), get_playlist_image_url(playlist))
+        for playlist in playlists
+    ))
+
+
+def get_library_playlists_etag(rows, fields=None):
+    # Rows are the filtered, sorted search results, so the query is covered too
+    return make_etag('library', get_fields_key(fields), *(
+        (row['spotify_id'], row['snapshot_id'], row['image_url'], row['track_count'])
+        for row in rows
+    ))
+
+
+def get_user_etag(user):
+    return make_etag('user', user.uuid, user.updated_at.isoformat())
+
+
+def etag_matches(request, etag):
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match or etag is None:
+        return False
+
+    # If-None-Match uses the weak comparison function (RFC 9110 13.1.2)
+    etags = [candidate.removeprefix('W/') for candidate in parse_etags(if_none_match)]
+    matched = '*' in etags or etag in etags
+    cache_requests_total.inc(cache='etag', result='hit' if matched else 'miss')
+
+    return matched
+
+
+def add_cache_headers(response, etag):
+    if etag is not None:
+        response['ETag'] = etag
+    # Responses are per user; shared caches must not store them
+    patch_cache_control(response, private=True)
+    patch_vary_headers(response, ['Authorization'])
+
+    return response
+
+
+def not_modified_response(etag):
+    return add_cache_headers(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
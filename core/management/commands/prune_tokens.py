@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand
+from core.token_blacklist import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete expired refresh tokens from the outstanding and blacklisted token tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Tokens deleted per statement (default: 1000)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running and prune every this many seconds (default: run once)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            deleted_count = prune_expired_tokens(batch_size=options['batch_size'])
+            self.stdout.write(f"Deleted {deleted_count} expired tokens")
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,75 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from core.models import User
+from core.spotify_tokens import ensure_fresh_spotify_access_token
+
+
+class Command(BaseCommand):
+    help = "Refresh Spotify access tokens that expire within the next N minutes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--within-minutes',
+            type=int,
+            default=10,
+            help='Refresh tokens expiring within this many minutes (default: 10)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Users loaded and refreshed per batch (default: 100)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Concurrent refresh requests to Spotify (default: 4)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running and sweep every this many seconds (default: run once)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            refreshed_count = self.refresh_expiring_tokens(
+                margin=timedelta(minutes=options['within_minutes']),
+                batch_size=options['batch_size'],
+                workers=options['workers']
+            )
+            self.stdout.write(f"Refreshed {refreshed_count} Spotify access tokens")
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def refresh_expiring_tokens(self, margin, batch_size, workers):
+        expiring_user_ids = list(
+            User.objects.filter(
+                is_active=True,
+                spotify_refresh_token__isnull=False,
+                spotify_access_token_expires_at__lte=timezone.now() + margin,
+            ).order_by('spotify_access_token_expires_at').values_list('pk', flat=True)
+        )
+
+        def refresh(user):
+            try:
+                return ensure_fresh_spotify_access_token(user, margin)
+            finally:
+                # Worker threads each hold their own connection
+                connection.close()
+
+        refreshed_count = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for start in range(0, len(expiring_user_ids), batch_size):
+                batch = User.objects.filter(pk__in=expiring_user_ids[start:start + batch_size])
+                refreshed_count += sum(executor.map(refresh, batch))
+
+        return refreshed_count
@@ -0,0 +1,89 @@
+import logging
+import time
+from datetime import timedelta
+import requests
+from django.core.management.base import BaseCommand
+from spotipy.exceptions import SpotifyException
+from spotipy.oauth2 import SpotifyOauthError
+from core.cache_warming import UpstreamBudget, get_recently_active_users
+from core.playlist_sync import sync_spotify_user_playlists
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Sync active users' playlists and the tracks of playlists whose snapshot changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--active-within-minutes',
+            type=int,
+            default=1440,
+            help='Sync users who logged in or refreshed their token this recently (default: 1440)'
+        )
+        parser.add_argument(
+            '--max-users',
+            type=int,
+            default=0,
+            help='Sync at most this many users per sweep, most recently active first (default: no limit)'
+        )
+        parser.add_argument(
+            '--calls-per-second',
+            type=float,
+            default=1.0,
+            help='Average rate of Spotify calls the sync may make (default: 1)'
+        )
+        parser.add_argument(
+            '--min-headroom',
+            type=float,
+            default=0.5,
+            help='Only call Spotify while this fraction of the shared rate limit burst is unused (default: 0.5)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running and sweep every this many seconds (default: run once)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started_at = time.monotonic()
+            budget = UpstreamBudget(options['calls_per_second'], options['min_headroom'])
+            user_count, changed_count, page_count = self.sync_active_users(
+                budget,
+                active_within=timedelta(minutes=options['active_within_minutes']),
+                max_users=options['max_users']
+            )
+            self.stdout.write(
+                f"Synced {user_count} users: refetched {changed_count} changed playlists "
+                f"({page_count} pages) with {budget.calls} Spotify calls"
+            )
+
+            if not options['interval']:
+                break
+            time.sleep(max(0, options['interval'] - (time.monotonic() - started_at)))
+
+    def sync_active_users(self, budget, active_within, max_users):
+        users = get_recently_active_users(active_within)
+        if max_users:
+            users = users[:max_users]
+
+        user_count = 0
+        changed_count = 0
+        page_count = 0
+        for user in users:
+            try:
+                result = sync_spotify_user_playlists(user, budget)
+            except (SpotifyException, SpotifyOauthError, requests.RequestException) as e:
+                logger.warning('Error syncing playlists for user %s: %s', user.pk, e)
+                continue
+            if result is None:
+                continue
+
+            _, user_changed_count, user_page_count = result
+            user_count += 1
+            changed_count += user_changed_count
+            page_count += user_page_count
+
+        return user_count, changed_count, page_count
@@ -0,0 +1,72 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from core.cache_warming import UpstreamBudget, warm_active_users
+
+
+class Command(BaseCommand):
+    help = "Pre-fetch recently active users' playlist libraries and first playlist pages from Spotify"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--active-within-minutes',
+            type=int,
+            default=60,
+            help='Warm users who logged in or refreshed their token this recently (default: 60)'
+        )
+        parser.add_argument(
+            '--playlists-per-user',
+            type=int,
+            default=5,
+            help="Playlists, from the top of each user's library, to store the first page of (default: 5)"
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=20,
+            help='Tracks per stored page; match what clients request (default: 20)'
+        )
+        parser.add_argument(
+            '--max-users',
+            type=int,
+            default=0,
+            help='Warm at most this many users per sweep, most recently active first (default: no limit)'
+        )
+        parser.add_argument(
+            '--calls-per-second',
+            type=float,
+            default=1.0,
+            help='Average rate of Spotify calls the crawler may make (default: 1)'
+        )
+        parser.add_argument(
+            '--min-headroom',
+            type=float,
+            default=0.5,
+            help='Only call Spotify while this fraction of the shared rate limit burst is unused (default: 0.5)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running and sweep every this many seconds (default: run once)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started_at = time.monotonic()
+            budget = UpstreamBudget(options['calls_per_second'], options['min_headroom'])
+            user_count, page_count = warm_active_users(
+                budget,
+                active_within=timedelta(minutes=options['active_within_minutes']),
+                playlists_per_user=options['playlists_per_user'],
+                page_size=options['page_size'],
+                max_users=options['max_users']
+            )
+            self.stdout.write(
+                f"Warmed {user_count} users and {page_count} playlist pages "
+                f"with {budget.calls} Spotify calls"
+            )
+
+            if not options['interval']:
+                break
+            time.sleep(max(0, options['interval'] - (time.monotonic() - started_at)))
@@ -0,0 +1,283 @@
+"""
+Process-local metrics, aggregated across workers and exported in the
+Prometheus text format.
+
+Each process keeps its counters and histograms in memory and periodically
+writes them to its own file under settings.METRICS_DIR. A scrape merges every
+file in the directory, so the numbers cover all workers on the host. Files
+of exited processes are kept; removing them would make counters go
+backwards.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, registry, name, documentation, labelnames):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def label_values(self, labels):
+        return tuple(str(labels[labelname]) for labelname in self.labelnames)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self.registry.record(self, self.label_values(labels), amount)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        self.registry.record(self, self.label_values(labels), value)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._reset_process_state()
+
+    def _reset_process_state(self):
+        self._pid = os.getpid()
+        # Unique per process lifetime, so a recycled pid doesn't take over
+        # an old worker's counters
+        self._file_name = f'{self._pid}-{time.time_ns()}.json'
+        self._counters = {}
+        self._histograms = {}
+        self._flush_stop = None
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def record(self, metric, label_values, value):
+        if not settings.METRICS_ENABLED:
+            return
+
+        with self._lock:
+            if os.getpid() != self._pid:
+                # Forked: values inherited from the parent are the parent's to report
+                self._reset_process_state()
+            if self._flush_stop is None:
+                self._start_flushing()
+
+            key = (metric.name, label_values)
+            if metric.type == 'counter':
+                self._counters[key] = self._counters.get(key, 0) + value
+            else:
+                bucket_counts, total, count = self._histograms.get(key) or ([0] * (len(metric.buckets) + 1), 0.0, 0)
+                index = next(
+                    (index for index, bound in enumerate(metric.buckets) if value <= bound),
+                    len(metric.buckets)
+                )
+                bucket_counts[index] += 1
+                self._histograms[key] = (bucket_counts, total + value, count + 1)
+
+    def _start_flushing(self):
+        # Writing the file is left to a thread of its own so that requests,
+        # including async ones on the event loop, never wait on disk. Threads
+        # don't survive a fork, so each process starts its own.
+        self._flush_stop = threading.Event()
+        threading.Thread(
+            target=self._flush_periodically,
+            args=(self._flush_stop,),
+            name='metrics-flush',
+            daemon=True
+        ).start()
+
+    def _flush_periodically(self, stop):
+        while not stop.wait(settings.METRICS_FLUSH_INTERVAL_SECONDS):
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [
+                    [name, list(labels), list(bucket_counts), total, count]
+                    for (name, labels), (bucket_counts, total, count) in self._histograms.items()
+                ],
+            }
+
+    def flush(self):
+        """Write this process's metrics to its file in METRICS_DIR"""
+        with self._lock:
+            file_name = self._file_name
+
+        metrics_dir = settings.METRICS_DIR
+        path = os.path.join(metrics_dir, file_name)
+        try:
+            os.makedirs(metrics_dir, exist_ok=True)
+            temp_path = f'{path}.tmp'
+            with open(temp_path, 'w') as metrics_file:
+                json.dump(self.snapshot(), metrics_file, separators=(',', ':'))
+            # Readers never see a half-written file
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning('Could not write metrics to %s: %s', path, e)
+
+    def collect(self):
+        """
+        Merge the metrics of every process on the host.
+
+        Returns:
+            tuple: (counters, histograms) keyed by (name, label values)
+        """
+        self.flush()
+
+        counters = {}
+        histograms = {}
+        metrics_dir = settings.METRICS_DIR
+        try:
+            file_names = [name for name in os.listdir(metrics_dir) if name.endswith('.json')]
+        except OSError:
+            file_names = []
+
+        for file_name in file_names:
+            try:
+                with open(os.path.join(metrics_dir, file_name)) as metrics_file:
+                    process_metrics = json.load(metrics_file)
+            except (OSError, ValueError):
+                continue
+
+            for name, labels, value in process_metrics.get('counters', []):
+                key = (name, tuple(labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, bucket_counts, total, count in process_metrics.get('histograms', []):
+                key = (name, tuple(labels))
+                if key in histograms:
+                    merged_counts, merged_total, merged_count = histograms[key]
+                    bucket_counts = [a + b for a, b in zip(merged_counts, bucket_counts)]
+                    total, count = merged_total + total, merged_count + count
+                histograms[key] = (bucket_counts, total, count)
+
+        return counters, histograms
+
+    def render(self):
+        """Returns: str, all metrics in the Prometheus text exposition format"""
+        counters, histograms = self.collect()
+
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+
+            if metric.type == 'counter':
+                for (name, label_values), value in sorted(counters.items()):
+                    if name == metric.name:
+                        lines.append(f'{name}{format_labels(metric.labelnames, label_values)} {format_value(value)}')
+                continue
+
+            for (name, label_values), (bucket_counts, total, count) in sorted(histograms.items()):
+                if name != metric.name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip((*metric.buckets, '+Inf'), bucket_counts):
+                    cumulative += bucket_count
+                    labels = format_labels((*metric.labelnames, 'le'), (*label_values, format_value(bound)))
+                    lines.append(f'{name}_bucket{labels} {cumulative}')
+                labels = format_labels(metric.labelnames, label_values)
+                lines.append(f'{name}_sum{labels} {format_value(total)}')
+                lines.append(f'{name}_count{labels} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Forget this process's values and stop flushing them. For tests."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            if self._flush_stop is not None:
+                self._flush_stop.set()
+                self._flush_stop = None
+
+
+def format_value(value):
+    if isinstance(value, (str, int)):
+        return str(value)
+    return repr(float(value))
+
+
+def escape_label_value(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labelnames, label_values):
+    if not labelnames:
+        return ''
+    pairs = ','.join(
+        f'{labelname}="{escape_label_value(label_value)}"'
+        for labelname, label_value in zip(labelnames, label_values)
+    )
+    return f'{{{pairs}}}'
+
+
+registry = MetricsRegistry()
+
+request_duration_seconds = registry.histogram(
+    'noshuff_request_duration_seconds',
+    'Request latency by URL name.',
+    ('url_name', 'method')
+)
+requests_total = registry.counter(
+    'noshuff_requests_total',
+    'Requests by URL name and response status.',
+    ('url_name', 'method', 'status')
+)
+spotify_calls_total = registry.counter(
+    'noshuff_spotify_calls_total',
+    'Spotify API calls by spotipy method and response status.',
+    ('method', 'status')
+)
+spotify_call_duration_seconds = registry.histogram(
+    'noshuff_spotify_call_duration_seconds',
+    'Spotify API call latency by spotipy method, excluding rate limiter waits.',
+    ('method',)
+)
+spotify_rate_limited_total = registry.counter(
+    'noshuff_spotify_rate_limited_total',
+    'Spotify API calls answered with 429 Too Many Requests.',
+    ('method',)
+)
+spotify_retries_total = registry.counter(
+    'noshuff_spotify_retries_total',
+    'Spotify API calls retried after a 429.',
+    ('method',)
+)
+spotify_token_refreshes_total = registry.counter(
+    'noshuff_spotify_token_refreshes_total',
+    'Spotify access token refreshes by result.',
+    ('result',)
+)
+cache_requests_total = registry.counter(
+    'noshuff_cache_requests_total',
+    'Cache lookups by cache and result (hit or miss).',
+    ('cache', 'result')
+)
@@ -0,0 +1,141 @@
+import json
+import logging
+from time import perf_counter
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from core.metrics import request_duration_seconds, requests_total
+from core.request_timing import end_request_timings, start_request_timings, timed
+
+logger = logging.getLogger('core.request_timing')
+
+
+class ServerTimingMiddleware:
+    """
+    Break each request's time down by phase: Spotify calls, rate limit waits,
+    database queries, authentication, serialization and rendering.
+
+    The breakdown goes out as a Server-Timing header, which browser dev tools
+    display, and as one JSON log line on the core.request_timing logger.
+    Disabled unless settings.SERVER_TIMING_ENABLED, in which case Django drops
+    the middleware at startup.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        started_at = perf_counter()
+        timings, token = start_request_timings()
+        try:
+            install_query_timing()
+            response = self.get_response(request)
+        finally:
+            end_request_timings(token)
+
+        return self.add_timings(request, response, timings, started_at)
+
+    async def __acall__(self, request):
+        started_at = perf_counter()
+        timings, token = start_request_timings()
+        try:
+            # Queries run on sync_to_async's thread, on that thread's connections
+            await sync_to_async(install_query_timing)()
+            response = await self.get_response(request)
+        finally:
+            end_request_timings(token)
+
+        return self.add_timings(request, response, timings, started_at)
+
+    def add_timings(self, request, response, timings, started_at):
+        total_ms = (perf_counter() - started_at) * 1000
+        phases = timings.as_dict()
+
+        response['Server-Timing'] = format_server_timing(phases, total_ms)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 3),
+            'phases': phases,
+        }, separators=(',', ':')))
+
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Count requests and record their latency by URL name, so that paths with
+    ids in them share one series. Requests that match no URL are counted
+    under 'unmatched'.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        started_at = perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, perf_counter() - started_at)
+
+        return response
+
+    async def __acall__(self, request):
+        started_at = perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, perf_counter() - started_at)
+
+        return response
+
+    def record(self, request, response, duration):
+        resolver_match = getattr(request, 'resolver_match', None)
+        url_name = resolver_match.url_name if resolver_match and resolver_match.url_name else 'unmatched'
+        request_duration_seconds.observe(duration, url_name=url_name, method=request.method)
+        requests_total.inc(url_name=url_name, method=request.method, status=response.status_code)
+
+
+def install_query_timing():
+    """
+    Time queries on this thread's connections. The wrapper stays in place
+    rather than being removed after each request, since async requests share
+    sync_to_async's thread; outside a timed request it does nothing.
+    """
+    for connection in connections.all():
+        if time_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(time_query)
+
+
+def time_query(execute, sql, params, many, context):
+    with timed('db'):
+        return execute(sql, params, many, context)
+
+
+def format_server_timing(phases, total_ms):
+    metrics = [
+        f'{phase};dur={phase_timing["ms"]:.1f};desc="{phase_timing["count"]}x"'
+        for phase, phase_timing in phases.items()
+    ]
+    metrics.append(f'total;dur={total_ms:.1f}')
+
+    return ', '.join(metrics)
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.1 on 2026-10-18 09:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_user_personal_blurb'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpotifyPlaylist',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('spotify_id', models.CharField(max_length=100, unique=True)),
+                ('snapshot_id', models.CharField(max_length=200)),
+                ('name', models.CharField(max_length=500)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('image_url', models.URLField(blank=True, max_length=2000, null=True)),
+                ('owner_display_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('follower_count', models.IntegerField(blank=True, null=True)),
+                ('total_tracks', models.IntegerField(blank=True, null=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='SpotifyPlaylistTrack',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('position', models.PositiveIntegerField()),
+                ('track', models.JSONField(blank=True, null=True)),
+                ('playlist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='playlist_tracks', to='core.spotifyplaylist')),
+            ],
+            options={
+                'ordering': ['position'],
+                'constraints': [models.UniqueConstraint(fields=('playlist', 'position'), name='unique_spotify_playlist_track_position')],
+            },
+        ),
+    ]
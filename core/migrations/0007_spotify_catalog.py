@@ -0,0 +1,94 @@
+# Generated by Django 5.1.1 on 2026-10-18 09:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def clear_cached_playlist_tracks(apps, schema_editor):
+    # Cached rows hold raw track JSON that can't be mapped onto the catalog;
+    # they are refetched from Spotify on the next read.
+    SpotifyPlaylistTrack = apps.get_model('core', 'SpotifyPlaylistTrack')
+    SpotifyPlaylistTrack.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_spotifyplaylist_spotifyplaylisttrack'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpotifyAlbum',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('spotify_id', models.CharField(max_length=100, unique=True)),
+                ('name', models.CharField(max_length=500)),
+                ('image_url', models.URLField(blank=True, max_length=2000, null=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='SpotifyArtist',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('spotify_id', models.CharField(max_length=100, unique=True)),
+                ('name', models.CharField(max_length=500)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='SpotifyTrack',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('spotify_id', models.CharField(max_length=100, unique=True)),
+                ('name', models.CharField(max_length=500)),
+                ('duration_ms', models.IntegerField()),
+                ('album', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='tracks', to='core.spotifyalbum')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(clear_cached_playlist_tracks, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='spotifyplaylisttrack',
+            name='track',
+        ),
+        migrations.AddField(
+            model_name='spotifyplaylisttrack',
+            name='track',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='playlist_tracks', to='core.spotifytrack'),
+        ),
+        migrations.CreateModel(
+            name='SpotifyTrackArtist',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('artist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.spotifyartist')),
+                ('track', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='track_artists', to='core.spotifytrack')),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.AddField(
+            model_name='spotifytrack',
+            name='artists',
+            field=models.ManyToManyField(related_name='tracks', through='core.SpotifyTrackArtist', to='core.spotifyartist'),
+        ),
+        migrations.AddConstraint(
+            model_name='spotifytrackartist',
+            constraint=models.UniqueConstraint(fields=('track', 'artist'), name='unique_spotify_track_artist'),
+        ),
+    ]
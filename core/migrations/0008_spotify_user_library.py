@@ -0,0 +1,43 @@
+# Generated by Django 5.1.1 on 2026-10-18 10:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_spotify_catalog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='spotify_library_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='SpotifyUserPlaylist',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('spotify_id', models.CharField(max_length=100)),
+                ('position', models.PositiveIntegerField()),
+                ('snapshot_id', models.CharField(blank=True, max_length=200, null=True)),
+                ('name', models.CharField(max_length=500)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('image_url', models.URLField(blank=True, max_length=2000, null=True)),
+                ('owner_spotify_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('collaborative', models.BooleanField(default=False)),
+                ('track_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='spotify_library_playlists', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['position'],
+                'indexes': [models.Index(fields=['user', 'position'], name='core_spotif_user_id_34a558_idx'), models.Index(fields=['user', 'track_count'], name='core_spotif_user_id_a8e58c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'spotify_id'), name='unique_spotify_user_playlist')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+INDEX_NAME = 'core_spotify_user_playlist_name_trgm'
+
+
+def create_name_trigram_index(apps, schema_editor):
+    # Name search is a case-insensitive substring match (icontains), which
+    # Postgres runs as UPPER(name::text) LIKE UPPER(...); a trigram index on
+    # that expression serves it. Other databases fall back to a scan of the
+    # user's rows.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON core_spotifyuserplaylist '
+        'USING gin (UPPER(name::text) gin_trgm_ops)'
+    )
+
+
+def drop_name_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_spotify_user_library'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_name_trigram_index, drop_name_trigram_index),
+    ]
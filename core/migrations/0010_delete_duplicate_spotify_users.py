@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+def delete_duplicate_spotify_users(apps, schema_editor):
+    # Racing logins could create several users for one Spotify account. Keep
+    # the most recently updated, which holds the current Spotify tokens; the
+    # others' library copies go with them and their JWTs stop resolving.
+    User = apps.get_model('core', 'User')
+
+    duplicate_spotify_ids = list(
+        User.objects
+        .values('spotify_id')
+        .annotate(user_count=models.Count('id'))
+        .filter(user_count__gt=1)
+        .values_list('spotify_id', flat=True)
+    )
+    for spotify_id in duplicate_spotify_ids:
+        users = User.objects.filter(spotify_id=spotify_id).order_by('-updated_at', '-id')
+        User.objects.filter(spotify_id=spotify_id).exclude(pk=users[0].pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_spotify_user_playlist_name_trgm'),
+        # Deleting duplicates clears their outstanding tokens' user
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    # The unique constraint is added in the next migration: on PostgreSQL the
+    # cascading deletes leave deferred trigger events that an ALTER TABLE in
+    # the same transaction refuses to run with
+    operations = [
+        migrations.RunPython(delete_duplicate_spotify_users, migrations.RunPython.noop),
+    ]
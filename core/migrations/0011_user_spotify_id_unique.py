@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_delete_duplicate_spotify_users'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='spotify_id',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-18 10:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_user_spotify_id_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpotifyPlaylistVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('sequence', models.PositiveIntegerField()),
+                ('snapshot_id', models.CharField(max_length=200)),
+                ('checkpoint', models.JSONField(blank=True, null=True)),
+                ('ops', models.JSONField(blank=True, null=True)),
+                ('playlist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='core.spotifyplaylist')),
+            ],
+            options={
+                'ordering': ['sequence'],
+                'constraints': [models.UniqueConstraint(fields=('playlist', 'sequence'), name='unique_spotify_playlist_version_sequence'), models.UniqueConstraint(fields=('playlist', 'snapshot_id'), name='unique_spotify_playlist_version_snapshot')],
+            },
+        ),
+    ]
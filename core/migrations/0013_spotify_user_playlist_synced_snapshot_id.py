@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 10:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_spotify_playlist_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='spotifyuserplaylist',
+            name='synced_snapshot_id',
+            field=models.CharField(blank=True, max_length=200, null=True),
+        ),
+    ]
@@ -1,7 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 import uuid
-from spotipy import Spotify
+from asgiref.sync import sync_to_async
+from core.spotify_client import get_spotify_client
+from core.async_spotify_client import get_async_spotify_client
+from core.spotify_tokens import ensure_fresh_spotify_access_token
+from core.user_cache import invalidate_cached_user
 
 
 class TimestampModelMixin(models.Model):
@@ -27,6 +31,28 @@ class UserManager(BaseUserManager):
         extra_fields.setdefault('is_superuser', True)
         return self.create_user(email, password, **extra_fields)
 
+    def upsert_spotify_user(self, spotify_id, **fields):
+        """
+        Create or update the user with this Spotify id in one INSERT ... ON
+        CONFLICT statement, so concurrent logins can't race each other.
+
+        Returns:
+            User: With its pk and the given fields set. Other fields are the
+            model defaults rather than what's stored, so use it to identify
+            the user, or reload it.
+        """
+        user = self.model(spotify_id=spotify_id, **fields)
+        self.bulk_create(
+            [user],
+            update_conflicts=True,
+            unique_fields=['spotify_id'],
+            update_fields=[*fields, 'updated_at']
+        )
+        # bulk_create() skips save(), which would otherwise drop the cached copy
+        invalidate_cached_user(user)
+
+        return user
+
 class User(AbstractBaseUser, PermissionsMixin, TimestampModelMixin):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
@@ -43,7 +69,7 @@ class User(AbstractBaseUser, PermissionsMixin, TimestampModelMixin):
     spotify_access_token_expires_at = models.DateTimeField(blank=True, null=True)
     spotify_refresh_token = models.CharField(max_length=500, null=True, blank=True)
     
-    spotify_id = models.CharField(max_length=100)
+    spotify_id = models.CharField(max_length=100, unique=True)
     spotify_display_name = models.CharField(max_length=100)
     spotify_avatar_url = models.URLField(max_length=2000, null=True, blank=True)
     spotify_country = models.CharField(max_length=100, null=True, blank=True)
@@ -51,9 +77,200 @@ class User(AbstractBaseUser, PermissionsMixin, TimestampModelMixin):
     spotify_account_href = models.URLField(max_length=2000, null=True, blank=True)
     spotify_account_uri = models.CharField(max_length=200, null=True, blank=True)
     spotify_product = models.CharField(max_length=100, null=True, blank=True)
+    # When the local copy of the user's playlist library was last refreshed
+    spotify_library_synced_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidate_cached_user(self)
+
+    def delete(self, *args, **kwargs):
+        invalidate_cached_user(self)
+        return super().delete(*args, **kwargs)
+
     def get_spotify_client(self):
-        return Spotify(auth=self.spotify_access_token)
+        # Refresh just before expiry rather than paying for a 401 first
+        ensure_fresh_spotify_access_token(self)
+
+        return get_spotify_client(self.spotify_access_token)
+
+    async def aget_spotify_client(self):
+        await sync_to_async(ensure_fresh_spotify_access_token)(self)
+
+        return get_async_spotify_client(self.spotify_access_token)
+
+
+class SpotifyArtist(TimestampModelMixin):
+    spotify_id = models.CharField(max_length=100, unique=True)
+    name = models.CharField(max_length=500)
+
+    def __str__(self):
+        return self.name
+
+
+class SpotifyAlbum(TimestampModelMixin):
+    spotify_id = models.CharField(max_length=100, unique=True)
+    name = models.CharField(max_length=500)
+    image_url = models.URLField(max_length=2000, null=True, blank=True)
+
+    def __str__(self):
+        return self.name
+
+
+class SpotifyTrack(TimestampModelMixin):
+    spotify_id = models.CharField(max_length=100, unique=True)
+    name = models.CharField(max_length=500)
+    duration_ms = models.IntegerField()
+    album = models.ForeignKey(
+        SpotifyAlbum,
+        on_delete=models.PROTECT,
+        related_name='tracks'
+    )
+    artists = models.ManyToManyField(
+        SpotifyArtist,
+        through='SpotifyTrackArtist',
+        related_name='tracks'
+    )
+
+    def __str__(self):
+        return self.name
+
+
+class SpotifyTrackArtist(models.Model):
+    track = models.ForeignKey(
+        SpotifyTrack,
+        on_delete=models.CASCADE,
+        related_name='track_artists'
+    )
+    artist = models.ForeignKey(SpotifyArtist, on_delete=models.CASCADE)
+    # Spotify lists a track's artists in credit order
+    position = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['track', 'artist'],
+                name='unique_spotify_track_artist'
+            ),
+        ]
+
+
+class SpotifyPlaylist(TimestampModelMixin):
+    spotify_id = models.CharField(max_length=100, unique=True)
+    snapshot_id = models.CharField(max_length=200)
+
+    name = models.CharField(max_length=500)
+    description = models.TextField(blank=True, null=True)
+    image_url = models.URLField(max_length=2000, null=True, blank=True)
+    owner_display_name = models.CharField(max_length=100, null=True, blank=True)
+    follower_count = models.IntegerField(null=True, blank=True)
+    total_tracks = models.IntegerField(null=True, blank=True)
+
+    def __str__(self):
+        return self.name
+
+
+class SpotifyPlaylistTrack(TimestampModelMixin):
+    playlist = models.ForeignKey(
+        SpotifyPlaylist,
+        on_delete=models.CASCADE,
+        related_name='playlist_tracks'
+    )
+    position = models.PositiveIntegerField()
+    # Null when the playlist item is not a playable track (e.g. a podcast episode)
+    track = models.ForeignKey(
+        SpotifyTrack,
+        on_delete=models.PROTECT,
+        related_name='playlist_tracks',
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['playlist', 'position'],
+                name='unique_spotify_playlist_track_position'
+            ),
+        ]
+
+
+class SpotifyPlaylistVersion(TimestampModelMixin):
+    """
+    A past track order of a playlist, one row per snapshot_id seen. Orders
+    are lists of SpotifyTrack primary keys, with None for items that aren't
+    tracks. See core.playlist_history.
+    """
+    playlist = models.ForeignKey(
+        SpotifyPlaylist,
+        on_delete=models.CASCADE,
+        related_name='versions'
+    )
+    # Counts up from 0 per playlist, in the order the snapshots were seen
+    sequence = models.PositiveIntegerField()
+    snapshot_id = models.CharField(max_length=200)
+    # Full track order; null when the version is stored as ops instead
+    checkpoint = models.JSONField(null=True, blank=True)
+    # Edit script from the previous version's track order to this one
+    ops = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['sequence']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['playlist', 'sequence'],
+                name='unique_spotify_playlist_version_sequence'
+            ),
+            models.UniqueConstraint(
+                fields=['playlist', 'snapshot_id'],
+                name='unique_spotify_playlist_version_snapshot'
+            ),
+        ]
+
+
+class SpotifyUserPlaylist(TimestampModelMixin):
+    """
+    A playlist in a user's Spotify library, copied locally so the library
+    can be searched, filtered and sorted in the database.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='spotify_library_playlists'
+    )
+    spotify_id = models.CharField(max_length=100)
+    # Order of the playlist in the user's Spotify library
+    position = models.PositiveIntegerField()
+    snapshot_id = models.CharField(max_length=200, null=True, blank=True)
+    # Snapshot whose tracks the playlist sync last fetched in full, whether
+    # or not the catalog could store them all. Playlists with local files
+    # never are, and this keeps them from being refetched on every sync.
+    synced_snapshot_id = models.CharField(max_length=200, null=True, blank=True)
+
+    name = models.CharField(max_length=500)
+    description = models.TextField(blank=True, null=True)
+    image_url = models.URLField(max_length=2000, null=True, blank=True)
+    owner_spotify_id = models.CharField(max_length=100, null=True, blank=True)
+    collaborative = models.BooleanField(default=False)
+    track_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'spotify_id'],
+                name='unique_spotify_user_playlist'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'position']),
+            models.Index(fields=['user', 'track_count']),
+        ]
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,11 @@
+from rest_framework.permissions import BasePermission
+
+
+class IsSuperuser(BasePermission):
+    """
+    Superusers only. DRF's IsAdminUser checks is_staff, which User doesn't
+    have.
+    """
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and request.user.is_superuser)
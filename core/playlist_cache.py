@@ -0,0 +1,101 @@
+from django.db import transaction
+from core.models import SpotifyPlaylist, SpotifyPlaylistTrack
+from core.metrics import cache_requests_total
+from core.catalog import get_spotify_track_dicts, is_catalogable_track, upsert_spotify_tracks
+
+
+def get_cached_playlist_page(playlist_data, offset: int, limit: int):
+    """
+    Serve a page of playlist tracks from the local catalog.
+
+    Rows are only trusted while the stored snapshot_id matches the one Spotify
+    just reported for the playlist, and only if every position in the page
+    has been stored.
+
+    Returns:
+        tuple: (total_tracks, tracks) or None on a cache miss
+    """
+    page = _get_cached_playlist_page(playlist_data, offset, limit)
+    cache_requests_total.inc(cache='playlist_page', result='miss' if page is None else 'hit')
+
+    return page
+
+
+def _get_cached_playlist_page(playlist_data, offset, limit):
+    snapshot_id = playlist_data.get('snapshot_id')
+    if not snapshot_id:
+        return None
+
+    playlist = SpotifyPlaylist.objects.filter(
+        spotify_id=playlist_data['id'],
+        snapshot_id=snapshot_id
+    ).first()
+    if playlist is None or playlist.total_tracks is None:
+        return None
+
+    expected_count = max(0, min(offset + limit, playlist.total_tracks) - offset)
+    rows = list(
+        playlist.playlist_tracks
+        .filter(position__gte=offset, position__lt=offset + limit)
+        .values_list('track_id', flat=True)
+    )
+    if len(rows) != expected_count:
+        return None
+
+    return playlist.total_tracks, get_spotify_track_dicts([pk for pk in rows if pk])
+
+
+def get_playlist_image_url(playlist_data):
+    images = playlist_data.get('images') or []
+    return images[0]['url'] if images else None
+
+
+def cache_playlist_page(playlist_data, offset: int, tracks_response):
+    """
+    Store a page of playlist items fetched from Spotify under the playlist's
+    current snapshot_id. Rows stored under any other snapshot are discarded.
+    """
+    snapshot_id = playlist_data.get('snapshot_id')
+    if not snapshot_id:
+        return
+
+    tracks = [item['track'] for item in tracks_response['items'] if item.get('track')]
+    if not all(is_catalogable_track(track) for track in tracks):
+        # Rows for this page would come back short of the uncatalogable tracks
+        return
+
+    playlist_fields = {
+        'snapshot_id': snapshot_id,
+        'name': playlist_data.get('name') or '',
+        'description': playlist_data.get('description'),
+        'image_url': get_playlist_image_url(playlist_data),
+        'owner_display_name': (playlist_data.get('owner') or {}).get('display_name'),
+        'follower_count': (playlist_data.get('followers') or {}).get('total'),
+        'total_tracks': tracks_response['total'],
+    }
+
+    with transaction.atomic():
+        track_pks = upsert_spotify_tracks(tracks)
+
+        playlist, created = SpotifyPlaylist.objects.select_for_update().get_or_create(
+            spotify_id=playlist_data['id'],
+            defaults=playlist_fields
+        )
+        if not created:
+            if playlist.snapshot_id != snapshot_id:
+                playlist.playlist_tracks.all().delete()
+            for field, value in playlist_fields.items():
+                setattr(playlist, field, value)
+            playlist.save()
+
+        SpotifyPlaylistTrack.objects.bulk_create(
+            [
+                SpotifyPlaylistTrack(
+                    playlist=playlist,
+                    position=offset + index,
+                    track_id=track_pks[item['track']['id']] if item.get('track') else None
+                )
+                for index, item in enumerate(tracks_response['items'])
+            ],
+            ignore_conflicts=True
+        )
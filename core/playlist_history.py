@@ -0,0 +1,243 @@
+"""
+History of the track order of playlists, stored compactly.
+
+Each snapshot_id seen for a playlist is stored as a SpotifyPlaylistVersion.
+Every settings.PLAYLIST_HISTORY_CHECKPOINT_INTERVAL-th version holds the
+full track order. The versions in between hold an edit script against the
+version before them, so storage grows with the changes made rather than
+with the length of the playlist. Any version is rebuilt from the checkpoint
+at or before it plus at most CHECKPOINT_INTERVAL - 1 scripts.
+
+Edit scripts are lists of ops, applied in order:
+    ['d', index, count]   delete count items starting at index
+    ['m', from, to]       take the item at from and put it back at to
+    ['i', index, items]   insert items at index
+"""
+import bisect
+from collections import defaultdict, deque
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Subquery
+from core.models import SpotifyPlaylist, SpotifyPlaylistVersion
+
+
+def get_longest_increasing_subsequence(values):
+    """
+    Args:
+        values (list): Distinct, comparable values
+
+    Returns:
+        set: The values in one of the longest strictly increasing subsequences
+    """
+    tail_values = []
+    tail_indexes = []
+    previous = [None] * len(values)
+    for index, value in enumerate(values):
+        length = bisect.bisect_left(tail_values, value)
+        previous[index] = tail_indexes[length - 1] if length else None
+        if length == len(tail_values):
+            tail_values.append(value)
+            tail_indexes.append(index)
+        else:
+            tail_values[length] = value
+            tail_indexes[length] = index
+
+    subsequence = set()
+    index = tail_indexes[-1] if tail_indexes else None
+    while index is not None:
+        subsequence.add(values[index])
+        index = previous[index]
+
+    return subsequence
+
+
+def diff_track_orders(old, new):
+    """
+    Edit script turning the old track order into the new one.
+
+    Items in both orders are paired up, the k-th occurrence in old with the
+    k-th in new. Unpaired old items are deleted and unpaired new ones
+    inserted. Of the paired items, those in the longest run already in the
+    right relative order stay put and the rest are moved, so a track dragged
+    elsewhere in the playlist costs a single op.
+
+    Returns:
+        list: Ops for apply_track_order_ops, or None if the script would be
+        no smaller than a full copy of the new order
+    """
+    old_indexes = defaultdict(deque)
+    for index, item in enumerate(old):
+        old_indexes[item].append(index)
+
+    # Index in new that each old item ends up at, or None if it's deleted
+    targets = [None] * len(old)
+    inserted = []
+    for new_index, item in enumerate(new):
+        if old_indexes[item]:
+            targets[old_indexes[item].popleft()] = new_index
+        else:
+            inserted.append(new_index)
+
+    ops = []
+    # Deleted runs, last first so the indexes of earlier runs stay valid
+    index = len(old)
+    while index > 0:
+        index -= 1
+        if targets[index] is None:
+            end = index + 1
+            while index > 0 and targets[index - 1] is None:
+                index -= 1
+            ops.append(['d', index, end - index])
+
+    order = [target for target in targets if target is not None]
+    in_place = get_longest_increasing_subsequence(order)
+    # Deletes and moves store two indexes each; a full copy stores one per item
+    if 2 * (len(ops) + len(order) - len(in_place)) + len(inserted) >= len(new):
+        return None
+
+    # Moved items go right after the closest lower item already in place,
+    # which keeps the items in place sorted until every item is
+    placed = sorted(in_place)
+    for target in sorted(set(order) - in_place):
+        from_index = order.index(target)
+        del order[from_index]
+        position = bisect.bisect_left(placed, target)
+        to_index = order.index(placed[position - 1]) + 1 if position else 0
+        order.insert(to_index, target)
+        placed.insert(position, target)
+        if to_index != from_index:
+            ops.append(['m', from_index, to_index])
+
+    # Every position before an insert is filled by then, so new indexes apply as-is
+    for new_index in inserted:
+        if ops and ops[-1][0] == 'i' and ops[-1][1] + len(ops[-1][2]) == new_index:
+            ops[-1][2].append(new[new_index])
+        else:
+            ops.append(['i', new_index, [new[new_index]]])
+
+    return ops
+
+
+def apply_track_order_ops(order, ops):
+    """Returns: list: The order after applying the ops from diff_track_orders"""
+    order = list(order)
+    for op in ops:
+        if op[0] == 'd':
+            del order[op[1]:op[1] + op[2]]
+        elif op[0] == 'm':
+            order.insert(op[2], order.pop(op[1]))
+        elif op[0] == 'i':
+            order[op[1]:op[1]] = op[2]
+        else:
+            raise ValueError(f'Unknown track order op: {op[0]}')
+
+    return order
+
+
+def build_track_order(playlist_id, sequence):
+    """Rebuild a version from the checkpoint at or before it and the scripts since"""
+    versions = SpotifyPlaylistVersion.objects.filter(playlist_id=playlist_id, sequence__lte=sequence)
+    checkpoint_sequence = versions \
+        .filter(checkpoint__isnull=False) \
+        .order_by('-sequence') \
+        .values('sequence')[:1]
+
+    order = None
+    for checkpoint, ops in versions \
+            .filter(sequence__gte=Subquery(checkpoint_sequence)) \
+            .order_by('sequence') \
+            .values_list('checkpoint', 'ops'):
+        order = checkpoint if checkpoint is not None else apply_track_order_ops(order, ops)
+
+    return order
+
+
+def get_playlist_track_order(playlist, snapshot_id):
+    """
+    Returns:
+        list: SpotifyTrack primary keys, or None for non-track items, in the
+        order the playlist had at snapshot_id. None if that snapshot wasn't
+        recorded.
+    """
+    sequence = playlist.versions.filter(snapshot_id=snapshot_id).values_list('sequence', flat=True).first()
+    if sequence is None:
+        return None
+
+    return build_track_order(playlist.pk, sequence)
+
+
+def record_playlist_version(playlist, snapshot_id, track_order):
+    """
+    Store the playlist's track order at snapshot_id, unless already stored.
+
+    Returns:
+        SpotifyPlaylistVersion: The new version, or None if it was stored already
+    """
+    with transaction.atomic():
+        # Serializes versions of the playlist so sequences don't collide
+        SpotifyPlaylist.objects.select_for_update().filter(pk=playlist.pk).exists()
+
+        if playlist.versions.filter(snapshot_id=snapshot_id).exists():
+            return None
+
+        latest_sequence = playlist.versions.order_by('-sequence').values_list('sequence', flat=True).first()
+        sequence = 0 if latest_sequence is None else latest_sequence + 1
+
+        ops = None
+        if sequence % settings.PLAYLIST_HISTORY_CHECKPOINT_INTERVAL:
+            ops = diff_track_orders(build_track_order(playlist.pk, latest_sequence), track_order)
+
+        return SpotifyPlaylistVersion.objects.create(
+            playlist=playlist,
+            sequence=sequence,
+            snapshot_id=snapshot_id,
+            checkpoint=list(track_order) if ops is None else None,
+            ops=ops
+        )
+
+
+def record_stored_playlist_version(spotify_id):
+    """
+    Record the track order stored in the catalog for the playlist, if every
+    track of its current snapshot is stored.
+
+    Returns:
+        SpotifyPlaylistVersion: The new version, or None
+    """
+    playlist = SpotifyPlaylist.objects.filter(spotify_id=spotify_id).first()
+    if playlist is None:
+        return None
+
+    track_order = list(playlist.playlist_tracks.values_list('track_id', flat=True))
+    if len(track_order) != playlist.total_tracks:
+        return None
+
+    return record_playlist_version(playlist, playlist.snapshot_id, track_order)
+
+
+def record_stored_playlist_versions(spotify_ids):
+    """
+    Record the stored track order of each of the playlists whose current
+    snapshot is stored in full but isn't in its history yet. Snapshots
+    stored by the playlist detail view or the cache-warming crawler reach
+    the history this way.
+
+    Returns:
+        int: Versions recorded
+    """
+    unrecorded_spotify_ids = list(
+        SpotifyPlaylist.objects
+        .filter(spotify_id__in=spotify_ids)
+        .filter(~Exists(SpotifyPlaylistVersion.objects.filter(
+            playlist=OuterRef('pk'),
+            snapshot_id=OuterRef('snapshot_id')
+        )))
+        .annotate(stored_tracks=Count('playlist_tracks'))
+        .filter(stored_tracks=F('total_tracks'))
+        .values_list('spotify_id', flat=True)
+    )
+
+    return sum(
+        record_stored_playlist_version(spotify_id) is not None
+        for spotify_id in unrecorded_spotify_ids
+    )
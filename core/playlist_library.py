@@ -0,0 +1,334 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from core.metrics import cache_requests_total
+from core.models import SpotifyUserPlaylist, User
+from core.playlist_cache import get_playlist_image_url
+from core.single_flight import get_spotify_single_flight
+from core.user_cache import invalidate_cached_user
+from core.spotipy_utils import fetch_spotify_user_playlists, get_spotify_user_playlists
+
+logger = logging.getLogger(__name__)
+
+LIBRARY_QUERY_PARAMS = (
+    'q',
+    'only_owned_by_user',
+    'only_non_collaborative',
+    'min_tracks',
+    'max_tracks',
+    'sort',
+)
+
+# Copied from the Spotify listing; a playlist is rewritten when any differ
+LIBRARY_SYNC_FIELDS = (
+    'position',
+    'snapshot_id',
+    'name',
+    'description',
+    'image_url',
+    'owner_spotify_id',
+    'collaborative',
+    'track_count',
+)
+
+# Ties are broken by library order so results are stable
+LIBRARY_SORTS = {
+    'position': ('position',),
+    'name': (Lower('name'), 'position'),
+    '-name': (Lower('name').desc(), 'position'),
+    'track_count': ('track_count', 'position'),
+    '-track_count': ('-track_count', 'position'),
+}
+
+TRUE_VALUES = ('true', '1', 'yes')
+FALSE_VALUES = ('false', '0', 'no')
+
+
+def is_library_query(params):
+    return any(param in params for param in LIBRARY_QUERY_PARAMS)
+
+
+def _parse_bool(params, name, default):
+    value = params.get(name)
+    if value is None:
+        return default
+    if value.lower() in TRUE_VALUES:
+        return True
+    if value.lower() in FALSE_VALUES:
+        return False
+    raise ValueError(f'{name} must be true or false')
+
+
+def _parse_count(params, name):
+    value = params.get(name)
+    if value is None:
+        return None
+    try:
+        count = int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer')
+    if count < 0:
+        raise ValueError(f'{name} must not be negative')
+    return count
+
+
+def parse_library_query(params):
+    """
+    Parse the playlist library search parameters.
+
+    Returns:
+        dict: Keyword arguments for search_spotify_user_library
+
+    Raises:
+        ValueError: if a parameter is malformed
+    """
+    sort = params.get('sort', 'position')
+    if sort not in LIBRARY_SORTS:
+        raise ValueError(f"sort must be one of: {', '.join(LIBRARY_SORTS)}")
+
+    return {
+        'q': params.get('q', '').strip() or None,
+        'only_owned_by_user': _parse_bool(params, 'only_owned_by_user', True),
+        'only_non_collaborative': _parse_bool(params, 'only_non_collaborative', True),
+        'min_tracks': _parse_count(params, 'min_tracks'),
+        'max_tracks': _parse_count(params, 'max_tracks'),
+        'sort': sort,
+    }
+
+
+def is_spotify_user_library_fresh(user, max_age=None):
+    if max_age is None:
+        max_age = settings.SPOTIFY_LIBRARY_SYNC_MAX_AGE_SECONDS
+
+    synced_at = user.spotify_library_synced_at
+    return synced_at is not None and timezone.now() - synced_at < timedelta(seconds=max_age)
+
+
+def fetch_spotify_user_library(user, budget=None):
+    """
+    Fetch every playlist in the user's library from Spotify, unfiltered.
+
+    Args:
+        budget (UpstreamBudget): If given, the listing is fetched one page at
+            a time and the budget is waited on before each page, instead of
+            fanning out over the pages at once
+
+    Returns:
+        list: Spotify playlist objects in library order, or None if Spotify
+        returned an error
+    """
+    if budget is not None:
+        return fetch_spotify_user_playlists(user, max_workers=1, before_page=budget.wait)
+
+    # The copy holds every playlist; the owned/collaborative toggles are
+    # applied when it is queried
+    return get_spotify_user_playlists(
+        user,
+        only_owned_by_user=False,
+        only_non_collaborative=False
+    )
+
+
+def refresh_spotify_user_library(user, max_age=None, budget=None):
+    """
+    Refresh the local copy of the user's playlist library from Spotify if it
+    is older than max_age seconds.
+
+    Args:
+        budget (UpstreamBudget): Waited on before each listing page, if given
+
+    Returns:
+        bool: Whether a local copy is available. A stale copy is kept and
+        served when Spotify returns an error.
+    """
+    if is_spotify_user_library_fresh(user, max_age):
+        cache_requests_total.inc(cache='user_library', result='hit')
+        return True
+
+    cache_requests_total.inc(cache='user_library', result='miss')
+
+    playlists = fetch_spotify_user_library(user, budget)
+    if playlists is None:
+        return user.spotify_library_synced_at is not None
+
+    get_spotify_single_flight().do(
+        ('user_library', user.pk),
+        sync_spotify_user_library,
+        user,
+        playlists
+    )
+    return True
+
+
+_background_executor = None
+_background_lock = threading.Lock()
+# Users with a background refresh queued or running, so a burst of searches
+# queues one refresh
+_refreshing_user_ids = set()
+
+
+def run_in_background(fn, *args):
+    global _background_executor
+
+    with _background_lock:
+        if _background_executor is None:
+            _background_executor = ThreadPoolExecutor(
+                max_workers=settings.SPOTIFY_LIBRARY_REFRESH_WORKERS,
+                thread_name_prefix='library-refresh'
+            )
+
+    _background_executor.submit(fn, *args)
+
+
+def _refresh_spotify_user_library_in_background(user_id):
+    try:
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None:
+            refresh_spotify_user_library(user)
+    except Exception:
+        logger.exception('Error refreshing the playlist library of user %s', user_id)
+    finally:
+        with _background_lock:
+            _refreshing_user_ids.discard(user_id)
+        # Worker threads each hold their own connection
+        connection.close()
+
+
+def ensure_spotify_user_library(user, max_age=None):
+    """
+    Make sure there is a local copy of the user's playlist library to query.
+
+    A stale copy is served as is while a refresh runs in the background, so
+    queries don't wait on a full library fetch and rewrite. Only a user
+    with no copy yet waits for Spotify.
+
+    Returns:
+        bool: Whether a local copy is available
+    """
+    if user.spotify_library_synced_at is None:
+        return refresh_spotify_user_library(user, max_age)
+
+    if is_spotify_user_library_fresh(user, max_age):
+        cache_requests_total.inc(cache='user_library', result='hit')
+        return True
+
+    cache_requests_total.inc(cache='user_library', result='stale')
+    with _background_lock:
+        queued = user.pk in _refreshing_user_ids
+        _refreshing_user_ids.add(user.pk)
+    if not queued:
+        run_in_background(_refresh_spotify_user_library_in_background, user.pk)
+
+    return True
+
+
+def sync_spotify_user_library(user, playlists):
+    """
+    Bring the local copy of the user's playlist library in line with Spotify,
+    writing only the playlists that were added, changed or moved. When
+    nothing changed, only the sync time is stamped.
+
+    Args:
+        user: NoShuff user the library belongs to
+        playlists (list): Spotify playlist objects, in library order
+
+    Returns:
+        tuple: (playlists written, playlists deleted)
+    """
+    synced_at = timezone.now()
+    rows = {
+        playlist['id']: SpotifyUserPlaylist(
+            user=user,
+            spotify_id=playlist['id'],
+            position=position,
+            snapshot_id=playlist.get('snapshot_id'),
+            name=playlist.get('name') or '',
+            description=playlist.get('description'),
+            image_url=get_playlist_image_url(playlist),
+            owner_spotify_id=(playlist.get('owner') or {}).get('id'),
+            collaborative=bool(playlist.get('collaborative')),
+            track_count=(playlist.get('tracks') or {}).get('total') or 0,
+        )
+        for position, playlist in enumerate(playlists)
+    }
+
+    with transaction.atomic():
+        # Serialises syncs of the same library across processes
+        User.objects.select_for_update().filter(pk=user.pk).exists()
+
+        stored_rows = {
+            row[0]: row[1:]
+            for row in SpotifyUserPlaylist.objects.filter(user=user).values_list(
+                'spotify_id', *LIBRARY_SYNC_FIELDS
+            )
+        }
+        changed_rows = [
+            row for spotify_id, row in rows.items()
+            if stored_rows.get(spotify_id) != tuple(getattr(row, field) for field in LIBRARY_SYNC_FIELDS)
+        ]
+        removed_spotify_ids = stored_rows.keys() - rows.keys()
+
+        if removed_spotify_ids:
+            SpotifyUserPlaylist.objects.filter(user=user, spotify_id__in=removed_spotify_ids).delete()
+        if changed_rows:
+            SpotifyUserPlaylist.objects.bulk_create(
+                changed_rows,
+                batch_size=settings.SPOTIFY_CATALOG_UPSERT_BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['user', 'spotify_id'],
+                update_fields=[*LIBRARY_SYNC_FIELDS, 'updated_at']
+            )
+        # update() leaves updated_at, and so the user's ETag, alone
+        User.objects.filter(pk=user.pk).update(spotify_library_synced_at=synced_at)
+        invalidate_cached_user(user)
+
+    user.spotify_library_synced_at = synced_at
+
+    return len(changed_rows), len(removed_spotify_ids)
+
+
+def search_spotify_user_library(
+    user,
+    q=None,
+    only_owned_by_user=True,
+    only_non_collaborative=True,
+    min_tracks=None,
+    max_tracks=None,
+    sort='position'
+):
+    """
+    Search the local copy of the user's playlist library.
+
+    Args:
+        user: NoShuff user whose library is searched
+        q (str): Case-insensitive substring of the playlist name
+        only_owned_by_user (bool): Drop playlists owned by someone else
+        only_non_collaborative (bool): Drop collaborative playlists
+        min_tracks (int): Smallest track count to include
+        max_tracks (int): Largest track count to include
+        sort (str): One of LIBRARY_SORTS
+
+    Returns:
+        QuerySet: Rows as dicts with the fields the playlist summary needs
+    """
+    playlists = SpotifyUserPlaylist.objects.filter(user=user)
+
+    if q:
+        playlists = playlists.filter(name__icontains=q)
+    if only_owned_by_user:
+        playlists = playlists.filter(owner_spotify_id=user.spotify_id)
+    if only_non_collaborative:
+        playlists = playlists.filter(collaborative=False)
+    if min_tracks is not None:
+        playlists = playlists.filter(track_count__gte=min_tracks)
+    if max_tracks is not None:
+        playlists = playlists.filter(track_count__lte=max_tracks)
+
+    return playlists.order_by(*LIBRARY_SORTS[sort]).values(
+        'spotify_id', 'snapshot_id', 'name', 'description', 'image_url', 'track_count'
+    )
@@ -0,0 +1,149 @@
+"""
+Incremental sync of a user's playlists into the local library copy and the
+catalog, driven by snapshot_ids.
+
+The playlist listing carries each playlist's current snapshot_id. Only
+playlists whose tracks aren't already stored in full under that snapshot,
+and weren't already fetched under it, are refetched, so a sync costs the
+listing pages plus the pages of playlists that changed. For users whose playlists are all unchanged, the
+only write is the library's sync time. Each track order stored in full is
+recorded in the playlist's history, including snapshots that were stored
+by other paths first and so aren't refetched.
+"""
+import logging
+from django.db.models import Count
+from spotipy.exceptions import SpotifyException
+from core.models import SpotifyPlaylist, SpotifyUserPlaylist
+from core.playlist_cache import cache_playlist_page
+from core.playlist_history import record_stored_playlist_version, record_stored_playlist_versions
+from core.playlist_library import fetch_spotify_user_library, sync_spotify_user_library
+from core.single_flight import get_spotify_single_flight
+from core.spotify_gateway import call_spotify
+from core.spotipy_utils import SPOTIFY_PLAYLIST_TRACKS_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Most items Spotify returns per playlist tracks page
+SPOTIFY_PLAYLIST_TRACKS_PAGE_LIMIT = 100
+
+
+def get_stale_playlists(playlists, synced_snapshot_ids=None):
+    """
+    Playlists from the listing whose tracks aren't all stored in the catalog
+    under their current snapshot_id. Playlists with local files can't be
+    stored, so they're stale unless already fetched under that snapshot.
+
+    Args:
+        synced_snapshot_ids (dict): Snapshot each playlist's tracks were
+            last fetched under, by Spotify id
+
+    Returns:
+        list: The stale playlists, in listing order
+    """
+    synced_snapshot_ids = synced_snapshot_ids or {}
+    stored = {
+        spotify_id: (snapshot_id, total_tracks, stored_tracks)
+        for spotify_id, snapshot_id, total_tracks, stored_tracks in (
+            SpotifyPlaylist.objects
+            .filter(spotify_id__in=[playlist['id'] for playlist in playlists])
+            .annotate(stored_tracks=Count('playlist_tracks'))
+            .values_list('spotify_id', 'snapshot_id', 'total_tracks', 'stored_tracks')
+        )
+    }
+
+    def is_stale(playlist):
+        snapshot_id = playlist.get('snapshot_id')
+        if snapshot_id and synced_snapshot_ids.get(playlist['id']) == snapshot_id:
+            return False
+        if playlist['id'] not in stored:
+            return True
+        snapshot_id, total_tracks, stored_tracks = stored[playlist['id']]
+        return snapshot_id != playlist.get('snapshot_id') or total_tracks != stored_tracks
+
+    return [playlist for playlist in playlists if is_stale(playlist)]
+
+
+def sync_spotify_playlist_tracks(spotify_client, playlist_data, budget=None):
+    """
+    Store every track of a playlist in the catalog under the snapshot_id in
+    playlist_data, replacing tracks stored under an older one, and record
+    the new track order in the playlist's history.
+
+    Args:
+        budget (UpstreamBudget): Waited on before each Spotify call, if given
+
+    Returns:
+        int: Pages fetched from Spotify
+    """
+    offset = 0
+    page_count = 0
+    while True:
+        if budget is not None:
+            budget.wait()
+        tracks_response = call_spotify(
+            spotify_client.playlist_tracks,
+            playlist_data['id'],
+            offset=offset,
+            limit=SPOTIFY_PLAYLIST_TRACKS_PAGE_LIMIT,
+            additional_types=['track'],
+            fields=SPOTIFY_PLAYLIST_TRACKS_FIELDS
+        )
+        cache_playlist_page(playlist_data, offset, tracks_response)
+        page_count += 1
+
+        offset += SPOTIFY_PLAYLIST_TRACKS_PAGE_LIMIT
+        if offset >= tracks_response['total']:
+            record_stored_playlist_version(playlist_data['id'])
+            return page_count
+
+
+def sync_spotify_user_playlists(user, budget=None):
+    """
+    Sync the user's playlist library and the tracks of every playlist in it
+    whose snapshot changed since the last sync.
+
+    Args:
+        user: NoShuff user whose library is synced
+        budget (UpstreamBudget): Waited on before each Spotify call, if given
+
+    Returns:
+        tuple: (playlists in the library, playlists whose tracks were
+        refetched, track pages fetched), or None if Spotify returned an error
+        for the listing
+    """
+    playlists = fetch_spotify_user_library(user, budget)
+    if playlists is None:
+        return None
+
+    get_spotify_single_flight().do(
+        ('user_library', user.pk),
+        sync_spotify_user_library,
+        user,
+        playlists
+    )
+
+    synced_snapshot_ids = dict(
+        SpotifyUserPlaylist.objects
+        .filter(user=user, synced_snapshot_id__isnull=False)
+        .values_list('spotify_id', 'synced_snapshot_id')
+    )
+    stale_playlists = get_stale_playlists(playlists, synced_snapshot_ids)
+    page_count = 0
+    if stale_playlists:
+        spotify_client = user.get_spotify_client()
+        for playlist in stale_playlists:
+            try:
+                page_count += sync_spotify_playlist_tracks(spotify_client, playlist, budget)
+            except SpotifyException as e:
+                if e.http_status == 429:
+                    raise
+                # Some listed playlists can't be read, e.g. when made private
+                logger.warning('Error syncing tracks of playlist %s: %s', playlist['id'], e)
+                continue
+
+            SpotifyUserPlaylist.objects.filter(user=user, spotify_id=playlist['id']) \
+                .update(synced_snapshot_id=playlist.get('snapshot_id'))
+
+    record_stored_playlist_versions([playlist['id'] for playlist in playlists])
+
+    return len(playlists), len(stale_playlists), page_count
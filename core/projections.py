@@ -0,0 +1,135 @@
+"""
+Fast-path equivalents of the Spotify serializers in core.serializers.
+
+The DRF serializers resolve every field through the generic field machinery
+(get_attribute, to_representation, SerializerMethodField dispatch) on every
+object. The functions here bind each field's source and conversion up front
+and build the output dicts directly. Their output is identical to the
+serializers', which stay the source of truth for the response shape; the
+parity tests in core/tests/test_projections.py keep the two in step.
+
+Each projection also takes an optional sparse fieldset (see
+core.sparse_fields). With one, only the selected fields are read from the
+Spotify object, which may have been fetched with only those fields.
+"""
+from core.sparse_fields import get_nested_fields
+
+
+def _str(value):
+    # CharField.to_representation, with the serializer's None passthrough
+    return None if value is None else str(value)
+
+
+def _int(value):
+    return None if value is None else int(value)
+
+
+def _first_image_url(images):
+    return images[0]['url'] if images else None
+
+
+def _project_fields(obj, getters, fields):
+    return {name: getter(obj) for name, getter in getters.items() if name in fields}
+
+
+PLAYLIST_SUMMARY_GETTERS = {
+    'id': lambda playlist: _str(playlist['id']),
+    'name': lambda playlist: _str(playlist['name']),
+    'description': lambda playlist: _str(playlist['description']),
+    'image_url': lambda playlist: _first_image_url(playlist.get('images', [])),
+    'track_count': lambda playlist: _int(playlist['tracks']['total']),
+}
+
+TRACK_GETTERS = {
+    'id': lambda track: _str(track['id']),
+    'name': lambda track: _str(track['name']),
+    'duration_ms': lambda track: _int(track['duration_ms']),
+    'artists': lambda track: [artist['name'] for artist in track['artists']],
+    'album': lambda track: _str(track['album']['name']),
+    'album_image_url': lambda track: _first_image_url(track['album']['images']),
+}
+
+PLAYLIST_DETAIL_GETTERS = {
+    'id': lambda playlist: _str(playlist['id']),
+    'name': lambda playlist: _str(playlist['name']),
+    'description': lambda playlist: _str(playlist['description']),
+    'followers': lambda playlist: _int(playlist['followers']['total']),
+    'total_tracks': lambda playlist: _int(playlist['total_tracks']),
+    'image_url': lambda playlist: _first_image_url(playlist.get('images', [])),
+}
+
+
+def project_playlist_summary(playlist, fields=None):
+    """Same output as SpotifyPlaylistSummarySerializer(playlist).data"""
+    if fields is not None:
+        return _project_fields(playlist, PLAYLIST_SUMMARY_GETTERS, fields)
+
+    return {
+        'id': _str(playlist['id']),
+        'name': _str(playlist['name']),
+        'description': _str(playlist['description']),
+        'image_url': _first_image_url(playlist.get('images', [])),
+        'track_count': _int(playlist['tracks']['total']),
+    }
+
+
+def project_playlist_summaries(playlists, fields=None):
+    """Same output as SpotifyPlaylistSummarySerializer(playlists, many=True).data"""
+    if playlists is None:
+        return []
+    return [project_playlist_summary(playlist, fields) for playlist in playlists]
+
+
+LIBRARY_PLAYLIST_SUMMARY_GETTERS = {
+    'id': lambda row: row['spotify_id'],
+    'name': lambda row: row['name'],
+    'description': lambda row: row['description'],
+    'image_url': lambda row: row['image_url'],
+    'track_count': lambda row: row['track_count'],
+}
+
+
+def project_library_playlist_summaries(rows, fields=None):
+    """
+    Same output as project_playlist_summaries, for rows of the local
+    playlist library (see core.playlist_library.search_spotify_user_library)
+    """
+    if fields is None:
+        fields = LIBRARY_PLAYLIST_SUMMARY_GETTERS
+    return [_project_fields(row, LIBRARY_PLAYLIST_SUMMARY_GETTERS, fields) for row in rows]
+
+
+def project_track(track, fields=None):
+    """Same output as SpotifyTrackSerializer(track).data"""
+    if fields is not None:
+        return _project_fields(track, TRACK_GETTERS, fields)
+
+    album = track['album']
+    return {
+        'id': _str(track['id']),
+        'name': _str(track['name']),
+        'duration_ms': _int(track['duration_ms']),
+        'artists': [artist['name'] for artist in track['artists']],
+        'album': _str(album['name']),
+        'album_image_url': _first_image_url(album['images']),
+    }
+
+
+def project_playlist_detail(playlist, fields=None):
+    """Same output as SpotifyPlaylistDetailSerializer(playlist).data"""
+    if fields is not None:
+        data = _project_fields(playlist, PLAYLIST_DETAIL_GETTERS, fields)
+        if 'tracks' in fields:
+            track_fields = get_nested_fields(fields, 'tracks')
+            data['tracks'] = [project_track(track, track_fields) for track in playlist['tracks']]
+        return data
+
+    return {
+        'id': _str(playlist['id']),
+        'name': _str(playlist['name']),
+        'description': _str(playlist['description']),
+        'followers': _int(playlist['followers']['total']),
+        'total_tracks': _int(playlist['total_tracks']),
+        'image_url': _first_image_url(playlist.get('images', [])),
+        'tracks': [project_track(track) for track in playlist['tracks']],
+    }
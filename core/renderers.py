@@ -0,0 +1,59 @@
+from rest_framework.renderers import JSONRenderer
+from core.request_timing import timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer that encodes straight to bytes with orjson.
+
+    Output matches JSONRenderer under the default compact, UTF-8 settings.
+    Dates and times are handed back to DRF's encoder so they keep its format,
+    millisecond precision and 'Z' suffix; orjson already writes UUIDs the way
+    str() does. U+2028 and U+2029 are escaped afterwards, as DRF does.
+    Anything the fast path can't reproduce exactly (indented output,
+    ASCII-escaped output, values orjson can't encode) goes through the
+    stdlib renderer, as does everything when orjson isn't installed.
+
+    Unlike DRF's strict renderer, orjson writes NaN and infinite floats as
+    null rather than raising. Looking for them would mean walking every
+    payload in Python, which costs more than the encoding saves, so they
+    are kept out where numbers enter responses instead: the serializers and
+    projections convert Spotify's numbers with int(), which rejects them.
+    """
+
+    if orjson is not None:
+        orjson_options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        with timed('render'):
+            return self.render_bytes(data, accepted_media_type, renderer_context)
+
+    def render_bytes(self, data, accepted_media_type, renderer_context):
+        if orjson is None or not self.can_render_fast(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_default, option=self.orjson_options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Keep the output a strict JavaScript subset
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+    def can_render_fast(self, accepted_media_type, renderer_context):
+        return (
+            self.get_indent(accepted_media_type, renderer_context) is None
+            and not self.ensure_ascii
+            and self.compact
+        )
+
+    def encoder_default(self, obj):
+        return self.encoder_class().default(obj)
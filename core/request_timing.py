@@ -0,0 +1,97 @@
+"""
+Per-request time accounting, reported by ServerTimingMiddleware.
+
+Instrumented code wraps each phase in ``with timed('spotify'):``. Outside a
+timed request (timing disabled, management commands, tests) timed() returns
+a shared no-op context manager, so instrumentation costs one context
+variable lookup.
+"""
+import contextvars
+import threading
+from contextlib import nullcontext
+from time import perf_counter
+
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+_noop_timer = nullcontext()
+
+
+class RequestTimings:
+    """
+    Count and total duration per phase. Phases timed on several threads at
+    once (the playlist page fan-out) add up, so their totals can exceed the
+    wall-clock time of the request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phases = {}
+
+    def add(self, phase, seconds):
+        with self._lock:
+            count, total = self.phases.get(phase, (0, 0.0))
+            self.phases[phase] = (count + 1, total + seconds)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                phase: {'count': count, 'ms': round(total * 1000, 3)}
+                for phase, (count, total) in self.phases.items()
+            }
+
+
+class _PhaseTimer:
+    __slots__ = ('timings', 'phase', 'started_at')
+
+    def __init__(self, timings, phase):
+        self.timings = timings
+        self.phase = phase
+
+    def __enter__(self):
+        self.started_at = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timings.add(self.phase, perf_counter() - self.started_at)
+
+
+def timed(phase):
+    timings = _request_timings.get()
+    if timings is None:
+        return _noop_timer
+    return _PhaseTimer(timings, phase)
+
+
+def get_request_timings():
+    return _request_timings.get()
+
+
+def start_request_timings():
+    """
+    Returns:
+        tuple: (timings, token); pass the token to end_request_timings
+    """
+    timings = RequestTimings()
+    return timings, _request_timings.set(timings)
+
+
+def end_request_timings(token):
+    _request_timings.reset(token)
+
+
+def bind_request_timings(fn):
+    """
+    Wrap fn so calls from worker threads, which don't inherit the request's
+    context, are accounted to the current request.
+    """
+    timings = _request_timings.get()
+    if timings is None:
+        return fn
+
+    def bound(*args, **kwargs):
+        token = _request_timings.set(timings)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _request_timings.reset(token)
+
+    return bound
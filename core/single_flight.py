@@ -0,0 +1,142 @@
+import copy
+import fcntl
+import hashlib
+import os
+import threading
+from django.conf import settings
+from django.core.cache import caches
+from core.metrics import cache_requests_total
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    in flight wait for it and get a copy of its result (or its exception).
+    The copies are made from a snapshot taken before the leader returns, so
+    the leader's caller is free to mutate the result it gets.
+
+    With shared=True, callers in other processes are coalesced too: the
+    leader for a key holds an flock() on a per-key file while it runs and
+    leaves its result in a cross-process cache for `shared_ttl` seconds.
+    Processes that were waiting on the lock pick the result up from there.
+    The leader removes the lock file when it's done, so they don't pile up.
+    """
+
+    def __init__(self, shared=False, shared_ttl=2, lock_dir=None, cache_alias='shared'):
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        self.lock_dir = lock_dir
+        self.cache_alias = cache_alias
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        cache_requests_total.inc(cache='single_flight', result='miss' if is_leader else 'hit')
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        result = None
+        try:
+            if self.shared:
+                result = self._do_shared(key, fn, *args, **kwargs)
+            else:
+                result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                # No callers can join once the key is gone
+                if call.waiters and call.error is None:
+                    call.result = copy.deepcopy(result)
+            call.done.set()
+
+        return result
+
+    def _lock_key_file(self, lock_path):
+        """
+        Open and flock() the key's lock file. A leader may unlink the file
+        while we wait on it, so retry until the locked file is the one at
+        lock_path.
+
+        Returns:
+            int: File descriptor holding the lock
+        """
+        while True:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                if os.fstat(fd).st_ino == os.stat(lock_path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            except BaseException:
+                os.close(fd)
+                raise
+            os.close(fd)
+
+    def _do_shared(self, key, fn, *args, **kwargs):
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        cache = caches[self.cache_alias]
+        cache_key = f'single-flight:{digest}'
+
+        lock_path = os.path.join(self.lock_dir, f'{digest}.lock')
+        fd = self._lock_key_file(lock_path)
+        try:
+            result = cache.get(cache_key)
+            if result is not None:
+                cache_requests_total.inc(cache='single_flight_shared', result='hit')
+                return result
+
+            cache_requests_total.inc(cache='single_flight_shared', result='miss')
+
+            result = fn(*args, **kwargs)
+            if result is not None:
+                cache.set(cache_key, result, self.shared_ttl)
+            return result
+        finally:
+            # Still holding the lock, so processes waiting on this file see
+            # it's gone and lock a fresh one
+            os.unlink(lock_path)
+            os.close(fd)
+
+
+_spotify_single_flight = None
+_spotify_single_flight_lock = threading.Lock()
+
+
+def get_spotify_single_flight():
+    global _spotify_single_flight
+
+    if _spotify_single_flight is None:
+        with _spotify_single_flight_lock:
+            if _spotify_single_flight is None:
+                _spotify_single_flight = SingleFlight(
+                    shared=settings.SPOTIFY_SINGLE_FLIGHT_SHARED,
+                    shared_ttl=settings.SPOTIFY_SINGLE_FLIGHT_SHARED_TTL,
+                    lock_dir=settings.SPOTIFY_SINGLE_FLIGHT_LOCK_DIR
+                )
+
+    return _spotify_single_flight
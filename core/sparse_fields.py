@@ -0,0 +1,151 @@
+"""
+Sparse fieldsets for the Spotify playlist endpoints.
+
+Clients pass ``?fields=name,tracks.name,tracks.artists`` to get only the
+response fields they use. The same selection is translated into the
+smallest Spotify ``fields`` expression that still produces those fields, so
+the upstream payload, the JSON parse and the projection all shrink together.
+"""
+
+FIELDS_QUERY_PARAM = 'fields'
+
+PLAYLIST_SUMMARY_FIELDS = ('id', 'name', 'description', 'image_url', 'track_count')
+TRACK_FIELDS = ('id', 'name', 'duration_ms', 'artists', 'album', 'album_image_url')
+PLAYLIST_DETAIL_FIELDS = (
+    'id', 'name', 'description', 'followers', 'total_tracks', 'image_url', 'tracks'
+)
+
+# Spotify paths each response field is built from. Paths are dotted here and
+# rendered into Spotify's parenthesised syntax by build_spotify_fields.
+SPOTIFY_PLAYLIST_PATHS = {
+    'id': ('id',),
+    'name': ('name',),
+    'description': ('description',),
+    'followers': ('followers.total',),
+    'image_url': ('images',),
+    # Both come from the playlist tracks request
+    'total_tracks': (),
+    'tracks': (),
+}
+SPOTIFY_TRACK_PATHS = {
+    'id': ('id',),
+    'name': ('name',),
+    'duration_ms': ('duration_ms',),
+    'artists': ('artists.name',),
+    'album': ('album.name',),
+    'album_image_url': ('album.images',),
+}
+
+# ETags, the local catalog and cursors are keyed on these, whatever was selected
+SPOTIFY_PLAYLIST_REQUIRED_PATHS = ('id', 'snapshot_id')
+
+
+def parse_fields(value, allowed, nested=None):
+    """
+    Parse a ``fields`` query parameter.
+
+    Args:
+        value (str): Comma separated field names, or None
+        allowed (tuple): Top-level field names the endpoint returns
+        nested (dict): Maps a top-level field to the names allowed after
+            ``<field>.``; naming the bare field selects all of them
+
+    Returns:
+        frozenset: Selected field names, or None when no selection was made
+
+    Raises:
+        ValueError: if a field name is not recognised
+    """
+    nested = nested or {}
+    names = [name.strip() for name in (value or '').split(',') if name.strip()]
+    if not names:
+        return None
+
+    fields = set()
+    unknown = []
+    for name in names:
+        parent, _, child = name.partition('.')
+        if parent not in allowed or (child and child not in nested.get(parent, ())):
+            unknown.append(name)
+            continue
+
+        fields.add(parent)
+        if child:
+            fields.add(name)
+        elif parent in nested:
+            fields.update(f'{parent}.{nested_name}' for nested_name in nested[parent])
+
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+
+    return frozenset(fields)
+
+
+def get_request_fields(request, allowed, nested=None):
+    return parse_fields(request.GET.get(FIELDS_QUERY_PARAM), allowed, nested)
+
+
+def get_playlist_detail_fields(request):
+    return get_request_fields(request, PLAYLIST_DETAIL_FIELDS, {'tracks': TRACK_FIELDS})
+
+
+def get_nested_fields(fields, parent):
+    """
+    Returns:
+        frozenset: Names selected under ``<parent>.``
+    """
+    prefix = f'{parent}.'
+    return frozenset(name[len(prefix):] for name in fields if name.startswith(prefix))
+
+
+def get_fields_key(fields):
+    # frozenset iteration order varies between processes; cache keys must not
+    return None if fields is None else tuple(sorted(fields))
+
+
+def build_spotify_fields(paths):
+    """
+    Render dotted paths as a Spotify ``fields`` expression, grouping paths
+    that share a parent: ['id', 'album.name', 'album.images'] becomes
+    'id,album(name,images)'.
+    """
+    groups = {}
+    for path in paths:
+        head, _, rest = path.partition('.')
+        children = groups.setdefault(head, [])
+        if rest and rest not in children:
+            children.append(rest)
+
+    return ','.join(
+        f'{head}({build_spotify_fields(children)})' if children else head
+        for head, children in groups.items()
+    )
+
+
+def get_spotify_playlist_fields(fields):
+    paths = list(SPOTIFY_PLAYLIST_REQUIRED_PATHS)
+    for name in PLAYLIST_DETAIL_FIELDS:
+        if name in fields:
+            paths.extend(SPOTIFY_PLAYLIST_PATHS[name])
+
+    return build_spotify_fields(paths)
+
+
+def get_spotify_playlist_tracks_fields(track_fields):
+    """
+    Args:
+        track_fields (frozenset): Selected track field names
+
+    Returns:
+        str: Spotify ``fields`` expression for the playlist tracks request.
+        With no track fields only the total is requested.
+    """
+    paths = [
+        path
+        for name in TRACK_FIELDS if name in track_fields
+        for path in SPOTIFY_TRACK_PATHS[name]
+    ]
+    if not paths:
+        return 'total'
+
+    return f'items(track({build_spotify_fields(paths)})),total'
@@ -0,0 +1,94 @@
+import threading
+import requests
+import spotipy
+import urllib3
+from django.conf import settings
+
+# Mirrors spotipy's own default for the sessions it builds
+SPOTIFY_RETRY_BACKOFF_FACTOR = 0.3
+# spotipy also retries 429s, per process and without waiting out Retry-After.
+# Those are left to core.spotify_gateway, which pauses the whole fleet.
+SPOTIFY_RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+
+class SharedSpotifySession(requests.Session):
+    """
+    A requests session shared by every Spotify client in the process.
+
+    spotipy closes its session when a client is garbage collected, which would
+    drop the pooled keep-alive connections after every request. close() is a
+    no-op here; use shutdown() to actually release the pool.
+    """
+
+    def close(self):
+        pass
+
+    def shutdown(self):
+        super().close()
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def build_spotify_session():
+    session = SharedSpotifySession()
+    # spotipy's retry policy for server errors
+    retry = urllib3.Retry(
+        total=spotipy.Spotify.max_retries,
+        connect=None,
+        read=False,
+        allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE']),
+        status=spotipy.Spotify.max_retries,
+        backoff_factor=SPOTIFY_RETRY_BACKOFF_FACTOR,
+        status_forcelist=SPOTIFY_RETRY_STATUS_CODES,
+        # Hand back the last server error once retries run out. Otherwise
+        # spotipy reports it as a 429 "Max Retries", which looks like a rate limit.
+        raise_on_status=False
+    )
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=settings.SPOTIFY_HTTP_POOL_CONNECTIONS,
+        pool_maxsize=settings.SPOTIFY_HTTP_POOL_MAXSIZE,
+        max_retries=retry
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    return session
+
+
+def get_spotify_session():
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_spotify_session()
+
+    return _session
+
+
+def reset_spotify_session():
+    global _session
+
+    with _session_lock:
+        if _session is not None:
+            _session.shutdown()
+        _session = None
+
+
+def get_spotify_client(access_token):
+    """
+    Build a Spotify client for one user's access token on top of the
+    process-wide connection pool.
+
+    Clients are cheap and hold nothing but the bearer token, so build one per
+    request rather than sharing them between users or threads.
+    """
+    spotify = spotipy.Spotify(
+        auth=access_token,
+        requests_session=get_spotify_session()
+    )
+    spotify.prefix = settings.SPOTIFY_API_PREFIX
+
+    return spotify
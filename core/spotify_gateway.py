@@ -0,0 +1,260 @@
+import asyncio
+import fcntl
+import logging
+import os
+import struct
+import threading
+import time
+from time import perf_counter
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from spotipy.exceptions import SpotifyException
+from core.request_timing import timed
+from core.metrics import (
+    spotify_call_duration_seconds,
+    spotify_calls_total,
+    spotify_rate_limited_total,
+    spotify_retries_total,
+)
+
+logger = logging.getLogger(__name__)
+
+# tokens, last refill time, fleet-wide blocked-until time
+_STATE_FORMAT = 'ddd'
+_STATE_SIZE = struct.calcsize(_STATE_FORMAT)
+
+DEFAULT_RETRY_AFTER_SECONDS = 1
+
+
+class SpotifyRateLimiter:
+    """
+    Token bucket shared by every process on the host through a small state
+    file guarded by flock().
+
+    Callers reserve a token and are told how long to wait before using it, so
+    the lock is only held for a read-modify-write of the state. The bucket may
+    go negative; that debt is what queues callers behind each other. A 429
+    from Spotify blocks the whole fleet until its Retry-After has passed.
+    """
+
+    def __init__(self, state_path, rate, burst):
+        self.state_path = state_path
+        self.rate = rate
+        self.burst = burst
+
+    def _update_state(self, update):
+        fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw_state = os.pread(fd, _STATE_SIZE, 0)
+            now = time.time()
+            if len(raw_state) == _STATE_SIZE:
+                tokens, refilled_at, blocked_until = struct.unpack(_STATE_FORMAT, raw_state)
+                tokens = min(self.burst, tokens + (now - refilled_at) * self.rate)
+            else:
+                tokens, blocked_until = self.burst, 0.0
+
+            tokens, blocked_until, result = update(now, tokens, blocked_until)
+            os.pwrite(fd, struct.pack(_STATE_FORMAT, tokens, now, blocked_until), 0)
+            return result
+        finally:
+            os.close(fd)
+
+    def reserve(self):
+        """Take a token and return how many seconds to wait before using it"""
+        def update(now, tokens, blocked_until):
+            tokens -= 1
+            wait = max(blocked_until - now, 0.0) + max(-tokens, 0.0) / self.rate
+            return tokens, blocked_until, wait
+
+        return self._update_state(update)
+
+    def available_tokens(self):
+        """Tokens left in the bucket right now, negative while callers are queued"""
+        def update(now, tokens, blocked_until):
+            return tokens, blocked_until, tokens
+
+        return self._update_state(update)
+
+    def blocked_for(self):
+        """Seconds left on a fleet-wide block, 0 if none"""
+        def update(now, tokens, blocked_until):
+            return tokens, blocked_until, max(blocked_until - now, 0.0)
+
+        return self._update_state(update)
+
+    def block(self, seconds):
+        def update(now, tokens, blocked_until):
+            return tokens, max(blocked_until, now + seconds), None
+
+        self._update_state(update)
+
+
+class SpotifyGatewayStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.throttled_calls = 0
+            self.throttled_seconds = 0.0
+            self.rate_limited_responses = 0
+
+    def record_call(self, throttled_seconds):
+        with self._lock:
+            self.calls += 1
+            if throttled_seconds > 0:
+                self.throttled_calls += 1
+                self.throttled_seconds += throttled_seconds
+
+    def record_rate_limited(self):
+        with self._lock:
+            self.rate_limited_responses += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'throttled_calls': self.throttled_calls,
+                'throttled_seconds': self.throttled_seconds,
+                'rate_limited_responses': self.rate_limited_responses,
+            }
+
+
+spotify_gateway_stats = SpotifyGatewayStats()
+
+
+def get_spotify_rate_limiter():
+    return SpotifyRateLimiter(
+        settings.SPOTIFY_RATE_LIMIT_STATE_FILE,
+        rate=settings.SPOTIFY_RATE_LIMIT_PER_SECOND,
+        burst=settings.SPOTIFY_RATE_LIMIT_BURST
+    )
+
+
+def get_retry_after(spotify_exception):
+    try:
+        return float(spotify_exception.headers.get('Retry-After', DEFAULT_RETRY_AFTER_SECONDS))
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER_SECONDS
+
+
+def get_method_name(method):
+    return getattr(method, '__name__', type(method).__name__)
+
+
+def record_spotify_call(method_name, status, started_at):
+    spotify_calls_total.inc(method=method_name, status=status)
+    spotify_call_duration_seconds.observe(perf_counter() - started_at, method=method_name)
+
+
+def is_rate_limited(spotify_exception):
+    """
+    spotipy also raises a 429 when a session runs out of retries on server
+    errors. That one carries no response headers. Only a 429 that Spotify
+    actually answered with counts as a rate limit.
+    """
+    return spotify_exception.http_status == 429 and bool(spotify_exception.headers)
+
+
+def handle_spotify_exception(rate_limiter, spotify_exception, attempt, method_name=None):
+    """Block the fleet on a 429; re-raise anything else or when out of retries"""
+    if not is_rate_limited(spotify_exception):
+        if spotify_exception.http_status == 429:
+            raise SpotifyException(
+                500,
+                spotify_exception.code,
+                spotify_exception.msg,
+                reason=spotify_exception.reason
+            ) from spotify_exception
+        raise spotify_exception
+
+    spotify_rate_limited_total.inc(method=method_name)
+
+    retry_after = get_retry_after(spotify_exception)
+    spotify_gateway_stats.record_rate_limited()
+    rate_limiter.block(retry_after)
+    logger.warning('Spotify rate limited us, pausing all workers for %ss', retry_after)
+
+    if attempt >= settings.SPOTIFY_RATE_LIMIT_MAX_RETRIES:
+        raise spotify_exception
+
+    spotify_retries_total.inc(method=method_name)
+
+
+def call_spotify(method, *args, **kwargs):
+    """
+    Call a spotipy client method through the fleet-wide rate limiter,
+    retrying on 429 after Spotify's Retry-After.
+    """
+    rate_limiter = get_spotify_rate_limiter()
+    method_name = get_method_name(method)
+
+    attempt = 0
+    while True:
+        throttled_seconds = 0.0
+        with timed('spotify_throttle'):
+            wait = rate_limiter.reserve()
+            while wait > 0:
+                time.sleep(wait)
+                throttled_seconds += wait
+                # Someone may have hit a 429 while we slept
+                wait = rate_limiter.blocked_for()
+        spotify_gateway_stats.record_call(throttled_seconds)
+
+        started_at = perf_counter()
+        try:
+            with timed('spotify'):
+                result = method(*args, **kwargs)
+        except SpotifyException as e:
+            record_spotify_call(method_name, e.http_status, started_at)
+            handle_spotify_exception(rate_limiter, e, attempt, method_name)
+            attempt += 1
+        except Exception:
+            record_spotify_call(method_name, 'error', started_at)
+            raise
+        else:
+            record_spotify_call(method_name, 200, started_at)
+            return result
+
+
+async def acall_spotify(method, *args, **kwargs):
+    """
+    Async version of call_spotify for async Spotify client methods. The rate
+    limiter's state file is locked and read in a worker thread, off the
+    event loop.
+    """
+    rate_limiter = get_spotify_rate_limiter()
+    method_name = get_method_name(method)
+    reserve = sync_to_async(rate_limiter.reserve, thread_sensitive=False)
+    blocked_for = sync_to_async(rate_limiter.blocked_for, thread_sensitive=False)
+
+    attempt = 0
+    while True:
+        throttled_seconds = 0.0
+        with timed('spotify_throttle'):
+            wait = await reserve()
+            while wait > 0:
+                await asyncio.sleep(wait)
+                throttled_seconds += wait
+                wait = await blocked_for()
+        spotify_gateway_stats.record_call(throttled_seconds)
+
+        started_at = perf_counter()
+        try:
+            with timed('spotify'):
+                result = await method(*args, **kwargs)
+        except SpotifyException as e:
+            record_spotify_call(method_name, e.http_status, started_at)
+            await sync_to_async(handle_spotify_exception, thread_sensitive=False)(
+                rate_limiter, e, attempt, method_name
+            )
+            attempt += 1
+        except Exception:
+            record_spotify_call(method_name, 'error', started_at)
+            raise
+        else:
+            record_spotify_call(method_name, 200, started_at)
+            return result
@@ -0,0 +1,103 @@
+import logging
+import threading
+import requests
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from spotipy import SpotifyOAuth
+from spotipy.cache_handler import MemoryCacheHandler
+from spotipy.exceptions import SpotifyException
+from spotipy.oauth2 import SpotifyOauthError
+from core.metrics import spotify_token_refreshes_total
+from core.spotify_client import get_spotify_session
+
+logger = logging.getLogger(__name__)
+
+SPOTIFY_TOKEN_FIELDS = [
+    'spotify_access_token',
+    'spotify_access_token_expires_at',
+    'spotify_refresh_token',
+]
+
+# Users are hashed onto a fixed set of locks so concurrent requests for the
+# same user refresh once, without keeping a lock around for every user seen
+USER_REFRESH_LOCK_STRIPES = 64
+_user_locks = [threading.Lock() for _ in range(USER_REFRESH_LOCK_STRIPES)]
+
+
+def get_user_refresh_lock(user_id):
+    return _user_locks[hash(user_id) % USER_REFRESH_LOCK_STRIPES]
+
+
+def spotify_access_token_needs_refresh(user, margin=None):
+    if margin is None:
+        margin = timedelta(seconds=settings.SPOTIFY_TOKEN_REFRESH_MARGIN_SECONDS)
+
+    if not user.spotify_refresh_token or user.spotify_access_token_expires_at is None:
+        return False
+
+    return user.spotify_access_token_expires_at <= timezone.now() + margin
+
+
+def refresh_spotify_access_token(user):
+    """
+    Trade the user's Spotify refresh token for a new access token and save it.
+    Spotify may rotate the refresh token too, in which case the new one is kept.
+    """
+    sp_oauth = SpotifyOAuth(
+        client_id=settings.SPOTIPY_CLIENT_ID,
+        client_secret=settings.SPOTIPY_CLIENT_SECRET,
+        redirect_uri=settings.SPOTIPY_REDIRECT_URI,
+        scope=settings.SPOTIPY_SCOPE,
+        cache_handler=MemoryCacheHandler(),
+        requests_session=get_spotify_session()
+    )
+    token_data = sp_oauth.refresh_access_token(user.spotify_refresh_token)
+
+    user.spotify_access_token = token_data['access_token']
+    user.spotify_access_token_expires_at = timezone.now() + timedelta(seconds=token_data['expires_in'])
+    if token_data.get('refresh_token'):
+        user.spotify_refresh_token = token_data['refresh_token']
+    user.save(update_fields=SPOTIFY_TOKEN_FIELDS + ['updated_at'])
+
+
+def ensure_fresh_spotify_access_token(user, margin=None):
+    """
+    Refresh the user's Spotify access token if it expires within `margin`.
+
+    A per-user lock keeps threads in this process from refreshing the same
+    token twice, and a row lock does the same across processes. Both re-read
+    the token after acquiring the lock, since whoever held it may already
+    have refreshed.
+
+    Returns:
+        bool: True if the token was refreshed
+    """
+    if not spotify_access_token_needs_refresh(user, margin):
+        return False
+
+    with get_user_refresh_lock(user.pk):
+        user.refresh_from_db(fields=SPOTIFY_TOKEN_FIELDS)
+        if not spotify_access_token_needs_refresh(user, margin):
+            return False
+
+        try:
+            with transaction.atomic():
+                locked_user = type(user).objects.select_for_update().get(pk=user.pk)
+                if not spotify_access_token_needs_refresh(locked_user, margin):
+                    user.refresh_from_db(fields=SPOTIFY_TOKEN_FIELDS)
+                    return False
+
+                refresh_spotify_access_token(locked_user)
+        except (SpotifyException, SpotifyOauthError, requests.RequestException) as e:
+            spotify_token_refreshes_total.inc(result='error')
+            logger.warning('Error refreshing Spotify token for user %s: %s', user.pk, e)
+            return False
+
+        spotify_token_refreshes_total.inc(result='success')
+
+        for field in SPOTIFY_TOKEN_FIELDS:
+            setattr(user, field, getattr(locked_user, field))
+
+        return True
@@ -1,9 +1,31 @@
+from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import asyncio
+import logging
+from asgiref.sync import sync_to_async
 import spotipy
 from spotipy.exceptions import SpotifyException
 from typing import Dict, Any, List
 from spotipy import Spotify
+from core.spotify_gateway import call_spotify, acall_spotify
+from core.single_flight import get_spotify_single_flight
+from core.request_timing import bind_request_timings, timed
+from core.playlist_cache import get_cached_playlist_page, cache_playlist_page
+from core.sparse_fields import (
+    get_fields_key,
+    get_nested_fields,
+    get_spotify_playlist_fields,
+    get_spotify_playlist_tracks_fields,
+)
+
+logger = logging.getLogger(__name__)
+
+SPOTIFY_USER_PLAYLISTS_PAGE_LIMIT = 50
+SPOTIFY_PLAYLIST_FIELDS = 'id,name,description,images,owner.display_name,followers.total,snapshot_id'
+SPOTIFY_PLAYLIST_TRACKS_FIELDS = 'items(track(id,name,duration_ms,album(id,name,images),artists(id,name))),total'
 
 
 def get_avatar_url(images_list):
@@ -34,47 +56,119 @@ def get_noshuff_user_fields(spotify_user, token_data):
         'spotify_access_token_expires_at': get_spotify_access_token_expires_at(token_data),
     }
 
-def get_spotify_user_playlists(
+def filter_spotify_user_playlists(
     user,
+    playlists,
     only_owned_by_user=True,
     only_non_collaborative=True
 ):
-    spotify = spotipy.Spotify(auth=user.spotify_access_token)
-    playlists = []
-    limit = 50
-    offset = 0
-    try:
-        while True:
-            playlists_data = spotify.current_user_playlists(limit=limit, offset=offset)
-            items = playlists_data.get('items', [])
+    filtered_playlists = []
+    for playlist in playlists:
+        is_owned_by_user = playlist['owner']['id'] == user.spotify_id
+        is_collaborative = playlist['collaborative']
+
+        if only_owned_by_user and not is_owned_by_user:
+            continue
+        if only_non_collaborative and is_collaborative:
+            continue
 
-            for playlist in items:
-                is_owned_by_user = playlist['owner']['id'] == user.spotify_id
-                is_collaborative = playlist['collaborative']
+        filtered_playlists.append(playlist)
 
-                if only_owned_by_user and not is_owned_by_user:
-                    continue
-                if only_non_collaborative and is_collaborative:
-                    continue
+    return filtered_playlists
 
-                playlists.append(playlist)
+def get_spotify_user_playlists(
+    user,
+    only_owned_by_user=True,
+    only_non_collaborative=True,
+    max_workers=None
+):
+    """
+    Fetch the current user's playlists, fanning out over the remaining pages.
 
-            if playlists_data['next'] is None:
-                break
+    The first page is fetched on its own to learn the playlist ``total``; the
+    remaining offsets are then fetched in parallel on a bounded thread pool.
+    Pages are stitched back together in offset order before filtering.
+    Concurrent calls for the same user share one fetch.
 
-            offset += limit
+    Args:
+        user: NoShuff user whose Spotify token is used
+        only_owned_by_user (bool): Drop playlists owned by someone else
+        only_non_collaborative (bool): Drop collaborative playlists
+        max_workers (int): Concurrency cap for the page fan-out. Defaults to
+            settings.SPOTIFY_PLAYLISTS_FETCH_MAX_WORKERS; 1 fetches sequentially.
 
-        return playlists
+    Returns:
+        list: Filtered playlist objects, or None if Spotify returned an error
+    """
+    playlists = get_spotify_single_flight().do(
+        ('user_playlists', user.pk),
+        fetch_spotify_user_playlists,
+        user,
+        max_workers=max_workers
+    )
+    if playlists is None:
+        return None
+
+    return filter_spotify_user_playlists(
+        user,
+        playlists,
+        only_owned_by_user=only_owned_by_user,
+        only_non_collaborative=only_non_collaborative
+    )
+
+def fetch_spotify_user_playlists(user, max_workers=None, before_page=None):
+    """
+    Fetch every playlist in the user's library, unfiltered.
+    See get_spotify_user_playlists.
+
+    Args:
+        before_page (callable): Called with no arguments before each page is
+            requested, e.g. to pace a background crawler
+    """
+    if max_workers is None:
+        max_workers = settings.SPOTIFY_PLAYLISTS_FETCH_MAX_WORKERS
+
+    spotify = user.get_spotify_client()
+    limit = SPOTIFY_USER_PLAYLISTS_PAGE_LIMIT
+
+    def fetch_page_items(offset):
+        if before_page is not None:
+            before_page()
+        playlists_data = call_spotify(spotify.current_user_playlists, limit=limit, offset=offset)
+        return playlists_data.get('items', [])
+
+    try:
+        if before_page is not None:
+            before_page()
+        first_page = call_spotify(spotify.current_user_playlists, limit=limit, offset=0)
+        pages = [first_page.get('items', [])]
+
+        if first_page['next'] is not None:
+            remaining_offsets = range(limit, first_page['total'], limit)
+            worker_count = max(1, min(max_workers, len(remaining_offsets)))
+
+            with ThreadPoolExecutor(max_workers=worker_count) as executor:
+                # map() yields results in submission order, so playlist order is preserved
+                pages.extend(executor.map(bind_request_timings(fetch_page_items), remaining_offsets))
+
+        return [playlist for items in pages for playlist in items]
     except SpotifyException as e:
         print(f"Error fetching playlists: {e}")
         return None
 
 
+def get_spotify_client_key(spotify_client):
+    # Access tokens are per user, so they stand in for the user in cache keys
+    access_token = str(getattr(spotify_client, '_auth', None))
+    return hashlib.sha256(access_token.encode()).hexdigest()
+
+
 def get_spotify_playlist(
         spotify_client,
         playlist_id: str,
         page: int = 1,
-        page_size: int = 20
+        page_size: int = 20,
+        fields=None
     ):
     """
     Fetch a Spotify playlist's tracks with pagination, excluding podcast episodes.
@@ -84,36 +178,235 @@ def get_spotify_playlist(
         playlist_id (str): Spotify playlist ID
         page (int): Page number (1-based)
         page_size (int): Number of items per page
+        fields (frozenset): Sparse fieldset from core.sparse_fields; Spotify
+            is only asked for what these fields need
     
     Returns:
         tuple: (playlist_data, tracks_list) where playlist_data is the raw Spotipy response 
         and tracks_list is the list of track objects for the current page
     """
+    # Concurrent requests for the same page share one upstream call
+    return get_spotify_single_flight().do(
+        (
+            'playlist',
+            get_spotify_client_key(spotify_client),
+            playlist_id,
+            page,
+            page_size,
+            get_fields_key(fields),
+        ),
+        fetch_spotify_playlist,
+        spotify_client,
+        playlist_id,
+        page=page,
+        page_size=page_size,
+        fields=fields
+    )
+
+
+def fetch_spotify_playlist(
+        spotify_client,
+        playlist_id: str,
+        page: int = 1,
+        page_size: int = 20,
+        fields=None
+    ):
+    """
+    Fetch a page of a Spotify playlist. See get_spotify_playlist.
+    """
     # Calculate offset based on page number (convert to 0-based)
     offset = (page - 1) * page_size
+    playlist_fields, tracks_fields = get_spotify_fields_expressions(fields)
     
     # Get full playlist data
-    playlist_data = spotify_client.playlist(
+    playlist_data = call_spotify(
+        spotify_client.playlist,
         playlist_id,
-        fields='id,name,description,images,owner.display_name,followers.total'
+        fields=playlist_fields
     )
-    
+
+    # Serve the page from the local catalog when the snapshot hasn't changed
+    cached_page = get_cached_playlist_page(playlist_data, offset, page_size)
+    if cached_page is not None:
+        playlist_data['total_tracks'], playlist_data['tracks'] = cached_page
+        return playlist_data
+
     # Get tracks for the current page
-    tracks_response = spotify_client.playlist_tracks(
+    tracks_response = call_spotify(
+        spotify_client.playlist_tracks,
         playlist_id,
         offset=offset,
         limit=page_size,
         additional_types=['track'],
-        fields='items(track(id,name,duration_ms,album(name,images),artists(name))),total'
+        fields=tracks_fields
     )
+    if fields is None:
+        # Trimmed responses are too partial to store in the catalog
+        with timed('catalog'):
+            cache_playlist_page(playlist_data, offset, tracks_response)
+
+    return add_playlist_tracks(playlist_data, tracks_response)
 
+
+def get_spotify_fields_expressions(fields):
+    """
+    Returns:
+        tuple: (playlist fields, playlist tracks fields) Spotify expressions
+        for a sparse fieldset, or the full defaults without one
+    """
+    if fields is None:
+        return SPOTIFY_PLAYLIST_FIELDS, SPOTIFY_PLAYLIST_TRACKS_FIELDS
+
+    return (
+        get_spotify_playlist_fields(fields),
+        get_spotify_playlist_tracks_fields(get_nested_fields(fields, 'tracks')),
+    )
+
+
+def add_playlist_tracks(playlist_data, tracks_response):
     # Add total_tracks to playlist_data
     playlist_data['total_tracks'] = tracks_response['total']
 
     # Add tracks to playlist_data
     playlist_data['tracks'] = [
-        item['track'] for item in tracks_response['items']
+        item['track'] for item in tracks_response.get('items', [])
         if item.get('track')
     ]
 
-    return playlist_data
\ No newline at end of file
+    return playlist_data
+
+
+def iter_spotify_playlist_tracks(
+        spotify_client,
+        playlist_id: str,
+        page_size: int = 100,
+        track_fields=None
+    ):
+    """
+    Lazily yield every track in a playlist, one Spotify page at a time.
+
+    Pages are only fetched as the caller consumes tracks, so memory use is
+    bounded by page_size regardless of playlist length. Pages stored in the
+    local catalog under the current snapshot are read from there instead.
+    With track_fields, Spotify is only asked for what those track fields need.
+    """
+    if track_fields is None:
+        playlist_fields, tracks_fields = SPOTIFY_PLAYLIST_FIELDS, SPOTIFY_PLAYLIST_TRACKS_FIELDS
+    else:
+        playlist_fields = get_spotify_playlist_fields(frozenset())
+        tracks_fields = get_spotify_playlist_tracks_fields(track_fields)
+
+    playlist_data = call_spotify(
+        spotify_client.playlist,
+        playlist_id,
+        fields=playlist_fields
+    )
+
+    offset = 0
+    while True:
+        cached_page = get_cached_playlist_page(playlist_data, offset, page_size)
+        if cached_page is not None:
+            total_tracks, tracks = cached_page
+        else:
+            tracks_response = call_spotify(
+                spotify_client.playlist_tracks,
+                playlist_id,
+                offset=offset,
+                limit=page_size,
+                additional_types=['track'],
+                fields=tracks_fields
+            )
+            if track_fields is None:
+                with timed('catalog'):
+                    cache_playlist_page(playlist_data, offset, tracks_response)
+            total_tracks = tracks_response['total']
+            tracks = [item['track'] for item in tracks_response['items'] if item.get('track')]
+
+        yield from tracks
+
+        offset += page_size
+        if offset >= total_tracks:
+            break
+
+
+async def aget_spotify_user_playlists(
+    user,
+    only_owned_by_user=True,
+    only_non_collaborative=True,
+    max_workers=None
+):
+    """
+    Async version of get_spotify_user_playlists. The remaining pages are
+    fetched concurrently on the event loop, at most `max_workers` at a time.
+    """
+    if max_workers is None:
+        max_workers = settings.SPOTIFY_PLAYLISTS_FETCH_MAX_WORKERS
+
+    spotify = await user.aget_spotify_client()
+    limit = SPOTIFY_USER_PLAYLISTS_PAGE_LIMIT
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def fetch_page_items(offset):
+        async with semaphore:
+            playlists_data = await acall_spotify(
+                spotify.current_user_playlists, limit=limit, offset=offset
+            )
+        return playlists_data.get('items', [])
+
+    try:
+        first_page = await acall_spotify(spotify.current_user_playlists, limit=limit, offset=0)
+        pages = [first_page.get('items', [])]
+
+        if first_page['next'] is not None:
+            pages.extend(await asyncio.gather(*(
+                fetch_page_items(offset)
+                for offset in range(limit, first_page['total'], limit)
+            )))
+
+        playlists = [playlist for items in pages for playlist in items]
+
+        return filter_spotify_user_playlists(
+            user,
+            playlists,
+            only_owned_by_user=only_owned_by_user,
+            only_non_collaborative=only_non_collaborative
+        )
+    except SpotifyException as e:
+        logger.warning('Error fetching playlists: %s', e)
+        return None
+
+
+async def aget_spotify_playlist(
+        spotify_client,
+        playlist_id: str,
+        page: int = 1,
+        page_size: int = 20,
+        fields=None
+    ):
+    """
+    Async version of get_spotify_playlist, taking an async Spotify client.
+    """
+    offset = (page - 1) * page_size
+    playlist_fields, tracks_fields = get_spotify_fields_expressions(fields)
+
+    playlist_data = await acall_spotify(
+        spotify_client.playlist, playlist_id, fields=playlist_fields
+    )
+
+    cached_page = await sync_to_async(get_cached_playlist_page)(playlist_data, offset, page_size)
+    if cached_page is not None:
+        playlist_data['total_tracks'], playlist_data['tracks'] = cached_page
+        return playlist_data
+
+    tracks_response = await acall_spotify(
+        spotify_client.playlist_tracks,
+        playlist_id,
+        offset=offset,
+        limit=page_size,
+        additional_types=['track'],
+        fields=tracks_fields
+    )
+    if fields is None:
+        await sync_to_async(cache_playlist_page)(playlist_data, offset, tracks_response)
+
+    return add_playlist_tracks(playlist_data, tracks_response)
@@ -0,0 +1,244 @@
+import asyncio
+from datetime import timedelta
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from unittest import skipIf
+from unittest.mock import patch
+from core.async_spotify_client import get_http_client, httpx
+from core.models import SpotifyUserPlaylist
+from core.tests.factories.user_factory import UserFactory
+
+
+@skipIf(httpx is None, 'httpx is not installed')
+class AsyncSpotifyViewTests(TestCase):
+    def setUp(self):
+        self.user = UserFactory(
+            spotify_id='test_user_id',
+            spotify_access_token='test_access_token',
+            spotify_access_token_expires_at=timezone.now() + timedelta(hours=1)
+        )
+        access_token = str(RefreshToken.for_user(self.user).access_token)
+        self.auth_headers = {'Authorization': f'Bearer {access_token}'}
+        self.spotify_requests = []
+        self.snapshot_id = 'snapshot1'
+
+        playlist_template = {
+            'collaborative': False,
+            'description': 'A playlist',
+            'images': [{'url': 'https://example.com/playlist.jpg'}],
+            'owner': {'id': 'test_user_id', 'display_name': 'Test User'},
+            'tracks': {'total': 3},
+        }
+        self.playlist_pages = {
+            offset: {
+                'items': [{**playlist_template, 'id': f'playlist_{offset}', 'name': f'Playlist {offset}'}],
+                'next': None if offset == 100 else 'next',
+                'total': 150,
+            }
+            for offset in (0, 50, 100)
+        }
+        self.playlist_pages[50]['items'].append({
+            **playlist_template,
+            'id': 'other_users_playlist',
+            'name': 'Not Mine',
+            'owner': {'id': 'someone_else'},
+        })
+
+    def spotify_handler(self, request):
+        self.spotify_requests.append(request)
+        self.assertEqual(request.headers['Authorization'], 'Bearer test_access_token')
+        path = request.url.path.removeprefix('/v1/')
+
+        if path == 'me/playlists':
+            return httpx.Response(200, json=self.playlist_pages[int(request.url.params['offset'])])
+        if path == 'playlists/playlist123':
+            return httpx.Response(200, json={
+                'id': 'playlist123',
+                'name': 'Test Playlist',
+                'description': 'A test playlist',
+                'images': [],
+                'followers': {'total': 100},
+                'snapshot_id': self.snapshot_id,
+            })
+        if path == 'playlists/playlist123/tracks':
+            return httpx.Response(200, json={
+                'items': [{'track': {
+                    'id': 'track1',
+                    'name': 'Test Track',
+                    'duration_ms': 300000,
+                    'album': {'name': 'Test Album', 'images': [{'url': 'https://example.com/album.jpg'}]},
+                    'artists': [{'name': 'Test Artist'}],
+                }}],
+                'total': 50,
+            })
+        return httpx.Response(404, json={'error': {'status': 404, 'message': 'Not found'}})
+
+    def mock_http_client(self):
+        return httpx.AsyncClient(
+            base_url=settings.SPOTIFY_API_PREFIX,
+            transport=httpx.MockTransport(self.spotify_handler)
+        )
+
+    async def test_authentication_required(self):
+        """Test that the async endpoints require a bearer token"""
+        response = await self.async_client.get(reverse('async_spotify_user_playlists_summary'))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_invalid_token_rejected(self):
+        """Test that a malformed bearer token is rejected"""
+        response = await self.async_client.get(
+            reverse('async_spotify_user_playlists_summary'),
+            headers={'Authorization': 'Bearer not-a-jwt'}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_playlists_summary(self):
+        """Test that playlist pages are fetched concurrently and filtered in order"""
+        with patch('core.async_spotify_client.build_http_client', self.mock_http_client):
+            response = await self.async_client.get(
+                reverse('async_spotify_user_playlists_summary'),
+                headers=self.auth_headers
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [playlist['id'] for playlist in response.json()],
+            ['playlist_0', 'playlist_50', 'playlist_100']
+        )
+        self.assertEqual(response.json()[0]['track_count'], 3)
+        self.assertEqual(len(self.spotify_requests), 3)
+
+    async def test_playlist_detail(self):
+        """Test that the async detail view returns the same shape as the sync one"""
+        with patch('core.async_spotify_client.build_http_client', self.mock_http_client):
+            response = await self.async_client.get(
+                reverse('async-spotify-user-playlist-detail', kwargs={'spotify_playlist_id': 'playlist123'}),
+                {'page_size': 10},
+                headers=self.auth_headers
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['count'], 50)
+        self.assertIn('page=2', data['next'])
+        self.assertIsNone(data['previous'])
+        self.assertEqual(data['results']['name'], 'Test Playlist')
+        self.assertEqual(data['results']['tracks'][0]['artists'], ['Test Artist'])
+        self.assertEqual(self.spotify_requests[-1].url.params['limit'], '10')
+
+    async def test_invalid_page_number(self):
+        """Test handling of invalid page number"""
+        with patch('core.async_spotify_client.build_http_client', self.mock_http_client):
+            response = await self.async_client.get(
+                reverse('async-spotify-user-playlist-detail', kwargs={'spotify_playlist_id': 'playlist123'}),
+                {'page': 'invalid'},
+                headers=self.auth_headers
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['error'], 'Invalid page number')
+
+
+    async def test_playlists_summary_not_modified(self):
+        """Test that the async summary honours If-None-Match like the sync one"""
+        url = reverse('async_spotify_user_playlists_summary')
+        with patch('core.async_spotify_client.build_http_client', self.mock_http_client):
+            response = await self.async_client.get(url, headers=self.auth_headers)
+            etag = response['ETag']
+            response = await self.async_client.get(
+                url, headers={**self.auth_headers, 'If-None-Match': etag}
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('private', response['Cache-Control'])
+
+    async def test_playlists_search(self):
+        """Test that q and sort are answered from the local library, as in the sync view"""
+        self.user.spotify_library_synced_at = timezone.now()
+        await self.user.asave()
+        await SpotifyUserPlaylist.objects.abulk_create([
+            SpotifyUserPlaylist(
+                user=self.user,
+                spotify_id=spotify_id,
+                position=position,
+                snapshot_id=f'{spotify_id}-snapshot',
+                name=name,
+                owner_spotify_id='test_user_id',
+                track_count=track_count,
+            )
+            for position, (spotify_id, name, track_count) in enumerate([
+                ('p1', 'Morning Run', 40),
+                ('p2', 'evening chill', 12),
+                ('p3', 'Long Run', 8),
+            ])
+        ])
+        url = reverse('async_spotify_user_playlists_summary')
+
+        with patch('core.async_spotify_client.build_http_client', self.mock_http_client):
+            response = await self.async_client.get(url, {'q': 'run', 'sort': 'name'}, headers=self.auth_headers)
+            invalid_response = await self.async_client.get(url, {'sort': 'popularity'}, headers=self.auth_headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([playlist['id'] for playlist in response.json()], ['p3', 'p1'])
+        self.assertIn('ETag', response)
+        self.assertEqual(invalid_response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.spotify_requests, [])
+
+    async def test_playlist_detail_not_modified(self):
+        """Test that the async detail view honours If-None-Match like the sync one"""
+        url = reverse('async-spotify-user-playlist-detail', kwargs={'spotify_playlist_id': 'playlist123'})
+        with patch('core.async_spotify_client.build_http_client', self.mock_http_client):
+            response = await self.async_client.get(url, headers=self.auth_headers)
+            etag = response['ETag']
+            response = await self.async_client.get(
+                url, headers={**self.auth_headers, 'If-None-Match': etag}
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    async def test_playlist_detail_cursor_walk(self):
+        """Test cursor pagination on the async detail view, including a playlist changing mid-walk"""
+        url = reverse('async-spotify-user-playlist-detail', kwargs={'spotify_playlist_id': 'playlist123'})
+        with patch('core.async_spotify_client.build_http_client', self.mock_http_client):
+            response = await self.async_client.get(
+                url, {'pagination': 'cursor', 'page_size': 10}, headers=self.auth_headers
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            next_url = response.json()['next']
+            self.assertIn('cursor=', next_url)
+            self.assertNotIn('page_size=', next_url)
+
+            response = await self.async_client.get(next_url, headers=self.auth_headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(self.spotify_requests[-1].url.params['offset'], '10')
+            self.assertIn('cursor=', response.json()['previous'])
+
+            self.snapshot_id = 'snapshot2'
+            response = await self.async_client.get(next_url, headers=self.auth_headers)
+            self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+            self.assertEqual(response.json()['snapshot_id'], 'snapshot2')
+
+            response = await self.async_client.get(url, {'cursor': 'not-a-cursor'}, headers=self.auth_headers)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.json()['error'], 'Invalid cursor')
+
+@skipIf(httpx is None, 'httpx is not installed')
+class AsyncHttpClientTests(SimpleTestCase):
+    def test_client_closed_on_loop_shutdown(self):
+        """Test that the per-loop HTTP client is closed when its event loop shuts down"""
+        async def get_client():
+            http_client = get_http_client()
+            self.assertIs(get_http_client(), http_client)
+            return http_client
+
+        http_client = asyncio.run(get_client())
+
+        self.assertTrue(http_client.is_closed)
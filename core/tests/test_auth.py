@@ -1,8 +1,10 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
 from core.tests.factories.user_factory import UserFactory
 from unittest.mock import patch, MagicMock
 from urllib.parse import parse_qs, urlparse
@@ -105,6 +107,31 @@ class SpotifyCallbackViewTests(APITestCase):
         self.assertEqual(updated_user.email, 'test@example.com')  # Updated email
         self.assertEqual(updated_user.spotify_display_name, 'Test User')  # Updated name
 
+    @patch('core.views.SpotifyOAuth')
+    @patch('core.views.Spotify')
+    def test_callback_upserts_user_in_one_statement(self, mock_spotify, mock_spotify_oauth):
+        """Test that logging in writes the user with a single statement, however often it happens"""
+        mock_oauth_instance = MagicMock()
+        mock_oauth_instance.get_access_token.return_value = self.token_data
+        mock_spotify_oauth.return_value = mock_oauth_instance
+
+        mock_spotify_instance = MagicMock()
+        mock_spotify_instance.current_user.return_value = self.spotify_user_data
+        mock_spotify.return_value = mock_spotify_instance
+
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f'{self.callback_url}?code=test_code')
+
+            self.assertEqual(response.status_code, 302)
+            user_queries = [query['sql'] for query in queries if 'core_user' in query['sql']]
+            self.assertEqual(len(user_queries), 1)
+            self.assertIn('ON CONFLICT', user_queries[0])
+
+        user = User.objects.get(spotify_id='spotify_test_id')
+        self.assertEqual(user.spotify_access_token, 'spotify_test_access_token')
+        self.assertTrue(OutstandingToken.objects.filter(user=user).exists())
+
     @patch('core.views.SpotifyOAuth')
     def test_invalid_code(self, mock_spotify_oauth):
         """Test callback with invalid authorization code"""
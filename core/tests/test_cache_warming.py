@@ -0,0 +1,199 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from unittest.mock import MagicMock, patch
+from core.cache_warming import UpstreamBudget, record_user_activity, warm_user
+from core.models import SpotifyPlaylist, SpotifyUserPlaylist, User
+from core.tests.factories.user_factory import UserFactory
+
+
+def make_playlist(spotify_id):
+    return {
+        'id': spotify_id,
+        'name': f'Playlist {spotify_id}',
+        'description': '',
+        'images': [],
+        'owner': {'id': 'test_user_id', 'display_name': 'Test User'},
+        'followers': {'total': 0},
+        'collaborative': False,
+        'snapshot_id': f'{spotify_id}-snapshot',
+        'tracks': {'total': 3},
+    }
+
+
+def make_track(index):
+    return {
+        'id': f'track{index}',
+        'name': f'Track {index}',
+        'duration_ms': 1000,
+        'album': {'id': 'album', 'name': 'Album', 'images': []},
+        'artists': [{'id': 'artist', 'name': 'Artist'}],
+    }
+
+
+class UserActivityTests(APITestCase):
+    def test_token_refresh_records_activity(self):
+        """Test that refreshing a token marks the user as active"""
+        user = UserFactory()
+        refresh = RefreshToken.for_user(user)
+
+        response = self.client.post(reverse('token_refresh'), {'refresh': str(refresh)})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertIsNotNone(user.last_login)
+
+    @override_settings(USER_ACTIVITY_STAMP_INTERVAL_SECONDS=1800)
+    def test_recent_activity_not_restamped(self):
+        """Test that activity is only written once the last stamp is older than the interval"""
+        recent_user = UserFactory()
+        idle_user = UserFactory()
+        recently = timezone.now() - timedelta(minutes=10)
+        long_ago = timezone.now() - timedelta(hours=1)
+        User.objects.filter(pk=recent_user.pk).update(last_login=recently)
+        User.objects.filter(pk=idle_user.pk).update(last_login=long_ago)
+
+        record_user_activity(recent_user.pk)
+        record_user_activity(idle_user.pk)
+
+        recent_user.refresh_from_db()
+        idle_user.refresh_from_db()
+        self.assertEqual(recent_user.last_login, recently)
+        self.assertGreater(idle_user.last_login, long_ago)
+
+
+@patch('spotipy.Spotify')
+class WarmSpotifyCachesCommandTests(TestCase):
+    def setUp(self):
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        settings_override = override_settings(
+            SPOTIFY_RATE_LIMIT_STATE_FILE=os.path.join(state_dir.name, 'rate-limit'),
+            SPOTIFY_RATE_LIMIT_PER_SECOND=1000,
+            SPOTIFY_RATE_LIMIT_BURST=1000
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = UserFactory(spotify_id='test_user_id', spotify_access_token_expires_at=None)
+        User.objects.filter(pk=self.user.pk).update(last_login=timezone.now())
+        self.idle_user = UserFactory(spotify_access_token_expires_at=None)
+        User.objects.filter(pk=self.idle_user.pk).update(last_login=timezone.now() - timedelta(days=1))
+
+        self.playlists = [make_playlist(f'p{index}') for index in range(3)]
+        self.tracks = [make_track(index) for index in range(3)]
+
+    def mock_spotify_client(self, mock_spotify):
+        mock_instance = MagicMock()
+        mock_instance.current_user_playlists.return_value = {
+            'items': self.playlists,
+            'next': None,
+            'total': len(self.playlists),
+        }
+        mock_instance.playlist.side_effect = lambda playlist_id, **kwargs: make_playlist(playlist_id)
+        mock_instance.playlist_tracks.side_effect = lambda playlist_id, offset=0, limit=100, **kwargs: {
+            'items': [{'track': track} for track in self.tracks[offset:offset + limit]],
+            'total': len(self.tracks),
+        }
+        mock_spotify.return_value = mock_instance
+        return mock_instance
+
+    def warm(self):
+        stdout = StringIO()
+        call_command(
+            'warm_spotify_caches',
+            '--playlists-per-user=2',
+            '--calls-per-second=1000',
+            stdout=stdout
+        )
+        return stdout.getvalue()
+
+    def test_warms_active_users(self, mock_spotify):
+        """Test that active users get their library and first playlist pages stored"""
+        mock_instance = self.mock_spotify_client(mock_spotify)
+
+        output = self.warm()
+
+        self.assertIn('Warmed 1 users and 2 playlist pages', output)
+        self.assertEqual(SpotifyUserPlaylist.objects.filter(user=self.user).count(), 3)
+        self.assertFalse(SpotifyUserPlaylist.objects.filter(user=self.idle_user).exists())
+        self.assertEqual(
+            sorted(SpotifyPlaylist.objects.values_list('spotify_id', flat=True)),
+            ['p0', 'p1']
+        )
+        self.assertEqual(mock_instance.playlist_tracks.call_count, 2)
+
+    def test_budget_checked_before_every_listing_page(self, mock_spotify):
+        """Test that the library listing is fetched one page at a time, each within the budget"""
+        mock_instance = self.mock_spotify_client(mock_spotify)
+        self.playlists = [make_playlist(f'p{index}') for index in range(120)]
+        calls = []
+
+        def current_user_playlists(limit=50, offset=0):
+            calls.append(('listing', offset))
+            return {
+                'items': self.playlists[offset:offset + limit],
+                'next': 'next' if offset + limit < len(self.playlists) else None,
+                'total': len(self.playlists),
+            }
+
+        mock_instance.current_user_playlists.side_effect = current_user_playlists
+        budget = MagicMock()
+        budget.wait.side_effect = lambda: calls.append('wait')
+
+        warm_user(self.user, budget, playlists_per_user=0, page_size=20)
+
+        self.assertEqual(calls, ['wait', ('listing', 0), 'wait', ('listing', 50), 'wait', ('listing', 100)])
+        self.assertEqual(SpotifyUserPlaylist.objects.filter(user=self.user).count(), 120)
+
+    def test_warm_caches_not_refetched(self, mock_spotify):
+        """Test that a second sweep makes no Spotify calls while everything is still warm"""
+        mock_instance = self.mock_spotify_client(mock_spotify)
+        self.warm()
+        mock_instance.reset_mock()
+
+        output = self.warm()
+
+        self.assertIn('with 0 Spotify calls', output)
+        mock_instance.current_user_playlists.assert_not_called()
+        mock_instance.playlist.assert_not_called()
+
+
+class UpstreamBudgetTests(SimpleTestCase):
+    def setUp(self):
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        settings_override = override_settings(
+            SPOTIFY_RATE_LIMIT_STATE_FILE=os.path.join(state_dir.name, 'rate-limit'),
+            SPOTIFY_RATE_LIMIT_PER_SECOND=10,
+            SPOTIFY_RATE_LIMIT_BURST=10
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.sleeps = []
+
+    def test_waits_out_fleet_block(self):
+        """Test that the crawler stays quiet while a 429 has the fleet blocked"""
+        budget = UpstreamBudget(calls_per_second=100, min_headroom=0, sleep=self.sleeps.append)
+
+        with patch.object(budget.rate_limiter, 'blocked_for', side_effect=[30, 0]):
+            budget.wait()
+
+        self.assertEqual(self.sleeps, [30])
+
+    def test_waits_for_headroom(self):
+        """Test that the crawler waits while interactive traffic is using the bucket"""
+        budget = UpstreamBudget(calls_per_second=100, min_headroom=0.5, sleep=self.sleeps.append)
+
+        with patch.object(budget.rate_limiter, 'available_tokens', side_effect=[2, 4, 6]):
+            budget.wait()
+
+        self.assertEqual(self.sleeps, [0.3, 0.1])
@@ -0,0 +1,206 @@
+import json
+import os
+import tempfile
+import threading
+from asgiref.sync import iscoroutinefunction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from unittest.mock import MagicMock, patch
+from spotipy.exceptions import SpotifyException
+from core.metrics import PROMETHEUS_CONTENT_TYPE, MetricsRegistry, registry
+from core.middleware import MetricsMiddleware
+from core.spotify_gateway import call_spotify
+from core.tests.factories.user_factory import UserFactory
+
+
+def metrics_dir_override(test_case, **settings):
+    metrics_dir = tempfile.TemporaryDirectory()
+    test_case.addCleanup(metrics_dir.cleanup)
+
+    settings_override = override_settings(METRICS_ENABLED=True, METRICS_DIR=metrics_dir.name, **settings)
+    settings_override.enable()
+    test_case.addCleanup(settings_override.disable)
+
+    return metrics_dir.name
+
+
+class MetricsRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.metrics_dir = metrics_dir_override(self)
+        self.registry = MetricsRegistry()
+        self.addCleanup(self.registry.reset)
+        self.requests = self.registry.counter('test_requests_total', 'Requests.', ('status',))
+        self.latency = self.registry.histogram('test_latency_seconds', 'Latency.', buckets=(0.1, 1.0))
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that histograms are rendered with cumulative buckets, a sum and a count"""
+        for value in (0.05, 0.5, 0.5, 5):
+            self.latency.observe(value)
+
+        lines = self.registry.render().splitlines()
+
+        self.assertIn('# TYPE test_latency_seconds histogram', lines)
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 1', lines)
+        self.assertIn('test_latency_seconds_bucket{le="1.0"} 3', lines)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 4', lines)
+        self.assertIn('test_latency_seconds_sum 6.05', lines)
+        self.assertIn('test_latency_seconds_count 4', lines)
+
+    def test_merges_other_processes(self):
+        """Test that a scrape adds up the values every worker has written out"""
+        with open(os.path.join(self.metrics_dir, '1234-1.json'), 'w') as metrics_file:
+            json.dump({
+                'counters': [['test_requests_total', ['200'], 5]],
+                'histograms': [['test_latency_seconds', [], [1, 0, 0], 0.05, 1]],
+            }, metrics_file)
+
+        self.requests.inc(status=200)
+        self.requests.inc(status=500)
+        self.latency.observe(0.5)
+
+        lines = self.registry.render().splitlines()
+
+        self.assertIn('test_requests_total{status="200"} 6', lines)
+        self.assertIn('test_requests_total{status="500"} 1', lines)
+        self.assertIn('test_latency_seconds_bucket{le="1.0"} 2', lines)
+        self.assertIn('test_latency_seconds_count 2', lines)
+
+    def test_label_values_are_escaped(self):
+        """Test that quotes and backslashes in label values are escaped"""
+        self.requests.inc(status='a "quoted" \\ value')
+
+        self.assertIn('test_requests_total{status="a \\"quoted\\" \\\\ value"} 1', self.registry.render())
+
+    def test_flushes_to_own_file(self):
+        """Test that each process writes its values to a file of its own"""
+        self.requests.inc(status=200)
+        self.registry.flush()
+
+        file_names = os.listdir(self.metrics_dir)
+        self.assertEqual(len(file_names), 1)
+        self.assertTrue(file_names[0].startswith(f'{os.getpid()}-'))
+
+    @override_settings(METRICS_FLUSH_INTERVAL_SECONDS=0.01)
+    def test_flushes_in_background(self):
+        """Test that values are written out by a thread of their own, not by the recording request"""
+        flushed = threading.Event()
+        flush_threads = []
+
+        def flush():
+            flush_threads.append(threading.current_thread())
+            flushed.set()
+
+        with patch.object(self.registry, 'flush', side_effect=flush):
+            self.requests.inc(status=200)
+            self.assertTrue(flushed.wait(timeout=5))
+
+        self.assertNotIn(threading.current_thread(), flush_threads)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        """Test that nothing is recorded when metrics are disabled"""
+        self.requests.inc(status=200)
+
+        self.assertNotIn('test_requests_total{', self.registry.render())
+
+
+@patch('spotipy.Spotify')
+class MetricsEndpointTests(APITestCase):
+    def setUp(self):
+        metrics_dir_override(self)
+        registry.reset()
+        self.user = UserFactory(spotify_id='test_user_id', spotify_access_token_expires_at=None)
+        self.url = reverse('metrics')
+
+    def authenticate(self, user):
+        access_token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+    def test_requires_admin(self, mock_spotify):
+        """Test that only superusers can read the metrics"""
+        self.authenticate(self.user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_reports_requests_spotify_calls_and_caches(self, mock_spotify):
+        """Test that request, Spotify call and cache metrics are exported"""
+        mock_instance = MagicMock()
+        mock_instance.current_user_playlists.return_value = {'items': [], 'next': None, 'total': 0}
+        mock_spotify.return_value = mock_instance
+        self.authenticate(self.user)
+        self.client.get(reverse('spotify_user_playlists_summary'))
+        self.client.get(reverse('spotify_user_playlists_summary'), {'q': 'road'})
+
+        admin = UserFactory(spotify_id='admin_id', is_superuser=True)
+        self.authenticate(admin)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], PROMETHEUS_CONTENT_TYPE)
+        body = response.content.decode()
+        self.assertIn(
+            'noshuff_requests_total{url_name="spotify_user_playlists_summary",method="GET",status="200"} 2',
+            body
+        )
+        self.assertIn(
+            'noshuff_request_duration_seconds_count{url_name="spotify_user_playlists_summary",method="GET"} 2',
+            body
+        )
+        self.assertIn('noshuff_spotify_calls_total{', body)
+        self.assertIn('noshuff_cache_requests_total{cache="user_library",result="miss"} 1', body)
+
+
+class MetricsMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        metrics_dir_override(self)
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    async def test_async_request(self):
+        """Test that async requests are counted without adapting the stack to sync"""
+        async def get_response(request):
+            return HttpResponse(status=204)
+
+        middleware = MetricsMiddleware(get_response)
+        response = await middleware(RequestFactory().get('/unknown'))
+
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertEqual(response.status_code, 204)
+        self.assertIn('noshuff_requests_total{url_name="unmatched",method="GET",status="204"} 1', registry.render())
+
+
+class SpotifyCallMetricsTests(SimpleTestCase):
+    def setUp(self):
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        metrics_dir_override(
+            self,
+            SPOTIFY_RATE_LIMIT_STATE_FILE=os.path.join(state_dir.name, 'rate-limit'),
+            SPOTIFY_RATE_LIMIT_PER_SECOND=100,
+            SPOTIFY_RATE_LIMIT_BURST=10,
+            SPOTIFY_RATE_LIMIT_MAX_RETRIES=2
+        )
+        registry.reset()
+
+    def test_counts_calls_rate_limits_and_retries(self):
+        """Test that Spotify calls are counted by method and status, with 429s and retries"""
+        method = MagicMock(side_effect=[
+            SpotifyException(429, -1, 'Too many requests', headers={'Retry-After': '0.01'}),
+            {'id': 'playlist123'},
+        ])
+        method.__name__ = 'playlist'
+
+        call_spotify(method, 'playlist123')
+
+        lines = registry.render().splitlines()
+        self.assertIn('noshuff_spotify_calls_total{method="playlist",status="200"} 1', lines)
+        self.assertIn('noshuff_spotify_calls_total{method="playlist",status="429"} 1', lines)
+        self.assertIn('noshuff_spotify_rate_limited_total{method="playlist"} 1', lines)
+        self.assertIn('noshuff_spotify_retries_total{method="playlist"} 1', lines)
+        self.assertIn('noshuff_spotify_call_duration_seconds_count{method="playlist"} 2', lines)
@@ -0,0 +1,41 @@
+from datetime import timedelta
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+
+class UniqueSpotifyIdMigrationTests(TransactionTestCase):
+    migrate_from = [('core', '0009_spotify_user_playlist_name_trgm')]
+    migrate_to = [('core', '0011_user_spotify_id_unique')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        self.apps = executor.loader.project_state(self.migrate_from).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicates_deleted_before_constraint_added(self):
+        """Test that migrating with duplicate Spotify users keeps the most recently updated one"""
+        User = self.apps.get_model('core', 'User')
+        SpotifyUserPlaylist = self.apps.get_model('core', 'SpotifyUserPlaylist')
+        stale_user = User.objects.create(email='stale@example.com', spotify_id='dup')
+        current_user = User.objects.create(email='current@example.com', spotify_id='dup')
+        other_user = User.objects.create(email='other@example.com', spotify_id='other')
+        User.objects.filter(pk=stale_user.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        # Deleting it cascades, which is what left PostgreSQL with pending trigger events
+        SpotifyUserPlaylist.objects.create(user=stale_user, spotify_id='p1', position=0, name='Playlist')
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.migrate_to)
+
+        User = executor.loader.project_state(self.migrate_to).apps.get_model('core', 'User')
+        self.assertEqual(
+            sorted(User.objects.values_list('pk', flat=True)),
+            sorted([current_user.pk, other_user.pk])
+        )
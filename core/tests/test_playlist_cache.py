@@ -0,0 +1,169 @@
+from django.test import TestCase
+from unittest.mock import MagicMock
+from core.models import (
+    SpotifyAlbum,
+    SpotifyArtist,
+    SpotifyPlaylist,
+    SpotifyPlaylistTrack,
+    SpotifyTrack,
+)
+from core.catalog import get_spotify_track_dicts, upsert_spotify_tracks
+from core.spotipy_utils import get_spotify_playlist
+
+
+class SpotifyPlaylistCacheTests(TestCase):
+    def setUp(self):
+        self.playlist_response = {
+            'id': 'playlist123',
+            'name': 'Cached Playlist',
+            'description': 'A playlist worth caching',
+            'images': [{'url': 'https://example.com/playlist.jpg'}],
+            'owner': {'display_name': 'Test User'},
+            'followers': {'total': 7},
+            'snapshot_id': 'snapshot-1',
+        }
+        self.tracks = [
+            {
+                'id': f'track{index}',
+                'name': f'Track {index}',
+                'duration_ms': 1000 * index,
+                'album': {
+                    'id': f'album{index % 3}',
+                    'name': f'Album {index % 3}',
+                    'images': [{'url': f'https://example.com/album{index % 3}.jpg'}],
+                },
+                'artists': [
+                    {'id': 'artist_a', 'name': 'Artist A'},
+                    {'id': f'artist{index % 2}', 'name': f'Artist {index % 2}'},
+                ],
+            }
+            for index in range(25)
+        ]
+
+        self.spotify_client = MagicMock()
+        self.spotify_client.playlist.side_effect = lambda *args, **kwargs: dict(self.playlist_response)
+        self.spotify_client.playlist_tracks.side_effect = self.mock_playlist_tracks
+
+    def mock_playlist_tracks(self, playlist_id, offset=0, limit=100, **kwargs):
+        return {
+            'items': [{'track': track} for track in self.tracks[offset:offset + limit]],
+            'total': len(self.tracks),
+        }
+
+    def test_first_read_stores_page(self):
+        """Test that a fetched page is stored under the playlist snapshot"""
+        result = get_spotify_playlist(self.spotify_client, 'playlist123', page=1, page_size=10)
+
+        self.assertEqual(len(result['tracks']), 10)
+        playlist = SpotifyPlaylist.objects.get(spotify_id='playlist123')
+        self.assertEqual(playlist.snapshot_id, 'snapshot-1')
+        self.assertEqual(playlist.total_tracks, 25)
+        self.assertEqual(playlist.playlist_tracks.count(), 10)
+
+    def test_unchanged_snapshot_served_locally(self):
+        """Test that re-reading a page with the same snapshot skips the track fetch"""
+        first = get_spotify_playlist(self.spotify_client, 'playlist123', page=2, page_size=10)
+        second = get_spotify_playlist(self.spotify_client, 'playlist123', page=2, page_size=10)
+
+        self.assertEqual(self.spotify_client.playlist_tracks.call_count, 1)
+        self.assertEqual(second['tracks'], first['tracks'])
+        self.assertEqual(second['total_tracks'], 25)
+        self.assertEqual(second['name'], 'Cached Playlist')
+
+    def test_partial_last_page_served_locally(self):
+        """Test that a short final page counts as fully cached"""
+        get_spotify_playlist(self.spotify_client, 'playlist123', page=3, page_size=10)
+        result = get_spotify_playlist(self.spotify_client, 'playlist123', page=3, page_size=10)
+
+        self.assertEqual(self.spotify_client.playlist_tracks.call_count, 1)
+        self.assertEqual([track['id'] for track in result['tracks']], [f'track{i}' for i in range(20, 25)])
+
+    def test_uncached_page_fetched(self):
+        """Test that a page that was never stored goes to Spotify"""
+        get_spotify_playlist(self.spotify_client, 'playlist123', page=1, page_size=10)
+        get_spotify_playlist(self.spotify_client, 'playlist123', page=2, page_size=10)
+
+        self.assertEqual(self.spotify_client.playlist_tracks.call_count, 2)
+        self.assertEqual(SpotifyPlaylistTrack.objects.count(), 20)
+
+    def test_changed_snapshot_invalidates_rows(self):
+        """Test that a new snapshot discards rows stored for the old one"""
+        get_spotify_playlist(self.spotify_client, 'playlist123', page=2, page_size=10)
+
+        self.playlist_response['snapshot_id'] = 'snapshot-2'
+        self.tracks = self.tracks[::-1]
+        result = get_spotify_playlist(self.spotify_client, 'playlist123', page=1, page_size=10)
+
+        self.assertEqual(self.spotify_client.playlist_tracks.call_count, 2)
+        self.assertEqual(result['tracks'][0]['id'], 'track24')
+        playlist = SpotifyPlaylist.objects.get(spotify_id='playlist123')
+        self.assertEqual(playlist.snapshot_id, 'snapshot-2')
+        self.assertEqual(
+            list(playlist.playlist_tracks.values_list('position', flat=True)),
+            list(range(10))
+        )
+
+    def test_non_track_items_kept_out_of_results(self):
+        """Test that non-track items hold their position but are not returned"""
+        self.tracks[1] = None
+        get_spotify_playlist(self.spotify_client, 'playlist123', page=1, page_size=5)
+        result = get_spotify_playlist(self.spotify_client, 'playlist123', page=1, page_size=5)
+
+        self.assertEqual(self.spotify_client.playlist_tracks.call_count, 1)
+        self.assertEqual(len(result['tracks']), 4)
+
+    def test_catalog_deduplicates_albums_and_artists(self):
+        """Test that shared albums and artists are stored once across playlists"""
+        get_spotify_playlist(self.spotify_client, 'playlist123', page=1, page_size=25)
+        self.playlist_response['id'] = 'playlist456'
+        get_spotify_playlist(self.spotify_client, 'playlist456', page=1, page_size=25)
+
+        self.assertEqual(SpotifyTrack.objects.count(), 25)
+        self.assertEqual(SpotifyAlbum.objects.count(), 3)
+        self.assertEqual(SpotifyArtist.objects.count(), 3)
+        self.assertEqual(SpotifyPlaylistTrack.objects.count(), 50)
+
+    def test_cached_tracks_match_spotify_shape(self):
+        """Test that tracks rebuilt from the catalog keep album art and artist order"""
+        get_spotify_playlist(self.spotify_client, 'playlist123', page=1, page_size=5)
+        result = get_spotify_playlist(self.spotify_client, 'playlist123', page=1, page_size=5)
+
+        self.assertEqual(self.spotify_client.playlist_tracks.call_count, 1)
+        track = result['tracks'][1]
+        self.assertEqual(track['name'], 'Track 1')
+        self.assertEqual(track['duration_ms'], 1000)
+        self.assertEqual(track['album']['name'], 'Album 1')
+        self.assertEqual(track['album']['images'][0]['url'], 'https://example.com/album1.jpg')
+        self.assertEqual(
+            [artist['name'] for artist in track['artists']],
+            ['Artist A', 'Artist 1']
+        )
+
+    def test_track_artists_replaced(self):
+        """Test that re-storing a track drops artists it no longer lists and repeated ones"""
+        upsert_spotify_tracks([self.tracks[1]])
+        track = {
+            **self.tracks[1],
+            'artists': [
+                {'id': 'artist_b', 'name': 'Artist B'},
+                {'id': 'artist_a', 'name': 'Artist A'},
+                {'id': 'artist_b', 'name': 'Artist B'},
+            ],
+        }
+
+        track_pks = upsert_spotify_tracks([track])
+
+        self.assertEqual(
+            [artist['name'] for artist in get_spotify_track_dicts([track_pks['track1']])[0]['artists']],
+            ['Artist B', 'Artist A']
+        )
+
+    def test_local_tracks_not_cached(self):
+        """Test that pages containing tracks without Spotify IDs are not stored"""
+        self.tracks[2] = {**self.tracks[2], 'id': None}
+        get_spotify_playlist(self.spotify_client, 'playlist123', page=1, page_size=5)
+        result = get_spotify_playlist(self.spotify_client, 'playlist123', page=1, page_size=5)
+
+        self.assertEqual(self.spotify_client.playlist_tracks.call_count, 2)
+        self.assertEqual(len(result['tracks']), 5)
+        self.assertEqual(SpotifyPlaylistTrack.objects.count(), 0)
@@ -0,0 +1,94 @@
+import random
+from django.test import SimpleTestCase, TestCase, override_settings
+from core.models import SpotifyPlaylist
+from core.playlist_history import (
+    apply_track_order_ops,
+    diff_track_orders,
+    get_playlist_track_order,
+    record_playlist_version,
+)
+
+
+class DiffTrackOrdersTests(SimpleTestCase):
+    def test_ops_rebuild_new_order(self):
+        """Test that applying the diff of two orders to the old one gives the new one"""
+        rng = random.Random(0)
+        for _ in range(200):
+            # Small alphabet so orders have duplicates, plus None for non-track items
+            old = [rng.choice([None, *range(30)]) for _ in range(rng.randint(0, 60))]
+            new = list(old)
+            for _ in range(rng.randint(0, 5)):
+                change = rng.choice(['insert', 'delete', 'move'])
+                if change == 'insert' or not new:
+                    new.insert(rng.randint(0, len(new)), rng.randint(0, 40))
+                elif change == 'delete':
+                    del new[rng.randrange(len(new))]
+                else:
+                    new.insert(rng.randint(0, len(new) - 1), new.pop(rng.randrange(len(new))))
+
+            ops = diff_track_orders(old, new)
+
+            if ops is not None:
+                self.assertEqual(apply_track_order_ops(old, ops), new)
+
+    def test_moved_track_is_one_op(self):
+        """Test that dragging a track to a new position costs a single move op"""
+        old = list(range(5000))
+        new = list(old)
+        new.insert(10, new.pop(4000))
+
+        self.assertEqual(diff_track_orders(old, new), [['m', 4000, 10]])
+
+    def test_edits_are_grouped(self):
+        """Test that consecutive deleted and inserted tracks are stored as one op each"""
+        old = list(range(100))
+        new = old[:10] + old[20:50] + [1000, 1001, 1002] + old[50:]
+
+        self.assertEqual(diff_track_orders(old, new), [['d', 10, 10], ['i', 40, [1000, 1001, 1002]]])
+
+    def test_full_reorder_not_diffed(self):
+        """Test that no script is returned when a full copy would be as small"""
+        self.assertIsNone(diff_track_orders(list(range(100)), list(reversed(range(100)))))
+
+
+@override_settings(PLAYLIST_HISTORY_CHECKPOINT_INTERVAL=3)
+class PlaylistHistoryTests(TestCase):
+    def setUp(self):
+        self.playlist = SpotifyPlaylist.objects.create(spotify_id='p1', snapshot_id='s0', name='Playlist')
+        rng = random.Random(0)
+        self.orders = [list(range(200))]
+        for _ in range(7):
+            order = list(self.orders[-1])
+            order.insert(rng.randint(0, len(order) - 1), order.pop(rng.randrange(len(order))))
+            order.insert(rng.randint(0, len(order)), rng.randint(1000, 2000))
+            del order[rng.randrange(len(order))]
+            self.orders.append(order)
+
+        for index, order in enumerate(self.orders):
+            record_playlist_version(self.playlist, f's{index}', order)
+
+    def test_checkpoints_every_interval(self):
+        """Test that full orders are only stored every checkpoint interval"""
+        versions = list(self.playlist.versions.values_list('sequence', 'checkpoint', 'ops'))
+
+        self.assertEqual([sequence for sequence, _, _ in versions], list(range(8)))
+        self.assertEqual([checkpoint is not None for _, checkpoint, _ in versions], [
+            True, False, False, True, False, False, True, False
+        ])
+        for _, checkpoint, ops in versions:
+            if checkpoint is None:
+                self.assertLessEqual(len(ops), 3)
+
+    def test_every_version_rebuilt(self):
+        """Test that each recorded snapshot's track order can be read back"""
+        for index, order in enumerate(self.orders):
+            self.assertEqual(get_playlist_track_order(self.playlist, f's{index}'), order)
+
+        self.assertIsNone(get_playlist_track_order(self.playlist, 'unknown'))
+
+    def test_snapshot_recorded_once(self):
+        """Test that recording a snapshot already in the history is a no-op"""
+        self.assertIsNone(record_playlist_version(self.playlist, 's7', self.orders[0]))
+
+        self.assertEqual(self.playlist.versions.count(), 8)
+        self.assertEqual(get_playlist_track_order(self.playlist, 's7'), self.orders[7])
@@ -0,0 +1,162 @@
+from datetime import timedelta
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from unittest.mock import patch, MagicMock
+from spotipy.exceptions import SpotifyException
+from core.models import SpotifyUserPlaylist, User
+from core.tests.factories.user_factory import UserFactory
+
+
+def make_playlist(spotify_id, name, track_count, owner_id='test_user_id', collaborative=False):
+    return {
+        'id': spotify_id,
+        'name': name,
+        'description': f'{name} description',
+        'images': [{'url': f'https://example.com/{spotify_id}.jpg'}],
+        'owner': {'id': owner_id},
+        'collaborative': collaborative,
+        'snapshot_id': f'{spotify_id}-snapshot',
+        'tracks': {'total': track_count},
+    }
+
+
+class SpotifyUserLibrarySearchTests(APITestCase):
+    def setUp(self):
+        # Started here rather than on the class so it outlives the background
+        # job drain below; jobs left queued must not reach the real Spotify
+        spotify_patch = patch('spotipy.Spotify')
+        self.mock_spotify = spotify_patch.start()
+        self.addCleanup(spotify_patch.stop)
+
+        self.user = UserFactory(spotify_id='test_user_id', spotify_access_token_expires_at=None)
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('spotify_user_playlists_summary')
+        self.playlists = [
+            make_playlist('p1', 'Morning Run', 40),
+            make_playlist('p2', 'evening chill', 12),
+            make_playlist('p3', 'Run Club', 90, owner_id='someone_else'),
+            make_playlist('p4', 'Road Trip', 150, collaborative=True),
+            make_playlist('p5', 'Long Run', 8),
+        ]
+
+        # Background refreshes are run by the tests, on the test's connection
+        self.background_jobs = []
+        run_in_background = patch(
+            'core.playlist_library.run_in_background',
+            side_effect=lambda fn, *args: self.background_jobs.append((fn, args))
+        )
+        run_in_background.start()
+        self.addCleanup(run_in_background.stop)
+        self.addCleanup(self.run_background_jobs)
+
+    def run_background_jobs(self):
+        while self.background_jobs:
+            fn, args = self.background_jobs.pop(0)
+            with patch('core.playlist_library.connection'):
+                fn(*args)
+
+    def mock_spotify_client(self):
+        mock_instance = MagicMock()
+        mock_instance.current_user_playlists.return_value = {
+            'items': self.playlists,
+            'next': None,
+            'total': len(self.playlists),
+        }
+        self.mock_spotify.return_value = mock_instance
+        return mock_instance
+
+    def get_ids(self, query):
+        response = self.client.get(f'{self.url}?{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [playlist['id'] for playlist in response.data]
+
+    def test_name_search(self):
+        """Test that q matches a case-insensitive substring of the name"""
+        self.mock_spotify_client()
+
+        self.assertEqual(self.get_ids('q=RUN'), ['p1', 'p5'])
+
+    def test_owned_and_collaborative_toggles(self):
+        """Test that the owned and collaborative filters can be turned off"""
+        self.mock_spotify_client()
+
+        self.assertEqual(self.get_ids('only_owned_by_user=false&q=run'), ['p1', 'p3', 'p5'])
+        self.assertEqual(self.get_ids('only_non_collaborative=false'), ['p1', 'p2', 'p4', 'p5'])
+
+    def test_track_count_range_and_sort(self):
+        """Test track count ranges combined with each sort order"""
+        self.mock_spotify_client()
+
+        self.assertEqual(self.get_ids('min_tracks=10&max_tracks=100'), ['p1', 'p2'])
+        self.assertEqual(self.get_ids('sort=name'), ['p2', 'p5', 'p1'])
+        self.assertEqual(self.get_ids('sort=-track_count'), ['p1', 'p2', 'p5'])
+
+    def test_response_shape(self):
+        """Test that search results have the same shape as the playlist summary"""
+        self.mock_spotify_client()
+
+        response = self.client.get(f'{self.url}?q=morning')
+
+        self.assertEqual(response.data, [{
+            'id': 'p1',
+            'name': 'Morning Run',
+            'description': 'Morning Run description',
+            'image_url': 'https://example.com/p1.jpg',
+            'track_count': 40,
+        }])
+        self.assertIn('ETag', response)
+
+        response = self.client.get(f'{self.url}?q=morning&fields=name')
+        self.assertEqual(response.data, [{'name': 'Morning Run'}])
+
+    def test_local_copy_reused_while_fresh(self):
+        """Test that searches within the sync window don't go back to Spotify"""
+        mock_instance = self.mock_spotify_client()
+
+        self.get_ids('q=run')
+        self.get_ids('sort=name')
+
+        self.assertEqual(mock_instance.current_user_playlists.call_count, 1)
+        self.assertEqual(SpotifyUserPlaylist.objects.filter(user=self.user).count(), 5)
+
+    @override_settings(SPOTIFY_LIBRARY_SYNC_MAX_AGE_SECONDS=0)
+    def test_stale_copy_served_while_refreshed_in_background(self):
+        """Test that a stale copy is served straight away and replaced in the background"""
+        mock_instance = self.mock_spotify_client()
+        self.get_ids('q=run')
+
+        self.playlists = self.playlists[:1]
+        self.mock_spotify_client()
+
+        self.assertEqual(self.get_ids('sort=name'), ['p2', 'p5', 'p1'])
+        self.assertEqual(self.get_ids('q=run'), ['p1', 'p5'])
+        self.assertEqual(len(self.background_jobs), 1)
+        self.assertEqual(mock_instance.current_user_playlists.call_count, 1)
+
+        self.run_background_jobs()
+
+        self.assertEqual(self.get_ids('sort=name'), ['p1'])
+        self.assertEqual(SpotifyUserPlaylist.objects.filter(user=self.user).count(), 1)
+
+    def test_stale_copy_kept_on_spotify_error(self):
+        """Test that the last copy keeps being served when the background refresh fails"""
+        mock_instance = self.mock_spotify_client()
+        self.get_ids('q=run')
+        self.user.spotify_library_synced_at = timezone.now() - timedelta(days=1)
+        User.objects.filter(pk=self.user.pk).update(spotify_library_synced_at=self.user.spotify_library_synced_at)
+        mock_instance.current_user_playlists.side_effect = SpotifyException(500, -1, 'Server error')
+
+        self.assertEqual(self.get_ids('q=run'), ['p1', 'p5'])
+        self.run_background_jobs()
+
+        self.assertEqual(mock_instance.current_user_playlists.call_count, 2)
+        self.assertEqual(self.get_ids('q=run'), ['p1', 'p5'])
+
+    def test_invalid_parameters(self):
+        """Test that malformed search parameters are rejected"""
+        for query in ('sort=popularity', 'min_tracks=lots', 'max_tracks=-1', 'only_owned_by_user=maybe'):
+            response = self.client.get(f'{self.url}?{query}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
@@ -0,0 +1,190 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from unittest.mock import MagicMock, patch
+from core.models import SpotifyPlaylist, SpotifyUserPlaylist
+from core.playlist_cache import cache_playlist_page
+from core.playlist_history import get_playlist_track_order
+from core.playlist_sync import sync_spotify_user_playlists
+from core.tests.factories.user_factory import UserFactory
+
+
+def make_playlist(spotify_id, snapshot_id='snapshot-1', track_count=3):
+    return {
+        'id': spotify_id,
+        'name': f'Playlist {spotify_id}',
+        'description': '',
+        'images': [],
+        'owner': {'id': 'test_user_id', 'display_name': 'Test User'},
+        'collaborative': False,
+        'snapshot_id': snapshot_id,
+        'tracks': {'total': track_count},
+    }
+
+
+def make_track(playlist_id, snapshot_id, index, local=False):
+    return {
+        'id': None if local else f'{playlist_id}-{snapshot_id}-track{index}',
+        'name': f'Track {index}',
+        'duration_ms': 1000,
+        'album': {'id': 'album', 'name': 'Album', 'images': []},
+        'artists': [{'id': 'artist', 'name': 'Artist'}],
+    }
+
+
+@patch('spotipy.Spotify')
+class IncrementalPlaylistSyncTests(TestCase):
+    def setUp(self):
+        self.user = UserFactory(spotify_id='test_user_id', spotify_access_token_expires_at=None)
+        self.playlists = [make_playlist('p1'), make_playlist('p2', track_count=250), make_playlist('p3')]
+        # Positions of local files, which the catalog can't store, by playlist
+        self.local_tracks = {}
+
+    def mock_spotify_client(self, mock_spotify):
+        def playlist_tracks(playlist_id, offset=0, limit=100, **kwargs):
+            playlist = next(playlist for playlist in self.playlists if playlist['id'] == playlist_id)
+            total = playlist['tracks']['total']
+            return {
+                'items': [
+                    {'track': make_track(
+                        playlist_id,
+                        playlist['snapshot_id'],
+                        index,
+                        local=index in self.local_tracks.get(playlist_id, ())
+                    )}
+                    for index in range(offset, min(offset + limit, total))
+                ],
+                'total': total,
+            }
+
+        mock_instance = MagicMock()
+        mock_instance.current_user_playlists.side_effect = lambda limit=50, offset=0: {
+            'items': self.playlists,
+            'next': None,
+            'total': len(self.playlists),
+        }
+        mock_instance.playlist_tracks.side_effect = playlist_tracks
+        mock_spotify.return_value = mock_instance
+        return mock_instance
+
+    def get_refetched_playlist_ids(self, mock_instance):
+        return sorted({call.args[0] for call in mock_instance.playlist_tracks.call_args_list})
+
+    def test_first_sync_fetches_everything(self, mock_spotify):
+        """Test that the first sync stores every playlist and all of its tracks"""
+        mock_instance = self.mock_spotify_client(mock_spotify)
+
+        result = sync_spotify_user_playlists(self.user)
+
+        self.assertEqual(result, (3, 3, 5))
+        self.assertEqual(self.get_refetched_playlist_ids(mock_instance), ['p1', 'p2', 'p3'])
+        self.assertEqual(SpotifyPlaylist.objects.get(spotify_id='p2').playlist_tracks.count(), 250)
+        self.assertEqual(SpotifyUserPlaylist.objects.filter(user=self.user).count(), 3)
+
+    def test_unchanged_library_is_a_no_op(self, mock_spotify):
+        """Test that syncing an unchanged library fetches no tracks and writes nothing but the sync time"""
+        mock_instance = self.mock_spotify_client(mock_spotify)
+        sync_spotify_user_playlists(self.user)
+        mock_instance.playlist_tracks.reset_mock()
+
+        with CaptureQueriesContext(connection) as queries:
+            result = sync_spotify_user_playlists(self.user)
+
+        self.assertEqual(result, (3, 0, 0))
+        mock_instance.playlist_tracks.assert_not_called()
+        writes = [
+            query['sql'] for query in queries
+            if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+        ]
+        self.assertEqual(len(writes), 1)
+        self.assertIn('spotify_library_synced_at', writes[0])
+
+    def test_only_changed_playlists_refetched(self, mock_spotify):
+        """Test that only playlists with a new snapshot have their tracks refetched"""
+        mock_instance = self.mock_spotify_client(mock_spotify)
+        sync_spotify_user_playlists(self.user)
+        mock_instance.playlist_tracks.reset_mock()
+
+        self.playlists[2] = make_playlist('p3', snapshot_id='snapshot-2', track_count=4)
+        result = sync_spotify_user_playlists(self.user)
+
+        self.assertEqual(result, (3, 1, 1))
+        self.assertEqual(self.get_refetched_playlist_ids(mock_instance), ['p3'])
+        playlist = SpotifyPlaylist.objects.get(spotify_id='p3')
+        self.assertEqual(playlist.snapshot_id, 'snapshot-2')
+        self.assertEqual(
+            list(playlist.playlist_tracks.values_list('track__spotify_id', flat=True)),
+            [f'p3-snapshot-2-track{index}' for index in range(4)]
+        )
+
+    def test_playlist_with_local_files_not_refetched(self, mock_spotify):
+        """Test that a playlist the catalog can't store in full is only refetched when its snapshot changes"""
+        self.local_tracks = {'p2': {120}}
+        mock_instance = self.mock_spotify_client(mock_spotify)
+        sync_spotify_user_playlists(self.user)
+        self.assertNotEqual(
+            SpotifyPlaylist.objects.get(spotify_id='p2').playlist_tracks.count(),
+            250
+        )
+        mock_instance.playlist_tracks.reset_mock()
+
+        result = sync_spotify_user_playlists(self.user)
+
+        self.assertEqual(result, (3, 0, 0))
+        mock_instance.playlist_tracks.assert_not_called()
+
+        self.playlists[1] = make_playlist('p2', snapshot_id='snapshot-2', track_count=250)
+        result = sync_spotify_user_playlists(self.user)
+
+        self.assertEqual(result, (3, 1, 3))
+        self.assertEqual(self.get_refetched_playlist_ids(mock_instance), ['p2'])
+
+    def test_library_changes_applied_in_place(self, mock_spotify):
+        """Test that removed playlists are deleted and moved ones updated, leaving the rest alone"""
+        self.mock_spotify_client(mock_spotify)
+        sync_spotify_user_playlists(self.user)
+        untouched_updated_at = SpotifyUserPlaylist.objects.get(user=self.user, spotify_id='p1').updated_at
+
+        self.playlists = [self.playlists[0], self.playlists[2]]
+        sync_spotify_user_playlists(self.user)
+
+        rows = list(
+            SpotifyUserPlaylist.objects.filter(user=self.user).order_by('position')
+            .values_list('spotify_id', 'position', 'updated_at')
+        )
+        self.assertEqual([row[:2] for row in rows], [('p1', 0), ('p3', 1)])
+        self.assertEqual(rows[0][2], untouched_updated_at)
+
+    def test_refetched_orders_recorded_in_history(self, mock_spotify):
+        """Test that each snapshot's track order is recorded in the playlist's history"""
+        self.mock_spotify_client(mock_spotify)
+        sync_spotify_user_playlists(self.user)
+        self.playlists[0] = make_playlist('p1', snapshot_id='snapshot-2', track_count=4)
+        sync_spotify_user_playlists(self.user)
+
+        playlist = SpotifyPlaylist.objects.get(spotify_id='p1')
+        self.assertEqual(list(playlist.versions.values_list('snapshot_id', flat=True)), ['snapshot-1', 'snapshot-2'])
+        self.assertEqual(
+            get_playlist_track_order(playlist, 'snapshot-2'),
+            list(playlist.playlist_tracks.values_list('track_id', flat=True))
+        )
+
+    def test_snapshots_stored_elsewhere_recorded_in_history(self, mock_spotify):
+        """Test that a snapshot stored in full before the sync, so not refetched, is still recorded"""
+        mock_instance = self.mock_spotify_client(mock_spotify)
+        self.playlists = [self.playlists[0], self.playlists[2]]
+        # As the playlist detail view or the cache-warming crawler would
+        for playlist in self.playlists:
+            cache_playlist_page(playlist, 0, mock_instance.playlist_tracks(playlist['id']))
+        mock_instance.playlist_tracks.reset_mock()
+
+        result = sync_spotify_user_playlists(self.user)
+
+        self.assertEqual(result, (2, 0, 0))
+        mock_instance.playlist_tracks.assert_not_called()
+        for spotify_id in ('p1', 'p3'):
+            playlist = SpotifyPlaylist.objects.get(spotify_id=spotify_id)
+            self.assertEqual(
+                get_playlist_track_order(playlist, 'snapshot-1'),
+                list(playlist.playlist_tracks.values_list('track_id', flat=True))
+            )
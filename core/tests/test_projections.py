@@ -0,0 +1,137 @@
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+from core.projections import (
+    project_playlist_detail,
+    project_playlist_summaries,
+    project_playlist_summary,
+    project_track,
+)
+from core.serializers import (
+    SpotifyPlaylistDetailSerializer,
+    SpotifyPlaylistSummarySerializer,
+    SpotifyTrackSerializer,
+)
+from core.sparse_fields import PLAYLIST_DETAIL_FIELDS, PLAYLIST_SUMMARY_FIELDS, TRACK_FIELDS
+
+
+def make_track(index, with_album_image=True):
+    return {
+        'id': f'track{index}',
+        'name': f'Track {index}',
+        'duration_ms': 180000 + index,
+        'album': {
+            'id': f'album{index}',
+            'name': f'Album {index}',
+            'images': [{'url': f'https://example.com/album{index}.jpg', 'height': 640}] if with_album_image else [],
+        },
+        'artists': [{'id': 'artist1', 'name': 'Artist 1'}, {'id': f'artist{index}', 'name': f'Artist {index}'}],
+    }
+
+
+def make_playlist(index, with_image=True):
+    return {
+        'id': f'playlist{index}',
+        'name': f'Playlist {index}',
+        'description': f'Description {index}' if index % 3 else None,
+        'images': [{'url': f'https://example.com/playlist{index}.jpg'}] if with_image else [],
+        'owner': {'id': 'owner', 'display_name': 'Owner'},
+        'collaborative': False,
+        'tracks': {'total': index * 7},
+        'snapshot_id': f'snapshot{index}',
+    }
+
+
+class ProjectionParityTests(SimpleTestCase):
+    def assertSameOutput(self, projected, serialized):
+        # Compare both as values and as rendered bytes, which also checks key order
+        self.assertEqual(projected, serialized)
+        self.assertEqual(JSONRenderer().render(projected), JSONRenderer().render(serialized))
+
+    def test_playlist_summary_parity(self):
+        for playlist in (make_playlist(1), make_playlist(3, with_image=False)):
+            self.assertSameOutput(
+                project_playlist_summary(playlist),
+                SpotifyPlaylistSummarySerializer(playlist).data
+            )
+
+    def test_playlist_summaries_parity(self):
+        playlists = [make_playlist(index, with_image=bool(index % 2)) for index in range(50)]
+
+        self.assertSameOutput(
+            project_playlist_summaries(playlists),
+            SpotifyPlaylistSummarySerializer(playlists, many=True).data
+        )
+        self.assertSameOutput(
+            project_playlist_summaries(None),
+            SpotifyPlaylistSummarySerializer(None, many=True).data
+        )
+
+    def test_track_parity(self):
+        for track in (make_track(1), make_track(2, with_album_image=False)):
+            self.assertSameOutput(project_track(track), SpotifyTrackSerializer(track).data)
+
+    def test_playlist_detail_parity(self):
+        playlist = {
+            **make_playlist(1),
+            'followers': {'total': 12},
+            'total_tracks': 100,
+            'tracks': [make_track(index, with_album_image=bool(index % 4)) for index in range(100)],
+        }
+
+        self.assertSameOutput(
+            project_playlist_detail(playlist),
+            SpotifyPlaylistDetailSerializer(playlist).data
+        )
+
+    def test_non_finite_numbers_rejected(self):
+        """Test that NaN and infinity from Spotify are rejected, as the renderer doesn't look for them"""
+        for value in (float('nan'), float('inf')):
+            playlist = make_playlist(1)
+            playlist['tracks']['total'] = value
+            track = make_track(1)
+            track['duration_ms'] = value
+
+            with self.subTest(value=value):
+                with self.assertRaises((ValueError, OverflowError)):
+                    project_playlist_summary(playlist)
+                with self.assertRaises((ValueError, OverflowError)):
+                    SpotifyPlaylistSummarySerializer(playlist).data
+                with self.assertRaises((ValueError, OverflowError)):
+                    project_track(track)
+
+    def test_field_names_match_serializers(self):
+        """Guard against a field being added to a serializer but not its projection"""
+        cases = [
+            (project_playlist_summary(make_playlist(1)), SpotifyPlaylistSummarySerializer()),
+            (project_track(make_track(1)), SpotifyTrackSerializer()),
+        ]
+        for projected, serializer in cases:
+            self.assertEqual(list(projected), list(serializer.fields))
+
+    def test_sparse_field_names_match_serializers(self):
+        """Guard against a serializer field that can't be selected with ?fields="""
+        self.assertEqual(list(PLAYLIST_SUMMARY_FIELDS), list(SpotifyPlaylistSummarySerializer().fields))
+        self.assertEqual(list(TRACK_FIELDS), list(SpotifyTrackSerializer().fields))
+        self.assertEqual(list(PLAYLIST_DETAIL_FIELDS), list(SpotifyPlaylistDetailSerializer().fields))
+
+    def test_sparse_projections_match_full_projections(self):
+        """Test that a sparse projection is the full projection with the other keys dropped"""
+        playlist = make_playlist(1)
+        fields = frozenset({'name', 'track_count'})
+        self.assertEqual(
+            project_playlist_summary(playlist, fields),
+            {key: value for key, value in project_playlist_summary(playlist).items() if key in fields}
+        )
+
+        track = make_track(1)
+        fields = frozenset({'id', 'artists', 'album_image_url'})
+        self.assertEqual(
+            project_track(track, fields),
+            {key: value for key, value in project_track(track).items() if key in fields}
+        )
+
+        full_playlist = {**playlist, 'followers': {'total': 12}, 'total_tracks': 1, 'tracks': [track]}
+        self.assertEqual(
+            project_playlist_detail(full_playlist, frozenset({'name', 'tracks', 'tracks.name'})),
+            {'name': 'Playlist 1', 'tracks': [{'name': 'Track 1'}]}
+        )
@@ -0,0 +1,69 @@
+import uuid
+from datetime import date, datetime, time, timezone as dt_timezone
+from decimal import Decimal
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+from unittest import skipIf
+from unittest.mock import patch
+from core.renderers import FastJSONRenderer, orjson
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def setUp(self):
+        self.data = {
+            'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'created_at': datetime(2024, 10, 27, 18, 21, 5, 123456, tzinfo=dt_timezone.utc),
+            'naive_at': datetime(2024, 10, 27, 18, 21, 5),
+            'day': date(2024, 10, 27),
+            'at': time(18, 21, 5, 250000),
+            'price': Decimal('1.50'),
+            'name': 'Sigur Rós – Ágætis byrjun',
+            'tracks': [{'id': 'track1', 'duration_ms': 180000, 'explicit': False, 'preview_url': None}],
+            1: 'non-string key',
+        }
+
+    @skipIf(orjson is None, 'orjson is not installed')
+    def test_matches_stdlib_renderer(self):
+        """Test that the fast path renders the same bytes as DRF's renderer"""
+        self.assertEqual(
+            FastJSONRenderer().render(self.data),
+            JSONRenderer().render(self.data)
+        )
+
+    @skipIf(orjson is None, 'orjson is not installed')
+    def test_uses_orjson(self):
+        """Test that the fast path is taken for default compact output"""
+        with patch('core.renderers.orjson.dumps', wraps=orjson.dumps) as mock_dumps:
+            FastJSONRenderer().render({'id': 'playlist123'})
+
+        mock_dumps.assert_called_once()
+
+    @skipIf(orjson is None, 'orjson is not installed')
+    def test_line_separators_escaped(self):
+        """Test that U+2028 and U+2029 are escaped like DRF does, keeping output valid JavaScript"""
+        data = {'description': 'line\u2028paragraph\u2029end'}
+
+        rendered = FastJSONRenderer().render(data)
+
+        self.assertEqual(rendered, JSONRenderer().render(data))
+        self.assertIn(b'line\\u2028paragraph\\u2029end', rendered)
+
+    def test_falls_back_without_orjson(self):
+        """Test that the stdlib renderer is used when orjson isn't installed"""
+        with patch('core.renderers.orjson', None):
+            self.assertEqual(
+                FastJSONRenderer().render(self.data),
+                JSONRenderer().render(self.data)
+            )
+
+    def test_indented_output_falls_back(self):
+        """Test that indented output, which orjson can't match, uses the stdlib renderer"""
+        rendered = FastJSONRenderer().render(
+            {'id': 'playlist123'},
+            accepted_media_type='application/json; indent=4'
+        )
+
+        self.assertEqual(rendered, b'{\n    "id": "playlist123"\n}')
+
+    def test_empty_data(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
@@ -0,0 +1,111 @@
+from asgiref.sync import iscoroutinefunction
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from unittest.mock import patch, MagicMock
+from core.middleware import ServerTimingMiddleware
+from core.models import User
+from core.request_timing import RequestTimings, get_request_timings, timed
+from core.tests.factories.user_factory import UserFactory
+
+
+def parse_server_timing(header):
+    metrics = {}
+    for metric in header.split(', '):
+        name, *params = metric.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+    return metrics
+
+
+@override_settings(SERVER_TIMING_ENABLED=True)
+@patch('spotipy.Spotify')
+class ServerTimingMiddlewareTests(APITestCase):
+    def setUp(self):
+        self.user = UserFactory(spotify_id='test_user_id', spotify_access_token_expires_at=None)
+        access_token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        self.url = reverse('spotify_user_playlists_summary')
+
+    def mock_spotify_client(self, mock_spotify, total):
+        def current_user_playlists(limit=50, offset=0):
+            return {
+                'items': [{
+                    'id': f'playlist{index}',
+                    'name': f'Playlist {index}',
+                    'description': '',
+                    'images': [],
+                    'owner': {'id': 'test_user_id'},
+                    'collaborative': False,
+                    'tracks': {'total': 1},
+                } for index in range(offset, min(offset + limit, total))],
+                'next': 'next' if offset + limit < total else None,
+                'total': total,
+            }
+
+        mock_instance = MagicMock()
+        mock_instance.current_user_playlists.side_effect = current_user_playlists
+        mock_spotify.return_value = mock_instance
+
+    def test_server_timing_header(self, mock_spotify):
+        """Test that each phase of the request is reported in the Server-Timing header"""
+        self.mock_spotify_client(mock_spotify, total=120)
+
+        with self.assertLogs('core.request_timing', level='INFO') as logs:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        metrics = parse_server_timing(response['Server-Timing'])
+
+        # One page fetched on the request thread, two on the fan-out pool
+        self.assertEqual(metrics['spotify']['desc'], '"3x"')
+        for phase in ('auth', 'db', 'serialize', 'render', 'total'):
+            self.assertIn(phase, metrics)
+            self.assertGreaterEqual(float(metrics[phase]['dur']), 0)
+
+        self.assertIn('"path":"/api/v1/spotify_user_playlists"', logs.output[0])
+        self.assertIn('"status":200', logs.output[0])
+
+    async def test_async_request(self, mock_spotify):
+        """Test that async requests are timed, queries included, without adapting the stack to sync"""
+        async def get_response(request):
+            await User.objects.filter(pk=self.user.pk).aexists()
+            return HttpResponse()
+
+        middleware = ServerTimingMiddleware(get_response)
+        with self.assertLogs('core.request_timing', level='INFO'):
+            response = await middleware(RequestFactory().get('/'))
+
+        self.assertTrue(iscoroutinefunction(middleware))
+        metrics = parse_server_timing(response['Server-Timing'])
+        self.assertEqual(metrics['db']['desc'], '"1x"')
+        self.assertIn('total', metrics)
+
+    @override_settings(SERVER_TIMING_ENABLED=False)
+    def test_disabled(self, mock_spotify):
+        """Test that no header is added when timing is turned off"""
+        self.mock_spotify_client(mock_spotify, total=1)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Server-Timing', response)
+
+
+class RequestTimingTests(APITestCase):
+    def test_timed_is_a_no_op_outside_a_request(self):
+        """Test that instrumentation does nothing when no request is being timed"""
+        self.assertIsNone(get_request_timings())
+        with timed('spotify') as timer:
+            pass
+        self.assertIsNone(timer)
+
+    def test_timings_accumulate_per_phase(self):
+        """Test that repeated phases add up their count and duration"""
+        timings = RequestTimings()
+        timings.add('spotify', 0.010)
+        timings.add('spotify', 0.005)
+
+        self.assertEqual(timings.as_dict(), {'spotify': {'count': 2, 'ms': 15.0}})
@@ -0,0 +1,158 @@
+import os
+import tempfile
+import threading
+import time
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from unittest.mock import MagicMock, patch
+from core.single_flight import SingleFlight
+from core.spotipy_utils import get_spotify_playlist
+
+
+class SingleFlightTests(SimpleTestCase):
+    def run_concurrently(self, fn, count=5):
+        results = [None] * count
+        barrier = threading.Barrier(count)
+
+        def run(index):
+            barrier.wait()
+            try:
+                results[index] = fn()
+            except Exception as e:
+                results[index] = e
+
+        threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def slow_upstream(self, result):
+        def upstream(*args, **kwargs):
+            time.sleep(0.05)
+            return result
+        return MagicMock(side_effect=upstream)
+
+    def test_concurrent_duplicates_share_one_call(self):
+        """Test that concurrent calls with the same key run the function once"""
+        single_flight = SingleFlight()
+        upstream = self.slow_upstream({'tracks': ['track1']})
+
+        results = self.run_concurrently(lambda: single_flight.do('key', upstream))
+
+        self.assertEqual(upstream.call_count, 1)
+        self.assertTrue(all(result == {'tracks': ['track1']} for result in results))
+
+    def test_waiters_get_independent_copies(self):
+        """Test that a caller mutating its result, the leader's included, doesn't affect the others"""
+        single_flight = SingleFlight()
+        upstream = self.slow_upstream({'tracks': []})
+
+        def call():
+            result = single_flight.do('key', upstream)
+            result['tracks'].append('mutated')
+            return result
+
+        results = self.run_concurrently(call, count=3)
+
+        self.assertEqual(upstream.call_count, 1)
+        self.assertTrue(all(result['tracks'] == ['mutated'] for result in results))
+
+    def test_different_keys_not_coalesced(self):
+        """Test that calls with different keys each run"""
+        single_flight = SingleFlight()
+        upstream = self.slow_upstream({})
+        keys = iter(range(3))
+        keys_lock = threading.Lock()
+
+        def call():
+            with keys_lock:
+                key = next(keys)
+            return single_flight.do(key, upstream)
+
+        self.run_concurrently(call, count=3)
+
+        self.assertEqual(upstream.call_count, 3)
+
+    def test_error_shared_with_waiters(self):
+        """Test that waiters see the leader's exception"""
+        single_flight = SingleFlight()
+
+        def failing_upstream():
+            time.sleep(0.05)
+            raise ValueError('Spotify API Error')
+
+        results = self.run_concurrently(lambda: single_flight.do('key', failing_upstream), count=3)
+
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+    def test_sequential_calls_not_cached(self):
+        """Test that results aren't reused once the call has finished"""
+        single_flight = SingleFlight()
+        upstream = MagicMock(return_value={})
+
+        single_flight.do('key', upstream)
+        single_flight.do('key', upstream)
+
+        self.assertEqual(upstream.call_count, 2)
+
+    @override_settings(CACHES={
+        'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'single-flight-test'},
+    })
+    def test_shared_result_reused_by_other_process(self):
+        """Test that another process arriving within the TTL reuses the result"""
+        lock_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(lock_dir.cleanup)
+        self.addCleanup(caches['shared'].clear)
+        upstream = MagicMock(return_value={'id': 'playlist123'})
+
+        first_process = SingleFlight(shared=True, shared_ttl=5, lock_dir=lock_dir.name)
+        second_process = SingleFlight(shared=True, shared_ttl=5, lock_dir=lock_dir.name)
+
+        self.assertEqual(first_process.do('key', upstream), {'id': 'playlist123'})
+        self.assertEqual(second_process.do('key', upstream), {'id': 'playlist123'})
+        self.assertEqual(upstream.call_count, 1)
+        self.assertEqual(os.listdir(lock_dir.name), [])
+
+    @override_settings(CACHES={
+        'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'single-flight-test'},
+    })
+    def test_concurrent_processes_share_one_call(self):
+        """Test that processes waiting on a lock file the leader removes still coalesce"""
+        lock_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(lock_dir.cleanup)
+        self.addCleanup(caches['shared'].clear)
+        upstream = self.slow_upstream({'id': 'playlist123'})
+        # flock() locks are per open file, so separate instances contend like processes do
+        processes = iter([SingleFlight(shared=True, shared_ttl=5, lock_dir=lock_dir.name) for _ in range(4)])
+        processes_lock = threading.Lock()
+
+        def call():
+            with processes_lock:
+                process = next(processes)
+            return process.do('key', upstream)
+
+        results = self.run_concurrently(call, count=4)
+
+        self.assertEqual(upstream.call_count, 1)
+        self.assertTrue(all(result == {'id': 'playlist123'} for result in results))
+        self.assertEqual(os.listdir(lock_dir.name), [])
+
+    @patch('core.spotipy_utils.get_cached_playlist_page', return_value=None)
+    @patch('core.spotipy_utils.cache_playlist_page')
+    def test_get_spotify_playlist_coalesced(self, mock_cache_playlist_page, mock_get_cached_playlist_page):
+        """Test that identical concurrent playlist page requests hit Spotify once"""
+        spotify_client = MagicMock()
+        spotify_client._auth = 'test_access_token'
+        spotify_client.playlist = self.slow_upstream({'id': 'playlist123'})
+        spotify_client.playlist_tracks.return_value = {'items': [], 'total': 0}
+
+        results = self.run_concurrently(
+            lambda: get_spotify_playlist(spotify_client, 'playlist123', page=1, page_size=20)
+        )
+
+        self.assertEqual(spotify_client.playlist.call_count, 1)
+        self.assertEqual(spotify_client.playlist_tracks.call_count, 1)
+        self.assertTrue(all(result['total_tracks'] == 0 for result in results))
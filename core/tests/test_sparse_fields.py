@@ -0,0 +1,107 @@
+from django.test import SimpleTestCase
+from unittest.mock import MagicMock, patch
+from core.sparse_fields import (
+    PLAYLIST_DETAIL_FIELDS,
+    TRACK_FIELDS,
+    build_spotify_fields,
+    get_spotify_playlist_fields,
+    get_spotify_playlist_tracks_fields,
+    parse_fields,
+)
+from core.spotipy_utils import fetch_spotify_playlist
+
+
+class ParseFieldsTests(SimpleTestCase):
+    def parse(self, value):
+        return parse_fields(value, PLAYLIST_DETAIL_FIELDS, {'tracks': TRACK_FIELDS})
+
+    def test_no_selection(self):
+        """Test that a missing or empty parameter selects everything"""
+        self.assertIsNone(self.parse(None))
+        self.assertIsNone(self.parse(' , '))
+
+    def test_nested_fields_select_their_parent(self):
+        """Test that naming a nested field also selects its parent"""
+        self.assertEqual(
+            self.parse('name, tracks.name'),
+            frozenset({'name', 'tracks', 'tracks.name'})
+        )
+
+    def test_bare_parent_selects_every_nested_field(self):
+        """Test that naming a parent selects all of its nested fields"""
+        fields = self.parse('tracks')
+
+        self.assertIn('tracks', fields)
+        self.assertTrue(all(f'tracks.{name}' in fields for name in TRACK_FIELDS))
+
+    def test_unknown_fields(self):
+        """Test that unknown names are rejected rather than silently dropped"""
+        with self.assertRaisesMessage(ValueError, 'Unknown field(s): owner, tracks.popularity'):
+            self.parse('name,owner,tracks.popularity')
+
+
+class SpotifyFieldsExpressionTests(SimpleTestCase):
+    def test_paths_are_grouped_by_parent(self):
+        """Test that dotted paths sharing a parent are grouped in parentheses"""
+        self.assertEqual(
+            build_spotify_fields(['id', 'album.name', 'album.images', 'followers.total']),
+            'id,album(name,images),followers(total)'
+        )
+
+    def test_playlist_fields_keep_required_paths(self):
+        """Test that the playlist id and snapshot_id are requested whatever was selected"""
+        self.assertEqual(
+            get_spotify_playlist_fields(frozenset({'name', 'image_url', 'tracks'})),
+            'id,snapshot_id,name,images'
+        )
+
+    def test_track_fields(self):
+        """Test the playlist tracks expression for a track selection"""
+        self.assertEqual(
+            get_spotify_playlist_tracks_fields(frozenset({'album_image_url', 'name', 'album'})),
+            'items(track(name,album(name,images))),total'
+        )
+
+    def test_no_track_fields_only_requests_total(self):
+        """Test that no track items are requested when no track fields were selected"""
+        self.assertEqual(get_spotify_playlist_tracks_fields(frozenset()), 'total')
+
+
+@patch('core.spotipy_utils.cache_playlist_page')
+@patch('core.spotipy_utils.get_cached_playlist_page', return_value=None)
+class FetchSparsePlaylistTests(SimpleTestCase):
+    def setUp(self):
+        self.spotify_client = MagicMock()
+        self.spotify_client.playlist.return_value = {'id': 'playlist123', 'snapshot_id': 'snap', 'name': 'Mix'}
+        self.spotify_client.playlist_tracks.return_value = {
+            'items': [{'track': {'name': 'Track 1'}}],
+            'total': 1,
+        }
+
+    def test_sparse_fetch_narrows_spotify_requests(self, mock_get_cached, mock_cache):
+        """Test that Spotify is only asked for the selected fields and nothing is cached"""
+        fields = frozenset({'name', 'tracks', 'tracks.name'})
+
+        playlist_data = fetch_spotify_playlist(self.spotify_client, 'playlist123', fields=fields)
+
+        self.spotify_client.playlist.assert_called_once_with('playlist123', fields='id,snapshot_id,name')
+        self.spotify_client.playlist_tracks.assert_called_once_with(
+            'playlist123',
+            offset=0,
+            limit=20,
+            additional_types=['track'],
+            fields='items(track(name)),total'
+        )
+        self.assertEqual(playlist_data['tracks'], [{'name': 'Track 1'}])
+        mock_cache.assert_not_called()
+
+    def test_fetch_without_tracks(self, mock_get_cached, mock_cache):
+        """Test that a selection without tracks still reports the total"""
+        self.spotify_client.playlist_tracks.return_value = {'total': 42}
+
+        playlist_data = fetch_spotify_playlist(
+            self.spotify_client, 'playlist123', fields=frozenset({'name', 'total_tracks'})
+        )
+
+        self.assertEqual(playlist_data['total_tracks'], 42)
+        self.assertEqual(playlist_data['tracks'], [])
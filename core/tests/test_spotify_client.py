@@ -0,0 +1,71 @@
+import gc
+import threading
+from django.test import SimpleTestCase, override_settings
+from core.spotify_client import (
+    get_spotify_client,
+    get_spotify_session,
+    reset_spotify_session,
+)
+
+
+class SpotifyClientFactoryTests(SimpleTestCase):
+    def setUp(self):
+        reset_spotify_session()
+
+    def tearDown(self):
+        reset_spotify_session()
+
+    def test_clients_share_one_session(self):
+        """Test that clients for different users reuse the same connection pool"""
+        first_client = get_spotify_client('token-one')
+        second_client = get_spotify_client('token-two')
+
+        self.assertIs(first_client._session, second_client._session)
+        self.assertEqual(first_client._auth_headers(), {'Authorization': 'Bearer token-one'})
+        self.assertEqual(second_client._auth_headers(), {'Authorization': 'Bearer token-two'})
+
+    @override_settings(SPOTIFY_API_PREFIX='http://127.0.0.1:8765/v1/')
+    def test_api_prefix_from_settings(self):
+        """Test that clients can be pointed at a local Spotify stand-in"""
+        client = get_spotify_client('token')
+
+        self.assertEqual(client.prefix, 'http://127.0.0.1:8765/v1/')
+
+    @override_settings(SPOTIFY_HTTP_POOL_MAXSIZE=7)
+    def test_pool_size_from_settings(self):
+        """Test that the adapter pool is sized from settings"""
+        adapter = get_spotify_session().get_adapter('https://api.spotify.com/v1/me')
+
+        self.assertEqual(adapter._pool_maxsize, 7)
+
+    def test_discarded_client_keeps_pool_open(self):
+        """Test that garbage-collecting a client doesn't close the shared pool"""
+        session = get_spotify_session()
+        adapter = session.get_adapter('https://api.spotify.com/v1/me')
+        pool = adapter.poolmanager.connection_from_url('https://api.spotify.com/v1/me')
+
+        client = get_spotify_client('token')
+        del client
+        gc.collect()
+
+        self.assertIs(
+            adapter.poolmanager.connection_from_url('https://api.spotify.com/v1/me'),
+            pool
+        )
+
+    def test_concurrent_first_use_builds_one_session(self):
+        """Test that threads racing on first use end up with the same session"""
+        sessions = []
+        barrier = threading.Barrier(8)
+
+        def build():
+            barrier.wait()
+            sessions.append(get_spotify_session())
+
+        threads = [threading.Thread(target=build) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len({id(session) for session in sessions}), 1)
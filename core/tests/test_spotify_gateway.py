@@ -0,0 +1,173 @@
+import asyncio
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.test import SimpleTestCase, override_settings
+from unittest.mock import AsyncMock, MagicMock, patch
+from spotipy.exceptions import SpotifyException
+from core.spotify_client import get_spotify_client, reset_spotify_session
+from core.spotify_gateway import (
+    SpotifyRateLimiter,
+    acall_spotify,
+    call_spotify,
+    get_spotify_rate_limiter,
+    spotify_gateway_stats,
+)
+
+
+class SpotifyGatewayTests(SimpleTestCase):
+    def setUp(self):
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        self.state_file = os.path.join(state_dir.name, 'rate-limit')
+
+        settings_override = override_settings(
+            SPOTIFY_RATE_LIMIT_STATE_FILE=self.state_file,
+            SPOTIFY_RATE_LIMIT_PER_SECOND=100,
+            SPOTIFY_RATE_LIMIT_BURST=2,
+            SPOTIFY_RATE_LIMIT_MAX_RETRIES=2
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        spotify_gateway_stats.reset()
+
+    def rate_limited_error(self, retry_after='0.05'):
+        return SpotifyException(429, -1, 'Too many requests', headers={'Retry-After': retry_after})
+
+    def test_burst_passes_without_waiting(self):
+        """Test that calls within the burst size aren't throttled"""
+        method = MagicMock(return_value={'ok': True})
+
+        for _ in range(2):
+            self.assertEqual(call_spotify(method, 'playlist123', fields='id'), {'ok': True})
+
+        method.assert_called_with('playlist123', fields='id')
+        self.assertEqual(spotify_gateway_stats.as_dict()['throttled_calls'], 0)
+
+    @patch('core.spotify_gateway.time.sleep')
+    def test_calls_past_burst_are_throttled(self, mock_sleep):
+        """Test that callers queue behind the bucket once it's empty"""
+        method = MagicMock(return_value={})
+
+        for _ in range(4):
+            call_spotify(method)
+
+        stats = spotify_gateway_stats.as_dict()
+        self.assertEqual(stats['calls'], 4)
+        self.assertEqual(stats['throttled_calls'], 2)
+        self.assertGreater(stats['throttled_seconds'], 0)
+
+    def test_limiters_share_state_through_file(self):
+        """Test that separate limiter instances (one per process) share one bucket"""
+        first = SpotifyRateLimiter(self.state_file, rate=1, burst=1)
+        second = SpotifyRateLimiter(self.state_file, rate=1, burst=1)
+
+        self.assertEqual(first.reserve(), 0)
+        self.assertGreater(second.reserve(), 0.9)
+
+    def test_rate_limited_response_pauses_fleet_and_retries(self):
+        """Test that a 429 blocks every limiter for Retry-After, then retries"""
+        method = MagicMock(side_effect=[self.rate_limited_error(), {'ok': True}])
+
+        with patch('core.spotify_gateway.SpotifyRateLimiter.block', wraps=get_spotify_rate_limiter().block) as mock_block:
+            self.assertEqual(call_spotify(method), {'ok': True})
+
+        mock_block.assert_called_once_with(0.05)
+        self.assertEqual(method.call_count, 2)
+        stats = spotify_gateway_stats.as_dict()
+        self.assertEqual(stats['rate_limited_responses'], 1)
+        self.assertGreater(stats['throttled_seconds'], 0)
+
+    def test_block_visible_to_other_processes(self):
+        """Test that a block recorded by one limiter is seen by another"""
+        SpotifyRateLimiter(self.state_file, rate=100, burst=2).block(30)
+
+        self.assertGreater(SpotifyRateLimiter(self.state_file, rate=100, burst=2).blocked_for(), 29)
+
+    def test_gives_up_after_max_retries(self):
+        """Test that persistent 429s surface after the configured retries"""
+        method = MagicMock(side_effect=self.rate_limited_error('0.01'))
+
+        with self.assertRaises(SpotifyException):
+            call_spotify(method)
+
+        self.assertEqual(method.call_count, 3)
+
+    def test_other_errors_not_retried(self):
+        """Test that non-429 errors are raised straight away"""
+        method = MagicMock(side_effect=SpotifyException(401, -1, 'Invalid access token'))
+
+        with self.assertRaises(SpotifyException):
+            call_spotify(method)
+
+        self.assertEqual(method.call_count, 1)
+
+    def test_max_retries_error_not_rate_limited(self):
+        """Test that spotipy's 429 for exhausted server error retries doesn't block the fleet"""
+        method = MagicMock(side_effect=SpotifyException(429, -1, '/v1/playlists/playlist123:\n Max Retries'))
+
+        with self.assertRaises(SpotifyException) as raised:
+            call_spotify(method)
+
+        self.assertEqual(raised.exception.http_status, 500)
+        self.assertEqual(method.call_count, 1)
+        self.assertEqual(get_spotify_rate_limiter().blocked_for(), 0)
+        self.assertEqual(spotify_gateway_stats.as_dict()['rate_limited_responses'], 0)
+
+    @patch('core.spotify_client.SPOTIFY_RETRY_BACKOFF_FACTOR', 0)
+    def test_exhausted_server_error_retries_not_repeated(self):
+        """Test that a Spotify that keeps failing with 503 surfaces as a 503 after the session's retries"""
+        request_paths = []
+
+        class UnavailableHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                request_paths.append(self.path)
+                self.send_response(503)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(b'{"error": {"status": 503, "message": "Service unavailable"}}')
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), UnavailableHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        reset_spotify_session()
+        self.addCleanup(reset_spotify_session)
+
+        with override_settings(SPOTIFY_API_PREFIX=f'http://127.0.0.1:{server.server_port}/v1/'):
+            spotify = get_spotify_client('token')
+            with self.assertRaises(SpotifyException) as raised:
+                call_spotify(spotify.playlist, 'playlist123')
+
+        self.assertEqual(raised.exception.http_status, 503)
+        # The first request plus the session's retries, and no more
+        self.assertEqual(len(request_paths), 4)
+        self.assertEqual(get_spotify_rate_limiter().blocked_for(), 0)
+        self.assertEqual(spotify_gateway_stats.as_dict()['rate_limited_responses'], 0)
+
+    def test_async_calls_lock_state_off_the_event_loop(self):
+        """Test that acall_spotify doesn't block the event loop on the state file lock"""
+        method = AsyncMock(side_effect=[self.rate_limited_error('0.01'), {'ok': True}])
+        limiter_threads = []
+
+        def record_thread(name):
+            original = getattr(SpotifyRateLimiter, name)
+
+            def wrapper(limiter, *args):
+                limiter_threads.append(threading.get_ident())
+                return original(limiter, *args)
+            return patch.object(SpotifyRateLimiter, name, wrapper)
+
+        async def call():
+            return threading.get_ident(), await acall_spotify(method)
+
+        with record_thread('reserve'), record_thread('blocked_for'), record_thread('block'):
+            loop_thread, result = asyncio.run(call())
+
+        self.assertEqual(result, {'ok': True})
+        self.assertGreaterEqual(len(limiter_threads), 3)
+        self.assertNotIn(loop_thread, limiter_threads)
@@ -5,6 +5,7 @@ from unittest.mock import patch, ANY
 from datetime import timedelta
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from urllib.parse import parse_qs, urlparse
 
 User = get_user_model()
 
@@ -71,7 +72,8 @@ class SpotifyUserPlaylistDetailTests(APITestCase):
             ANY,  # This replaces the specific Spotify client instance
             self.playlist_id,
             page=1,
-            page_size=20
+            page_size=20,
+            fields=None
         )
 
         # Assertions
@@ -110,7 +112,8 @@ class SpotifyUserPlaylistDetailTests(APITestCase):
             ANY,  # Use ANY instead of the specific Spotify client instance
             self.playlist_id,
             page=2,
-            page_size=10
+            page_size=10,
+            fields=None
         )
 
         # Assertions
@@ -163,7 +166,8 @@ class SpotifyUserPlaylistDetailTests(APITestCase):
             ANY,  # Use ANY instead of the specific Spotify client instance
             self.playlist_id,
             page=1,
-            page_size=100  # Should be limited to max_page_size
+            page_size=100,  # Should be limited to max_page_size
+            fields=None
         )
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -220,3 +224,148 @@ class SpotifyUserPlaylistDetailTests(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(response.data['error'], 'Page number must be greater than 0')
+
+
+    @patch('core.views.project_playlist_detail')
+    @patch('core.views.get_spotify_playlist')
+    def test_not_modified_when_snapshot_unchanged(self, mock_get_spotify_playlist, mock_project):
+        """Test that a matching If-None-Match gets a 304 without serializing"""
+        mock_get_spotify_playlist.return_value = {**self.mock_playlist_data, 'snapshot_id': 'snapshot-1'}
+        mock_project.return_value = {'id': self.playlist_id}
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertEqual(mock_project.call_count, 1)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Authorization', response['Vary'])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(mock_project.call_count, 1)
+
+    @patch('core.views.get_spotify_playlist')
+    def test_etag_changes_with_snapshot_and_page(self, mock_get_spotify_playlist):
+        """Test that a new snapshot or a different page gets a different ETag"""
+        mock_get_spotify_playlist.return_value = {**self.mock_playlist_data, 'snapshot_id': 'snapshot-1'}
+        self.client.force_authenticate(user=self.user)
+        etag = self.client.get(self.url)['ETag']
+
+        mock_get_spotify_playlist.return_value = {**self.mock_playlist_data, 'snapshot_id': 'snapshot-2'}
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        mock_get_spotify_playlist.return_value = {**self.mock_playlist_data, 'snapshot_id': 'snapshot-1'}
+        response = self.client.get(f'{self.url}?page=2', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @patch('core.views.get_spotify_playlist')
+    def test_etag_changes_with_cover_image(self, mock_get_spotify_playlist):
+        """Test that a new cover image, which keeps the snapshot, gets a different ETag"""
+        playlist_data = {**self.mock_playlist_data, 'snapshot_id': 'snapshot-1'}
+        mock_get_spotify_playlist.return_value = {**playlist_data, 'images': [{'url': 'https://example.com/old.jpg'}]}
+        self.client.force_authenticate(user=self.user)
+        etag = self.client.get(self.url)['ETag']
+
+        mock_get_spotify_playlist.return_value = {**playlist_data, 'images': [{'url': 'https://example.com/new.jpg'}]}
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results']['image_url'], 'https://example.com/new.jpg')
+
+    @patch('core.views.get_spotify_playlist')
+    def test_page_links_keep_single_query_string(self, mock_get_spotify_playlist):
+        """Test that page links replace query parameters instead of appending them"""
+        mock_get_spotify_playlist.return_value = self.mock_playlist_data
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(f'{self.url}?page=2&page_size=10')
+
+        next_url = urlparse(response.data['next'])
+        self.assertEqual(response.data['next'].count('?'), 1)
+        self.assertEqual(parse_qs(next_url.query), {'page': ['3'], 'page_size': ['10']})
+
+    @patch('core.views.get_spotify_playlist')
+    def test_cursor_walk(self, mock_get_spotify_playlist):
+        """Test walking a playlist with opaque cursors"""
+        mock_get_spotify_playlist.return_value = {**self.mock_playlist_data, 'snapshot_id': 'snapshot-1'}
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(f'{self.url}?pagination=cursor&page_size=20')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['previous'])
+        mock_get_spotify_playlist.assert_called_with(ANY, self.playlist_id, page=1, page_size=20, fields=None)
+
+        pages = 1
+        next_url = response.data['next']
+        while next_url:
+            self.assertNotIn('page_size', next_url)
+            self.assertNotIn('pagination', next_url)
+            response = self.client.get(next_url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIsNotNone(response.data['previous'])
+            pages += 1
+            next_url = response.data['next']
+
+        # 50 tracks in pages of 20
+        self.assertEqual(pages, 3)
+        mock_get_spotify_playlist.assert_called_with(ANY, self.playlist_id, page=3, page_size=20, fields=None)
+
+    @patch('core.views.get_spotify_playlist')
+    def test_cursor_detects_changed_playlist(self, mock_get_spotify_playlist):
+        """Test that a cursor from an older snapshot is rejected with a conflict"""
+        mock_get_spotify_playlist.return_value = {**self.mock_playlist_data, 'snapshot_id': 'snapshot-1'}
+        self.client.force_authenticate(user=self.user)
+        next_url = self.client.get(f'{self.url}?pagination=cursor').data['next']
+
+        mock_get_spotify_playlist.return_value = {**self.mock_playlist_data, 'snapshot_id': 'snapshot-2'}
+        response = self.client.get(next_url)
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['snapshot_id'], 'snapshot-2')
+
+    def test_invalid_cursor(self):
+        """Test handling of a malformed cursor"""
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(f'{self.url}?cursor=not-a-cursor')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Invalid cursor')
+
+    @patch('core.views.get_spotify_playlist')
+    def test_sparse_fields(self, mock_get_spotify_playlist):
+        """Test that ?fields= trims the results and is passed on to the Spotify fetch"""
+        mock_get_spotify_playlist.return_value = self.mock_playlist_data
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(f'{self.url}?fields=name,tracks.name')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_get_spotify_playlist.assert_called_once_with(
+            ANY,
+            self.playlist_id,
+            page=1,
+            page_size=20,
+            fields=frozenset({'name', 'tracks', 'tracks.name'})
+        )
+        self.assertEqual(response.data['count'], 50)
+        self.assertEqual(response.data['results'], {
+            'name': 'Test Playlist',
+            'tracks': [{'name': 'Test Track'}],
+        })
+        self.assertIn('fields=name%2Ctracks.name', response.data['next'])
+
+    def test_unknown_sparse_field(self):
+        """Test that an unknown field name is rejected"""
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(f'{self.url}?fields=name,owner')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Unknown field(s): owner')
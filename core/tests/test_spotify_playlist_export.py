@@ -0,0 +1,114 @@
+import json
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from unittest.mock import patch, MagicMock
+from spotipy.exceptions import SpotifyException
+from core.tests.factories.user_factory import UserFactory
+
+
+@patch('spotipy.Spotify')
+class SpotifyPlaylistExportTests(APITestCase):
+    def setUp(self):
+        self.user = UserFactory(spotify_access_token_expires_at=None)
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse(
+            'spotify-user-playlist-export',
+            kwargs={'spotify_playlist_id': 'playlist123'}
+        )
+        self.tracks = [
+            {
+                'id': f'track{index}',
+                'name': f'Track {index}',
+                'duration_ms': 1000 * index,
+                'album': {'name': 'Album', 'images': [{'url': 'https://example.com/album.jpg'}]},
+                'artists': [{'name': 'Artist'}],
+            }
+            for index in range(250)
+        ]
+
+    def mock_spotify_client(self, mock_spotify):
+        mock_instance = MagicMock()
+        mock_instance.playlist.return_value = {'id': 'playlist123', 'name': 'Test Playlist'}
+
+        def mock_playlist_tracks(playlist_id, offset=0, limit=100, **kwargs):
+            return {
+                'items': [{'track': track} for track in self.tracks[offset:offset + limit]],
+                'total': len(self.tracks),
+            }
+
+        mock_instance.playlist_tracks.side_effect = mock_playlist_tracks
+        mock_spotify.return_value = mock_instance
+        return mock_instance
+
+    def test_streams_every_track_as_ndjson(self, mock_spotify):
+        """Test that the export returns one JSON object per line for the whole playlist"""
+        self.mock_spotify_client(mock_spotify)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 250)
+        first_track = json.loads(lines[0])
+        self.assertEqual(first_track, {
+            'id': 'track0',
+            'name': 'Track 0',
+            'duration_ms': 0,
+            'artists': ['Artist'],
+            'album': 'Album',
+            'album_image_url': 'https://example.com/album.jpg',
+        })
+        self.assertEqual(json.loads(lines[-1])['id'], 'track249')
+
+    def test_pages_fetched_lazily(self, mock_spotify):
+        """Test that only the first page is fetched before the body is consumed"""
+        mock_instance = self.mock_spotify_client(mock_spotify)
+
+        response = self.client.get(self.url)
+        self.assertEqual(mock_instance.playlist_tracks.call_count, 1)
+
+        streaming_content = iter(response.streaming_content)
+        for _ in range(101):
+            next(streaming_content)
+        self.assertEqual(mock_instance.playlist_tracks.call_count, 2)
+
+        list(streaming_content)
+        self.assertEqual(mock_instance.playlist_tracks.call_count, 3)
+
+    def test_empty_playlist(self, mock_spotify):
+        """Test that an empty playlist exports an empty body"""
+        self.tracks = []
+        self.mock_spotify_client(mock_spotify)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), b'')
+
+    def test_spotify_error_before_streaming(self, mock_spotify):
+        """Test that an error fetching the first page gets an error response"""
+        mock_instance = self.mock_spotify_client(mock_spotify)
+        mock_instance.playlist.side_effect = SpotifyException(404, -1, 'Not found')
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertIn('Not found', response.data['error'])
+
+    def test_spotify_error_while_streaming(self, mock_spotify):
+        """Test that an error after streaming started ends the body with an error line"""
+        mock_instance = self.mock_spotify_client(mock_spotify)
+        first_page = mock_instance.playlist_tracks.side_effect(None)
+        mock_instance.playlist_tracks.side_effect = [first_page, SpotifyException(502, -1, 'Bad gateway')]
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 101)
+        self.assertEqual(json.loads(lines[99])['id'], 'track99')
+        self.assertIn('Bad gateway', json.loads(lines[-1])['error'])
@@ -4,7 +4,10 @@ from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from unittest.mock import patch, MagicMock
 from django.contrib.auth import get_user_model
+from django.test import override_settings
 from spotipy.exceptions import SpotifyException
+import threading
+import time
 
 User = get_user_model()
 
@@ -119,6 +122,23 @@ class SpotifyPlaylistAPITests(APITestCase):
         self.assertEqual(playlist['image_url'], 'https://mosaic.scdn.co/640/page1-image')
         self.assertEqual(playlist['track_count'], 5)
 
+    def test_sparse_fields(self, mock_spotify):
+        """Test that ?fields= trims each playlist summary"""
+        single_page_response = self.user_playlists_response_page_1.copy()
+        single_page_response['next'] = None
+
+        mock_instance = MagicMock()
+        mock_instance.current_user_playlists.return_value = single_page_response
+        mock_spotify.return_value = mock_instance
+
+        response = self.client.get(f'{self.url}?fields=id,track_count')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{'id': '2oCEWyyAPbZp9xhVSxZavx', 'track_count': 5}])
+
+        response = self.client.get(f'{self.url}?fields=owner')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_playlist_pagination(self, mock_spotify):
         """Test retrieval of multiple pages of playlists"""
         mock_instance = MagicMock()
@@ -148,6 +168,69 @@ class SpotifyPlaylistAPITests(APITestCase):
         
         self.assertEqual(mock_instance.current_user_playlists.call_count, 2)
 
+    def _build_paged_responses(self, page_count):
+        template = self.user_playlists_response_page_1['items'][0]
+        total = page_count * 50
+        responses = {}
+        for page_index in range(page_count):
+            offset = page_index * 50
+            responses[offset] = {
+                **self.user_playlists_response_page_1,
+                'items': [{**template, 'id': f'playlist_{offset}'}],
+                'offset': offset,
+                'next': None if page_index == page_count - 1 else f'next_{offset}',
+                'total': total,
+            }
+        return responses
+
+    def test_concurrent_pagination_preserves_order(self, mock_spotify):
+        """Test that pages fetched in parallel come back in offset order"""
+        responses = self._build_paged_responses(page_count=5)
+
+        def mock_current_user_playlists(limit=50, offset=0):
+            # Later pages finish first to shake out any ordering assumptions
+            time.sleep((250 - offset) / 10000)
+            return responses[offset]
+
+        mock_instance = MagicMock()
+        mock_instance.current_user_playlists.side_effect = mock_current_user_playlists
+        mock_spotify.return_value = mock_instance
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [playlist['id'] for playlist in response.data],
+            [f'playlist_{offset}' for offset in range(0, 250, 50)]
+        )
+        self.assertEqual(mock_instance.current_user_playlists.call_count, 5)
+
+    @override_settings(SPOTIFY_PLAYLISTS_FETCH_MAX_WORKERS=2)
+    def test_concurrent_pagination_respects_worker_cap(self, mock_spotify):
+        """Test that no more than the configured number of pages are in flight"""
+        responses = self._build_paged_responses(page_count=8)
+        lock = threading.Lock()
+        in_flight = {'current': 0, 'peak': 0}
+
+        def mock_current_user_playlists(limit=50, offset=0):
+            with lock:
+                in_flight['current'] += 1
+                in_flight['peak'] = max(in_flight['peak'], in_flight['current'])
+            time.sleep(0.01)
+            with lock:
+                in_flight['current'] -= 1
+            return responses[offset]
+
+        mock_instance = MagicMock()
+        mock_instance.current_user_playlists.side_effect = mock_current_user_playlists
+        mock_spotify.return_value = mock_instance
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 8)
+        self.assertLessEqual(in_flight['peak'], 2)
+
     def test_playlist_filtering(self, mock_spotify):
         """Test filtering of collaborative and non-owned playlists"""
         mixed_playlists_response = self.user_playlists_response_page_1.copy()
@@ -216,6 +299,27 @@ class SpotifyPlaylistAPITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, [])
 
+    def test_not_modified_when_playlists_unchanged(self, mock_spotify):
+        """Test that an unchanged playlist list gets a 304 on revalidation"""
+        single_page_response = {**self.user_playlists_response_page_1, 'next': None}
+        single_page_response['items'] = [
+            {**self.user_playlists_response_page_1['items'][0], 'snapshot_id': 'snapshot-1'}
+        ]
+
+        mock_instance = MagicMock()
+        mock_instance.current_user_playlists.return_value = single_page_response
+        mock_spotify.return_value = mock_instance
+
+        response = self.client.get(self.url)
+        self.assertIn('private', response['Cache-Control'])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        single_page_response['items'][0]['snapshot_id'] = 'snapshot-2'
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
     def test_authentication_required(self, mock_spotify):
         """Test that the endpoint requires authentication"""
         client = APIClient()
@@ -0,0 +1,116 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from unittest import skipIf
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from unittest.mock import patch, MagicMock
+from spotipy.oauth2 import SpotifyOauthError
+from core.tests.factories.user_factory import UserFactory
+
+
+class SpotifyTokenRefreshTests(TestCase):
+    def setUp(self):
+        self.user = UserFactory(
+            spotify_access_token='old_access_token',
+            spotify_refresh_token='refresh_token',
+            spotify_access_token_expires_at=timezone.now() + timedelta(seconds=30)
+        )
+        self.token_data = {
+            'access_token': 'new_access_token',
+            'refresh_token': 'new_refresh_token',
+            'expires_in': 3600,
+        }
+
+    @patch('core.spotify_tokens.SpotifyOAuth')
+    def test_expiring_token_refreshed_before_use(self, mock_spotify_oauth):
+        """Test that get_spotify_client refreshes a token about to expire"""
+        mock_spotify_oauth.return_value.refresh_access_token.return_value = self.token_data
+
+        client = self.user.get_spotify_client()
+
+        mock_spotify_oauth.return_value.refresh_access_token.assert_called_once_with('refresh_token')
+        self.assertEqual(client._auth, 'new_access_token')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.spotify_access_token, 'new_access_token')
+        self.assertEqual(self.user.spotify_refresh_token, 'new_refresh_token')
+        self.assertGreater(self.user.spotify_access_token_expires_at, timezone.now() + timedelta(minutes=59))
+
+    @patch('core.spotify_tokens.SpotifyOAuth')
+    def test_fresh_token_not_refreshed(self, mock_spotify_oauth):
+        """Test that a token with plenty of life left is used as is"""
+        self.user.spotify_access_token_expires_at = timezone.now() + timedelta(minutes=30)
+        self.user.save()
+
+        client = self.user.get_spotify_client()
+
+        mock_spotify_oauth.assert_not_called()
+        self.assertEqual(client._auth, 'old_access_token')
+
+    @patch('core.spotify_tokens.SpotifyOAuth')
+    def test_stale_instance_skips_refresh_done_elsewhere(self, mock_spotify_oauth):
+        """Test that a token refreshed by another request isn't refreshed again"""
+        mock_spotify_oauth.return_value.refresh_access_token.return_value = self.token_data
+        stale_user = type(self.user).objects.get(pk=self.user.pk)
+
+        self.user.get_spotify_client()
+        client = stale_user.get_spotify_client()
+
+        self.assertEqual(mock_spotify_oauth.return_value.refresh_access_token.call_count, 1)
+        self.assertEqual(client._auth, 'new_access_token')
+
+    @patch('core.spotify_tokens.SpotifyOAuth')
+    def test_failed_refresh_falls_back_to_current_token(self, mock_spotify_oauth):
+        """Test that a refresh error doesn't break building the client"""
+        mock_spotify_oauth.return_value.refresh_access_token.side_effect = SpotifyOauthError('invalid_grant')
+
+        client = self.user.get_spotify_client()
+
+        self.assertEqual(client._auth, 'old_access_token')
+
+
+class RefreshSpotifyTokensCommandTests(TransactionTestCase):
+    def refresh_expiring_tokens(self, mock_spotify_oauth, workers):
+        mock_oauth_instance = MagicMock()
+        mock_oauth_instance.refresh_access_token.return_value = {
+            'access_token': 'new_access_token',
+            'expires_in': 3600,
+        }
+        mock_spotify_oauth.return_value = mock_oauth_instance
+
+        expiring_users = [
+            UserFactory(spotify_access_token_expires_at=timezone.now() + timedelta(minutes=minutes))
+            for minutes in (-5, 2, 9)
+        ]
+        fresh_user = UserFactory(
+            spotify_access_token='fresh_access_token',
+            spotify_access_token_expires_at=timezone.now() + timedelta(minutes=45)
+        )
+
+        out = StringIO()
+        call_command(
+            'refresh_spotify_tokens',
+            '--within-minutes=10',
+            '--batch-size=2',
+            f'--workers={workers}',
+            stdout=out
+        )
+
+        self.assertIn('Refreshed 3 Spotify access tokens', out.getvalue())
+        for user in expiring_users:
+            user.refresh_from_db()
+            self.assertEqual(user.spotify_access_token, 'new_access_token')
+        fresh_user.refresh_from_db()
+        self.assertEqual(fresh_user.spotify_access_token, 'fresh_access_token')
+
+    @patch('core.spotify_tokens.SpotifyOAuth')
+    def test_refreshes_only_expiring_tokens(self, mock_spotify_oauth):
+        """Test that the worker refreshes tokens inside the window and leaves the rest"""
+        self.refresh_expiring_tokens(mock_spotify_oauth, workers=1)
+
+    @skipIf(connection.vendor == 'sqlite', 'SQLite has no row locks for concurrent writers')
+    @patch('core.spotify_tokens.SpotifyOAuth')
+    def test_refreshes_expiring_tokens_concurrently(self, mock_spotify_oauth):
+        """Test that the worker refreshes tokens correctly with concurrent refresh requests"""
+        self.refresh_expiring_tokens(mock_spotify_oauth, workers=4)
@@ -3,7 +3,7 @@ from unittest.mock import Mock
 import requests
 from spotipy import Spotify
 from spotipy.oauth2 import SpotifyClientCredentials
-from core.spotipy_utils import get_spotify_playlist
+from core.spotipy_utils import SPOTIFY_PLAYLIST_FIELDS, get_spotify_playlist
 
 class SpotifyClientCredentialsMock(SpotifyClientCredentials):
     def __init__(self, client_id=None, client_secret=None, proxies=None, requests_timeout=None):
@@ -88,7 +88,7 @@ class TestGetSpotifyPlaylist(unittest.TestCase):
         # Verify correct API calls
         self.spotify_client.playlist.assert_called_once_with(
             'test_playlist_id',
-            fields='id,name,description,images,owner.display_name,followers.total'
+            fields=SPOTIFY_PLAYLIST_FIELDS
         )
         
         self.spotify_client.playlist_tracks.assert_called_once_with(
@@ -96,7 +96,7 @@ class TestGetSpotifyPlaylist(unittest.TestCase):
             offset=0,
             limit=20,
             additional_types=['track'],
-            fields='items(track(id,name,duration_ms,album(name,images),artists(name))),total'
+            fields='items(track(id,name,duration_ms,album(id,name,images),artists(id,name))),total'
         )
         
         # Verify playlist data
@@ -173,7 +173,7 @@ class TestGetSpotifyPlaylist(unittest.TestCase):
             offset=10,  # (page-1) * page_size
             limit=10,
             additional_types=['track'],
-            fields='items(track(id,name,duration_ms,album(name,images),artists(name))),total'
+            fields='items(track(id,name,duration_ms,album(id,name,images),artists(id,name))),total'
         )
         
         self.assertEqual(result['total_tracks'], 50)
\ No newline at end of file
@@ -0,0 +1,73 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from unittest.mock import patch
+from core.tests.factories.user_factory import UserFactory
+from core.token_blacklist import InsertBlacklistRefreshToken
+
+
+class TokenRefreshTests(APITestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.refresh = RefreshToken.for_user(self.user)
+        self.url = reverse('token_refresh')
+
+    def test_refresh_rotates_and_blacklists(self):
+        """Test that refreshing returns a new refresh token and blacklists the old one"""
+        response = self.client.post(self.url, {'refresh': str(self.refresh)})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['refresh'], str(self.refresh))
+        self.assertTrue(BlacklistedToken.objects.filter(token__jti=self.refresh['jti']).exists())
+
+    def test_reused_token_rejected(self):
+        """Test that a token already rotated is turned away by the blacklist insert"""
+        self.client.post(self.url, {'refresh': str(self.refresh)})
+
+        response = self.client.post(self.url, {'refresh': str(self.refresh)})
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(BlacklistedToken.objects.filter(token__jti=self.refresh['jti']).count(), 1)
+
+    def test_blacklist_not_selected_before_insert(self):
+        """Test that refreshing doesn't look the token up in the blacklist before blacklisting it"""
+        with patch.object(RefreshToken, 'check_blacklist') as mock_check_blacklist:
+            response = self.client.post(self.url, {'refresh': str(self.refresh)})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_check_blacklist.assert_not_called()
+
+    @patch('core.token_blacklist.rotation_blacklists', return_value=False)
+    def test_checks_database_without_rotation(self, mock_rotation_blacklists):
+        """Test that the table is still checked when refreshing doesn't blacklist the token"""
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=self.refresh['jti']))
+
+        with self.assertRaises(TokenError):
+            InsertBlacklistRefreshToken(str(self.refresh))
+
+
+class PruneTokensCommandTests(TestCase):
+    def test_prunes_expired_tokens(self):
+        """Test that expired outstanding tokens and their blacklist entries are deleted"""
+        user = UserFactory()
+        expired = [RefreshToken.for_user(user) for _ in range(3)]
+        current = RefreshToken.for_user(user)
+        OutstandingToken.objects.filter(jti__in=[token['jti'] for token in expired]) \
+            .update(expires_at=timezone.now() - timedelta(minutes=1))
+        for outstanding_token in OutstandingToken.objects.all():
+            BlacklistedToken.objects.create(token=outstanding_token)
+
+        stdout = StringIO()
+        call_command('prune_tokens', '--batch-size=2', stdout=stdout)
+
+        self.assertIn('Deleted 3 expired tokens', stdout.getvalue())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [current['jti']])
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
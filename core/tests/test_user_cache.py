@@ -0,0 +1,142 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from unittest.mock import patch
+from core.models import User
+from core.tests.factories.user_factory import UserFactory
+from core.user_cache import user_cache
+
+SHARED_LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'user-cache-tests'},
+}
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = UserFactory(spotify_id='test_user_id', spotify_display_name='Before')
+        self.refresh_token = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.refresh_token.access_token}')
+        self.url = reverse('current_user')
+
+    def test_repeat_requests_skip_user_query(self):
+        """Test that the user is only loaded from the database on the first request"""
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['spotify_display_name'], 'Before')
+
+    def test_save_invalidates(self):
+        """Test that saving the user makes the next request see the change"""
+        self.client.get(self.url)
+
+        self.user.spotify_display_name = 'After'
+        self.user.save()
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data['spotify_display_name'], 'After')
+
+    def test_deactivated_user_rejected(self):
+        """Test that a cached user who is deactivated can no longer authenticate"""
+        self.client.get(self.url)
+
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_invalidates(self):
+        """Test that logging out drops the user from the cache"""
+        self.client.get(self.url)
+        self.assertIsNotNone(user_cache.get(self.user.pk))
+
+        self.client.cookies['refresh_token'] = str(self.refresh_token)
+        response = self.client.post(reverse('logout'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(user_cache.get(self.user.pk))
+
+    def test_requests_get_their_own_instance(self):
+        """Test that changes a request makes to request.user don't leak into the cache"""
+        self.client.get(self.url)
+
+        user_cache.get(self.user.pk).spotify_display_name = 'Changed in place'
+
+        self.assertEqual(user_cache.get(self.user.pk).spotify_display_name, 'Before')
+
+    @override_settings(AUTH_USER_CACHE_SIZE=0)
+    def test_disabled(self):
+        """Test that every request loads the user when the cache is disabled"""
+        self.client.get(self.url)
+
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+
+class UserCacheTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        # As authentication would have loaded them
+        self.users = [User.objects.get(pk=UserFactory(spotify_id=f'user{index}').pk) for index in range(3)]
+
+    def cache(self, user):
+        user_cache.set(user.pk, user, user_cache.generation)
+
+    @override_settings(AUTH_USER_CACHE_SIZE=2)
+    def test_least_recently_used_evicted(self):
+        """Test that the least recently used user is evicted once the cache is full"""
+        first, second, third = self.users
+        self.cache(first)
+        self.cache(second)
+        user_cache.get(first.pk)
+        self.cache(third)
+
+        self.assertIsNotNone(user_cache.get(first.pk))
+        self.assertIsNone(user_cache.get(second.pk))
+        self.assertIsNotNone(user_cache.get(third.pk))
+
+    @override_settings(AUTH_USER_CACHE_TTL_SECONDS=5)
+    @patch('core.user_cache.time.monotonic')
+    def test_entries_expire(self, mock_monotonic):
+        """Test that users are reloaded once their entry is older than the TTL"""
+        mock_monotonic.return_value = 100
+        self.cache(self.users[0])
+
+        mock_monotonic.return_value = 104
+        self.assertIsNotNone(user_cache.get(self.users[0].pk))
+        mock_monotonic.return_value = 105
+        self.assertIsNone(user_cache.get(self.users[0].pk))
+
+    def test_load_racing_a_save_not_cached(self):
+        """Test that a user loaded before a concurrent save isn't cached after it"""
+        user = self.users[0]
+        generation = user_cache.generation
+
+        user_cache.invalidate(user.pk)
+        user_cache.set(user.pk, user, generation)
+
+        self.assertIsNone(user_cache.get(user.pk))
+
+    @override_settings(AUTH_USER_CACHE_SHARED=True, CACHES=SHARED_LOCMEM_CACHES)
+    def test_shared_tier(self):
+        """Test that users cached by one process are found by another, until saved"""
+        user = self.users[0]
+        self.cache(user)
+        # A fresh LRU, as another process would have
+        user_cache.clear()
+
+        with self.assertNumQueries(0):
+            cached_user = user_cache.get(user.pk)
+        self.assertEqual(cached_user.spotify_id, user.spotify_id)
+
+        user.save()
+        user_cache.clear()
+        self.assertIsNone(user_cache.get(user.pk))
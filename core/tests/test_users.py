@@ -33,3 +33,34 @@ class UserAPITests(APITestCase):
             self.assertEqual(
                 model_value, response_json[field]
             )
+
+    def test_current_user_etag(self):
+        current_user = UserFactory()
+        self.client.force_authenticate(user=current_user)
+
+        response = self.client.get(reverse('current_user'))
+
+        self.assertIn('ETag', response)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Authorization', response['Vary'])
+
+        not_modified_response = self.client.get(
+            reverse('current_user'),
+            HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(not_modified_response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified_response['ETag'], response['ETag'])
+        self.assertEqual(not_modified_response.content, b'')
+
+    def test_current_user_etag_changes_on_update(self):
+        current_user = UserFactory()
+        self.client.force_authenticate(user=current_user)
+        etag = self.client.get(reverse('current_user'))['ETag']
+
+        current_user.personal_blurb = 'Updated blurb'
+        current_user.save()
+
+        response = self.client.get(reverse('current_user'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['personal_blurb'], 'Updated blurb')
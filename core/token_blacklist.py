@@ -0,0 +1,92 @@
+"""
+Refresh token blacklisting that stays off the database in the common case.
+
+Rotating a refresh token blacklists it, so a token that isn't blacklisted
+yet is found out by that insert: BlacklistedToken is one-to-one with
+OutstandingToken, so a second rotation of the same token conflicts. That
+makes the SELECT simplejwt runs on every refresh redundant, and
+InsertBlacklistRefreshToken skips it.
+"""
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from core.cache_warming import record_user_activity
+
+
+def rotation_blacklists():
+    return api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION
+
+
+class InsertBlacklistRefreshToken(RefreshToken):
+    """
+    RefreshToken that leaves finding out whether it is blacklisted to
+    blacklist() when it will be blacklisted right away, as on refresh with
+    rotation and on logout. Use RefreshToken anywhere else.
+    """
+
+    def check_blacklist(self):
+        if not rotation_blacklists():
+            super().check_blacklist()
+
+    def blacklist(self):
+        """
+        Raises:
+            TokenError: The token was already blacklisted
+        """
+        jti = self.payload[api_settings.JTI_CLAIM]
+        expires_at = datetime_from_epoch(self.payload['exp'])
+
+        outstanding_token, _ = OutstandingToken.objects.get_or_create(
+            jti=jti,
+            defaults={'token': str(self), 'expires_at': expires_at}
+        )
+        blacklisted_token, created = BlacklistedToken.objects.get_or_create(token=outstanding_token)
+
+        if not created:
+            raise TokenError('Token is blacklisted')
+
+        return blacklisted_token, created
+
+
+class InsertBlacklistTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = InsertBlacklistRefreshToken
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+
+        # Just verified by super()
+        refresh = self.token_class(attrs['refresh'], verify=False)
+        # Marks the user as active for the cache-warming crawler
+        record_user_activity(refresh[api_settings.USER_ID_CLAIM])
+
+        return data
+
+
+def prune_expired_tokens(batch_size=1000):
+    """
+    Delete expired outstanding tokens, and with them their blacklist entries,
+    in batches so no single statement holds locks for long. Expired tokens
+    fail validation anyway, so their rows no longer do anything.
+
+    Returns:
+        int: Outstanding tokens deleted
+    """
+    now = timezone.now()
+    deleted_count = 0
+    while True:
+        batch = list(
+            OutstandingToken.objects
+            .filter(expires_at__lte=now)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not batch:
+            return deleted_count
+
+        BlacklistedToken.objects.filter(token_id__in=batch).delete()
+        OutstandingToken.objects.filter(id__in=batch).delete()
+        deleted_count += len(batch)
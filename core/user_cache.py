@@ -0,0 +1,141 @@
+"""
+Users resolved by JWT authentication, cached so most requests skip the
+SELECT on core_user.
+
+Each process keeps a bounded LRU of recently seen users for
+settings.AUTH_USER_CACHE_TTL_SECONDS. With settings.AUTH_USER_CACHE_SHARED,
+misses fall back to the 'shared' cache before the database.
+
+User.save() and User.delete() drop the user from this process's LRU and
+from the shared cache. Other processes' LRUs are not reached, so a change
+made elsewhere can take up to the TTL to show up there; keep it short.
+"""
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework_simplejwt.settings import api_settings
+from core.metrics import cache_requests_total
+
+SHARED_CACHE_ALIAS = 'shared'
+
+
+class UserCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        # Bumped by every invalidation, so a user loaded from the database
+        # before a concurrent save isn't stored after it
+        self._generation = 0
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, user_id):
+        """
+        Returns:
+            User: A fresh instance, safe for the caller to modify, or None on a miss
+        """
+        if settings.AUTH_USER_CACHE_SIZE <= 0:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] <= now:
+                del self._entries[user_id]
+                entry = None
+            elif entry is not None:
+                self._entries.move_to_end(user_id)
+            generation = self._generation
+
+        if entry is not None:
+            cache_requests_total.inc(cache='auth_user', result='hit')
+            return build_user(entry[1])
+
+        if settings.AUTH_USER_CACHE_SHARED:
+            state = caches[SHARED_CACHE_ALIAS].get(get_shared_cache_key(user_id))
+            if state is not None:
+                cache_requests_total.inc(cache='auth_user', result='shared_hit')
+                self._store(user_id, state, generation)
+                return build_user(state)
+
+        cache_requests_total.inc(cache='auth_user', result='miss')
+        return None
+
+    def set(self, user_id, user, generation):
+        """
+        Cache a user loaded from the database.
+
+        Args:
+            generation: self.generation read before the user was loaded
+        """
+        if settings.AUTH_USER_CACHE_SIZE <= 0:
+            return
+
+        state = get_user_state(user)
+        if self._store(user_id, state, generation) and settings.AUTH_USER_CACHE_SHARED:
+            caches[SHARED_CACHE_ALIAS].set(
+                get_shared_cache_key(user_id),
+                state,
+                settings.AUTH_USER_CACHE_TTL_SECONDS
+            )
+
+    def _store(self, user_id, state, generation):
+        with self._lock:
+            if generation != self._generation:
+                return False
+
+            self._entries[user_id] = (time.monotonic() + settings.AUTH_USER_CACHE_TTL_SECONDS, state)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > settings.AUTH_USER_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+        return True
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(user_id, None)
+
+        if settings.AUTH_USER_CACHE_SHARED:
+            caches[SHARED_CACHE_ALIAS].delete(get_shared_cache_key(user_id))
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+def get_shared_cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def get_user_state(user):
+    """Returns: tuple: (database alias, field values), small and picklable"""
+    return user._state.db, tuple(getattr(user, field.attname) for field in user._meta.concrete_fields)
+
+
+def build_user(state):
+    db, values = state
+    user_model = get_user_model()
+
+    return user_model.from_db(db, [field.attname for field in user_model._meta.concrete_fields], values)
+
+
+def invalidate_cached_user(user):
+    """
+    Drop a user from the cache now and again once the current transaction
+    commits, so a request reading the old row in between can't bring it back.
+    """
+    # Tokens identify users by USER_ID_FIELD, so the cache is keyed by it too
+    user_id = getattr(user, api_settings.USER_ID_FIELD)
+    user_cache.invalidate(user_id)
+    transaction.on_commit(lambda: user_cache.invalidate(user_id))
+
+
+user_cache = UserCache()
@@ -1,8 +1,9 @@
 from django.shortcuts import render, redirect
-from django.http import HttpResponseRedirect, HttpResponse
+from django.http import HttpResponseRedirect, HttpResponse, StreamingHttpResponse
 from spotipy import Spotify, SpotifyOAuth
 from django.conf import settings
 from django.urls import reverse
+from django.utils import timezone
 import requests
 import json
 from core.models import User
@@ -10,6 +11,7 @@ from core.spotipy_utils import (
     get_noshuff_user_fields,
     get_spotify_user_playlists,
     get_spotify_playlist,
+    iter_spotify_playlist_tracks,
 )
 from rest_framework import status
 from rest_framework.response import Response
@@ -17,13 +19,44 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from urllib.parse import urlencode
-from core.serializers import (
-    UserSerializer,
-    SpotifyPlaylistSummarySerializer,
-    SpotifyPlaylistDetailSerializer,
+from core.serializers import UserSerializer
+from core.projections import (
+    project_library_playlist_summaries,
+    project_playlist_summaries,
+    project_playlist_detail,
+    project_track,
 )
+from core.playlist_library import (
+    ensure_spotify_user_library,
+    is_library_query,
+    parse_library_query,
+    search_spotify_user_library,
+)
+from core.metrics import PROMETHEUS_CONTENT_TYPE, registry
+from core.permissions import IsSuperuser
+from core.renderers import FastJSONRenderer
+from core.token_blacklist import InsertBlacklistRefreshToken
+from core.request_timing import timed
 from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+import binascii
+from core.sparse_fields import (
+    PLAYLIST_SUMMARY_FIELDS,
+    TRACK_FIELDS,
+    get_playlist_detail_fields,
+    get_request_fields,
+)
+from core.etags import (
+    add_cache_headers,
+    etag_matches,
+    get_library_playlists_etag,
+    get_playlist_detail_etag,
+    get_playlists_summary_etag,
+    get_user_etag,
+    not_modified_response,
+)
 
 
 @api_view(['GET'])
@@ -57,10 +90,7 @@ def spotify_post_auth_callback(request):
     sp = Spotify(auth=token_data["access_token"])
     spotify_user = sp.current_user()
     noshuff_user_fields = get_noshuff_user_fields(spotify_user, token_data)
-    noshuff_user, _ = User.objects.update_or_create(
-        spotify_id=noshuff_user_fields['spotify_id'],
-        defaults=noshuff_user_fields
-    )
+    noshuff_user = User.objects.upsert_spotify_user(**noshuff_user_fields, last_login=timezone.now())
 
     noshuff_refresh_token = RefreshToken.for_user(noshuff_user)
     noshuff_access_token = str(noshuff_refresh_token.access_token)
@@ -110,7 +140,7 @@ def logout_view(request):
         )
 
     try:
-        token = RefreshToken(refresh_token)
+        token = InsertBlacklistRefreshToken(refresh_token)
         token.blacklist()
     except TokenError:
         return Response(
@@ -141,69 +171,297 @@ def logout_view(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def current_user(request):
+    etag = get_user_etag(request.user)
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+
     serializer = UserSerializer(request.user)
 
-    return Response(serializer.data)
+    return add_cache_headers(Response(serializer.data), etag)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def spotify_user_playlists_summary(request):
+    try:
+        fields = get_request_fields(request, PLAYLIST_SUMMARY_FIELDS)
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if is_library_query(request.query_params):
+        return search_spotify_user_playlists(request, fields)
+
     current_user = request.user
     playlists = get_spotify_user_playlists(current_user)
-    serializer = SpotifyPlaylistSummarySerializer(playlists, many=True)
+    if playlists is None:
+        return Response([])
+
+    etag = get_playlists_summary_etag(playlists, fields)
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+
+    with timed('serialize'):
+        results = project_playlist_summaries(playlists, fields)
+
+    return add_cache_headers(Response(results), etag)
+
+def search_spotify_user_playlists(request, fields):
+    """
+    Answer a playlist search (?q=, ?sort=, track count ranges and the
+    owned/collaborative toggles) from the local copy of the user's library.
+    """
+    try:
+        query = parse_library_query(request.query_params)
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if not ensure_spotify_user_library(request.user):
+        return Response([])
+
+    rows = list(search_spotify_user_library(request.user, **query))
 
-    return Response(serializer.data)
+    etag = get_library_playlists_etag(rows, fields)
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+
+    with timed('serialize'):
+        results = project_library_playlist_summaries(rows, fields)
+
+    return add_cache_headers(Response(results), etag)
 
 class SpotifyPageNumberPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+    def get_page_size(self, request):
+        # request.GET rather than query_params, so the async views, which get
+        # a plain Django request, can share the paginators
+        try:
+            page_size = int(request.GET[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+
+        return self.page_size
+
+    def get_page_links(self, request, page, page_size, total_count):
+        url = replace_query_param(request.build_absolute_uri(), self.page_size_query_param, page_size)
+        next_url = replace_query_param(url, self.page_query_param, page + 1) \
+            if (page * page_size) < total_count else None
+        previous_url = replace_query_param(url, self.page_query_param, page - 1) \
+            if page > 1 else None
+
+        return next_url, previous_url
+
+class SpotifyCursorPagination(SpotifyPageNumberPagination):
+    """
+    Opaque cursors for walking a playlist's tracks.
+
+    A cursor encodes the offset, the page size and the snapshot_id of the
+    playlist when the walk started, so the walk can tell when the playlist
+    changed under it. Start a walk with ?pagination=cursor.
+    """
+    cursor_query_param = 'cursor'
+    pagination_query_param = 'pagination'
+
+    def is_requested(self, request):
+        return (
+            self.cursor_query_param in request.GET
+            or request.GET.get(self.pagination_query_param) == 'cursor'
+        )
+
+    def encode_cursor(self, offset, page_size, snapshot_id):
+        payload = json.dumps({'o': offset, 's': page_size, 'snap': snapshot_id}, separators=(',', ':'))
+        return urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        """
+        Returns:
+            tuple: (offset, page_size, snapshot_id); snapshot_id is None on the first page
+
+        Raises:
+            ValueError: if the cursor is malformed
+        """
+        encoded_cursor = request.GET.get(self.cursor_query_param)
+        if encoded_cursor is None:
+            return 0, self.get_page_size(request), None
+
+        try:
+            padding = '=' * (-len(encoded_cursor) % 4)
+            cursor = json.loads(urlsafe_b64decode(encoded_cursor + padding))
+            offset, page_size, snapshot_id = int(cursor['o']), int(cursor['s']), cursor['snap']
+        except (TypeError, KeyError, ValueError, binascii.Error):
+            raise ValueError('Invalid cursor')
+
+        if offset < 0 or not 0 < page_size <= self.max_page_size or offset % page_size:
+            raise ValueError('Invalid cursor')
+
+        return offset, page_size, snapshot_id
+
+    def get_cursor_links(self, request, offset, page_size, snapshot_id, total_count):
+        url = remove_query_param(request.build_absolute_uri(), self.pagination_query_param)
+        url = remove_query_param(url, self.page_size_query_param)
+        next_url = replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(offset + page_size, page_size, snapshot_id)
+        ) if offset + page_size < total_count else None
+        previous_url = replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(offset - page_size, page_size, snapshot_id)
+        ) if offset > 0 else None
+
+        return next_url, previous_url
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def spotify_user_playlist_detail(request, spotify_playlist_id: str):
+    try:
+        fields = get_playlist_detail_fields(request)
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
     try:
         spotify_client = request.user.get_spotify_client()
 
         paginator = SpotifyPageNumberPagination()
+        cursor_paginator = SpotifyCursorPagination()
+        use_cursor = cursor_paginator.is_requested(request)
 
-        try:
-            page = int(request.query_params.get('page', 1))
-            if page < 1:
+        if use_cursor:
+            try:
+                offset, page_size, cursor_snapshot_id = cursor_paginator.decode_cursor(request)
+            except ValueError:
                 return Response(
-                    {'error': 'Page number must be greater than 0'},
+                    {'error': 'Invalid cursor'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            page = offset // page_size + 1
+        else:
+            try:
+                page = int(request.query_params.get('page', 1))
+                if page < 1:
+                    return Response(
+                        {'error': 'Page number must be greater than 0'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+            except ValueError:
+                return Response(
+                    {'error': 'Invalid page number'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-        except ValueError:
-            return Response(
-                {'error': 'Invalid page number'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
 
-        page_size = paginator.get_page_size(request)
+            page_size = paginator.get_page_size(request)
 
         playlist_data = get_spotify_playlist(
             spotify_client,
             spotify_playlist_id,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            fields=fields
         )
 
+        snapshot_id = playlist_data.get('snapshot_id')
+        if use_cursor and cursor_snapshot_id and snapshot_id != cursor_snapshot_id:
+            return Response(
+                {
+                    'error': 'Playlist changed since the cursor was issued',
+                    'snapshot_id': snapshot_id,
+                },
+                status=status.HTTP_409_CONFLICT
+            )
+
+        etag = get_playlist_detail_etag(playlist_data, page, page_size, fields)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+
         # Serialize the data
-        serializer = SpotifyPlaylistDetailSerializer(playlist_data)
-        
+        with timed('serialize'):
+            results = project_playlist_detail(playlist_data, fields)
+
+        if use_cursor:
+            next_url, previous_url = cursor_paginator.get_cursor_links(
+                request, offset, page_size, snapshot_id, playlist_data['total_tracks']
+            )
+        else:
+            next_url, previous_url = paginator.get_page_links(
+                request, page, page_size, playlist_data['total_tracks']
+            )
+
         # Construct paginated response manually
-        return Response({
+        return add_cache_headers(Response({
             'count': playlist_data['total_tracks'],
-            'next': f'{request.build_absolute_uri()}?page={page + 1}&page_size={page_size}' 
-                   if (page * page_size) < playlist_data['total_tracks'] else None,
-            'previous': f'{request.build_absolute_uri()}?page={page - 1}&page_size={page_size}' 
-                       if page > 1 else None,
-            'results': serializer.data
-        })
+            'next': next_url,
+            'previous': previous_url,
+            'results': results
+        }), etag)
+
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def spotify_user_playlist_export(request, spotify_playlist_id: str):
+    """
+    Stream every track of a playlist as newline-delimited JSON.
+
+    Once streaming has started the status can't change, so if Spotify fails
+    partway through, the last line is {"error": ...} in place of the
+    remaining tracks.
+    """
+    try:
+        fields = get_request_fields(request, TRACK_FIELDS)
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    renderer = FastJSONRenderer()
+
+    try:
+        spotify_client = request.user.get_spotify_client()
+        tracks = iter_spotify_playlist_tracks(
+            spotify_client, spotify_playlist_id, track_fields=fields
+        )
+        lines = (renderer.render(project_track(track, fields)) + b'\n' for track in tracks)
+
+        # Pull the first upstream page before committing to a 200, so errors
+        # fetching the playlist still get a proper error response
+        first_line = next(lines, b'')
     except Exception as e:
         return Response(
             {'error': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+    def stream_lines():
+        yield first_line
+        try:
+            yield from lines
+        except Exception as e:
+            yield renderer.render({'error': str(e)}) + b'\n'
+
+    response = StreamingHttpResponse(
+        stream_lines(),
+        content_type='application/x-ndjson'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{spotify_playlist_id}.ndjson"'
+
+    return response
+
+@api_view(['GET'])
+@permission_classes([IsSuperuser])
+def metrics(request):
+    """Request, Spotify and cache metrics of every worker on this host, for Prometheus"""
+    return HttpResponse(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
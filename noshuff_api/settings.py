@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 import environ
 import os
+import tempfile
 from datetime import timedelta
 
 env = environ.Env(
@@ -50,6 +51,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its total covers the rest of the stack
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -122,10 +126,10 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
     'MAX_PAGE_SIZE': 100,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'core.renderers.FastJSONRenderer',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
@@ -134,11 +138,24 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
+    # Prune expired tokens with the prune_tokens command
     'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_REFRESH_SERIALIZER': 'core.token_blacklist.InsertBlacklistTokenRefreshSerializer',
 }
 
 SESSION_COOKIE_DOMAIN = env('SESSION_COOKIE_DOMAIN')
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Visible to every worker process on the host
+    'shared': {
+        'BACKEND': env('SHARED_CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': env('SHARED_CACHE_LOCATION', default=os.path.join(tempfile.gettempdir(), 'noshuff-cache')),
+    },
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -171,6 +188,83 @@ SPOTIPY_CLIENT_SECRET = SPOTIFY_SECRET_KEY
 SPOTIPY_SCOPE = SPOTIFY_SCOPE
 SPOTIPY_REDIRECT_URI = SPOTIFY_REDIRECT_URI
 
+# Base URL of the Spotify Web API. Point it at a local stand-in such as
+# benchmarks.fake_spotify for load tests.
+SPOTIFY_API_PREFIX = env('SPOTIFY_API_PREFIX', default='https://api.spotify.com/v1/')
+
+# Keep-alive connection pool shared by every Spotify client in a process.
+# SPOTIFY_HTTP_POOL_MAXSIZE should be at least the number of threads that can
+# talk to Spotify at once (WSGI threads x playlist fetch workers).
+SPOTIFY_HTTP_POOL_CONNECTIONS = env.int('SPOTIFY_HTTP_POOL_CONNECTIONS', default=2)
+SPOTIFY_HTTP_POOL_MAXSIZE = env.int('SPOTIFY_HTTP_POOL_MAXSIZE', default=32)
+
+# Token bucket shared by every worker process on the host for calls to the
+# Spotify Web API. A 429 pauses all workers until its Retry-After has passed.
+SPOTIFY_RATE_LIMIT_PER_SECOND = env.float('SPOTIFY_RATE_LIMIT_PER_SECOND', default=20)
+SPOTIFY_RATE_LIMIT_BURST = env.int('SPOTIFY_RATE_LIMIT_BURST', default=40)
+SPOTIFY_RATE_LIMIT_MAX_RETRIES = env.int('SPOTIFY_RATE_LIMIT_MAX_RETRIES', default=3)
+SPOTIFY_RATE_LIMIT_STATE_FILE = env(
+    'SPOTIFY_RATE_LIMIT_STATE_FILE',
+    default=os.path.join(tempfile.gettempdir(), 'noshuff-spotify-rate-limit')
+)
+
+# Identical in-flight playlist requests share one upstream call. With
+# SPOTIFY_SINGLE_FLIGHT_SHARED, requests in other worker processes on the host
+# are coalesced too, through lock files and the 'shared' cache.
+SPOTIFY_SINGLE_FLIGHT_SHARED = env.bool('SPOTIFY_SINGLE_FLIGHT_SHARED', default=False)
+SPOTIFY_SINGLE_FLIGHT_SHARED_TTL = env.int('SPOTIFY_SINGLE_FLIGHT_SHARED_TTL', default=2)
+SPOTIFY_SINGLE_FLIGHT_LOCK_DIR = env('SPOTIFY_SINGLE_FLIGHT_LOCK_DIR', default=tempfile.gettempdir())
+
+# Access tokens expiring within this window are refreshed before use
+SPOTIFY_TOKEN_REFRESH_MARGIN_SECONDS = env.int('SPOTIFY_TOKEN_REFRESH_MARGIN_SECONDS', default=60)
+
+# Upper bound on parallel page requests when listing a user's playlists
+SPOTIFY_PLAYLISTS_FETCH_MAX_WORKERS = env.int('SPOTIFY_PLAYLISTS_FETCH_MAX_WORKERS', default=4)
+
+# How stale the local copy of a user's playlist library may get before a
+# search queues a refresh from Spotify
+SPOTIFY_LIBRARY_SYNC_MAX_AGE_SECONDS = env.int('SPOTIFY_LIBRARY_SYNC_MAX_AGE_SECONDS', default=60)
+
+# Threads per worker refreshing stale library copies in the background while
+# searches are served from the stale copy
+SPOTIFY_LIBRARY_REFRESH_WORKERS = env.int('SPOTIFY_LIBRARY_REFRESH_WORKERS', default=2)
+
+# Rows per INSERT ... ON CONFLICT statement when ingesting tracks, albums and artists
+SPOTIFY_CATALOG_UPSERT_BATCH_SIZE = env.int('SPOTIFY_CATALOG_UPSERT_BATCH_SIZE', default=500)
+
+# Every Nth stored version of a playlist's track order is a full copy; the
+# versions in between are stored as edit scripts against the one before
+PLAYLIST_HISTORY_CHECKPOINT_INTERVAL = env.int('PLAYLIST_HISTORY_CHECKPOINT_INTERVAL', default=20)
+
+# Per-request time breakdown (Spotify, database, auth, serialization) as a
+# Server-Timing header and a log line on core.request_timing. It tells
+# clients how the time was spent, so leave it off where that matters.
+SERVER_TIMING_ENABLED = env.bool('SERVER_TIMING_ENABLED', default=False)
+
+# Request, Spotify and cache counters and latency histograms, served to admins
+# in the Prometheus text format at /api/v1/metrics
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=True)
+# Each worker writes its metrics to a file here and a scrape merges them all;
+# use a directory local to the host, and clear it when deploying
+METRICS_DIR = env('METRICS_DIR', default=os.path.join(tempfile.gettempdir(), 'noshuff-metrics'))
+# How often each worker writes its metrics out. Scrapes see the other
+# workers' values this far behind.
+METRICS_FLUSH_INTERVAL_SECONDS = env.float('METRICS_FLUSH_INTERVAL_SECONDS', default=5)
+
+# Users resolved by JWT authentication are cached per process, so most
+# requests skip the user query. A save in one process can take up to the TTL
+# to reach the others. A size of 0 disables the cache.
+AUTH_USER_CACHE_SIZE = env.int('AUTH_USER_CACHE_SIZE', default=1024)
+AUTH_USER_CACHE_TTL_SECONDS = env.float('AUTH_USER_CACHE_TTL_SECONDS', default=5)
+# Also share cached users between processes through the 'shared' cache. Only
+# worth it when that cache is faster than the database, e.g. memcached.
+AUTH_USER_CACHE_SHARED = env.bool('AUTH_USER_CACHE_SHARED', default=False)
+
+# Token refreshes stamp User.last_login, which the cache-warming and sync
+# crawlers pick active users by, only once it is this old. Keep it well
+# under their --active-within-minutes.
+USER_ACTIVITY_STAMP_INTERVAL_SECONDS = env.int('USER_ACTIVITY_STAMP_INTERVAL_SECONDS', default=1800)
+
 POST_AUTH_REDIRECT_URI = env('POST_AUTH_REDIRECT_URI')
 
 ENABLE_API_DOCS = env('ENABLE_API_DOCS')
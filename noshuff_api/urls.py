@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.urls import path
-from core import views
+from core import views, async_views
 from rest_framework_simplejwt.views import TokenRefreshView
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
 from django.conf import settings
@@ -36,6 +36,26 @@ urlpatterns = [
         views.spotify_user_playlist_detail,
         name='spotify-user-playlist-detail'
     ),
+    path(
+        'api/v1/spotify_user_playlists/<str:spotify_playlist_id>/export',
+        views.spotify_user_playlist_export,
+        name='spotify-user-playlist-export'
+    ),
+
+    # Spotify Resources (async, for ASGI deployments)
+    path(
+        'api/v1/async/spotify_user_playlists',
+        async_views.spotify_user_playlists_summary,
+        name='async_spotify_user_playlists_summary'
+    ),
+    path(
+        'api/v1/async/spotify_user_playlists/<str:spotify_playlist_id>',
+        async_views.spotify_user_playlist_detail,
+        name='async-spotify-user-playlist-detail'
+    ),
+
+    # Operations
+    path('api/v1/metrics', views.metrics, name='metrics'),
 ]
 
 # OpenAPI